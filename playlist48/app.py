@@ -1,14 +1,30 @@
 from dotenv import load_dotenv
-from flask import Flask, jsonify, make_response, Response, request
+from flask import Flask, g, jsonify, make_response, Response, request, stream_with_context
 from music_collection.models.stock_model import StockModel
-from music_collection.models.portfolio_model import PortfolioModel
-from music_collection.utils.sql_utils import check_database_connection, check_table_exists
-from typing import Any, Dict, Tuple
+from music_collection.models.quote_stream_model import CLOSED, QuoteStreamModel
+from music_collection.models.alert_model import AlertModel
+from music_collection.models.backtest_model import BacktestModel
+from music_collection.models.export_model import ExportModel
+from music_collection.models.history_model import HistoryModel
+from music_collection.models.intraday_model import INTERVALS as INTRADAY_INTERVALS, IntradayModel
+from music_collection.models.ledger_model import LedgerModel
+from music_collection.models.risk_model import RiskModel
+from music_collection.models.portfolio_history_model import PortfolioHistoryModel
+from music_collection.models.portfolio_model import DEFAULT_ACCOUNT_ID, PortfolioModel
+from music_collection.models.symbol_model import SymbolModel
+from music_collection.utils.sql_utils import create_storage
+from music_collection.utils.circuit_breaker import CircuitOpenError
+from music_collection.utils.http_cache import cached_response, compress_response
+from music_collection.utils import metrics
+from typing import Any, Callable, Dict, Optional, Tuple
 from venv import logger
 from flask import Flask, jsonify, make_response, request
 
+import functools
+import json
 import os
 import requests
+import threading
 from dotenv import load_dotenv
 
 from music_collection.models.user_model import UserModel
@@ -17,9 +33,81 @@ from music_collection.models.user_model import UserModel
 load_dotenv()
 
 app = Flask(__name__)
-user_model = UserModel()
+# Every model reads and writes through this storage (DB_BACKEND: SQLite files or in-memory)
+storage = create_storage()
+user_model = UserModel(storage)
 stock_model = StockModel()
-portfolio_model = PortfolioModel()
+symbol_model = SymbolModel(stock_model, storage=storage)
+stock_model.set_symbol_directory(symbol_model)
+ledger_model = LedgerModel(storage=storage)
+portfolio_model = PortfolioModel(stock_model, ledger_model, storage)
+quote_stream_model = QuoteStreamModel(stock_model)
+alert_model = AlertModel(storage)
+history_model = HistoryModel(stock_model, storage)
+intraday_model = IntradayModel(stock_model, storage=storage)
+risk_model = RiskModel(portfolio_model, history_model)
+portfolio_history_model = PortfolioHistoryModel(portfolio_model, history_model, storage)
+export_model = ExportModel(storage)
+backtest_model = BacktestModel(history_model)
+stock_model.add_quote_listener(alert_model.on_quote)
+app.after_request(compress_response)
+metrics.instrument_app(app)
+for cache in (stock_model.quote_cache, stock_model.history_cache, stock_model.company_cache,
+              stock_model.intraday_cache, stock_model.fx_cache):
+    metrics.register_cache(cache)
+metrics.register_circuit_breaker(stock_model.breaker)
+
+# Set once the market-data caches have been warmed; reported by /api/ready
+readiness = threading.Event()
+
+
+def backfill_ledger() -> None:
+    """Give lots recorded before the ledger their opening buys; a failure is logged, not raised."""
+    try:
+        ledger_model.backfill_opening_buys()
+    except Exception as e:
+        app.logger.error("Could not backfill the ledger: %s", e)
+
+
+def warm_caches() -> Dict[str, Any]:
+    """
+    Backfill the ledger, load the symbol directory and pre-fetch quotes and daily history
+    for every symbol held in the portfolio, then mark the app ready. Failures for individual
+    symbols are logged and do not block readiness.
+
+    Returns:
+        Dict with the symbols warmed and those that failed.
+    """
+    backfill_ledger()
+    symbol_model.ensure_loaded()
+    warmed, failed = [], []
+    try:
+        symbols = portfolio_model.get_held_symbols()
+    except Exception as e:
+        app.logger.error("Could not list held symbols for warm-up: %s", e)
+        symbols = []
+
+    for symbol in symbols:
+        try:
+            stock_model.get_stock_entry(symbol)
+            stock_model.get_history_entry(symbol)
+            warmed.append(symbol)
+        except Exception as e:
+            app.logger.warning("Warm-up failed for %s: %s", symbol, e)
+            failed.append(symbol)
+
+    app.logger.info("Cache warm-up complete: %d warmed, %d failed", len(warmed), len(failed))
+    readiness.set()
+    return {"warmed": warmed, "failed": failed}
+
+
+def upstream_unavailable(e: CircuitOpenError) -> Response:
+    """503 response for a request refused because the market-data circuit is open."""
+    response = make_response(jsonify({'error': str(e)}), 503)
+    response.headers['Retry-After'] = e.retry_after_header
+    return response
+
+
 @app.route('/api/create-account', methods=['POST'])
 def create_account():
     """
@@ -151,6 +239,18 @@ def healthcheck() -> Response:
     app.logger.info('Health check')
     return make_response(jsonify({'status': 'healthy'}), 200)
 
+@app.route('/api/ready', methods=['GET'])
+def readiness_check() -> Response:
+    """
+    Readiness check route: unlike /api/health, reports 503 until the caches are warm.
+
+    Returns:
+        JSON response with the readiness status of this worker.
+    """
+    if readiness.is_set():
+        return make_response(jsonify({'status': 'ready'}), 200)
+    return make_response(jsonify({'status': 'warming'}), 503)
+
 @app.route('/api/db-check', methods=['GET'])
 def db_check() -> Response:
     """
@@ -163,24 +263,57 @@ def db_check() -> Response:
     """
     try:
         app.logger.info("Checking database connection...")
-        check_database_connection()
+        storage.check_connection()
         app.logger.info("Database connection is OK.")
         app.logger.info("Checking if stocks table exists...")
-        check_table_exists("stocks")
+        storage.check_table_exists("stocks")
         app.logger.info("stocks table exists.")
         app.logger.info("Checking if portfolio table exists...")
-        check_table_exists("portfolio")
+        storage.check_table_exists("portfolio")
         app.logger.info("portfolio table exists.")
         return make_response(jsonify({'database_status': 'healthy'}), 200)
     except Exception as e:
         return make_response(jsonify({'error': str(e)}), 404)
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics() -> Response:
+    """
+    Route exposing request, upstream, SQLite and cache metrics in the Prometheus text format.
+
+    Returns:
+        Plain-text response with every registered metric.
+    """
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
 ####################################################
 #
 # Stock Information
 #
 ####################################################
 
+@app.route('/api/symbols/search', methods=['GET'])
+def search_symbols() -> Response:
+    """
+    Search the symbol directory by ticker or company-name prefix, for autocomplete.
+
+    Query Parameters:
+        - q (str): The prefix to look up.
+        - limit (int, optional): Maximum number of results (default 10, max 100).
+
+    Returns:
+        JSON response with the matching listings, best match first.
+    """
+    try:
+        query = request.args.get('q', '')
+        limit = request.args.get('limit', 10, type=int)
+
+        results = symbol_model.search(query, limit)
+        return make_response(jsonify({'query': query, 'results': results}), 200)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        return make_response(jsonify({'error': str(e)}), 500)
+
 @app.route('/api/stock/<symbol>', methods=['GET'])
 def get_stock_info(symbol: str) -> Response:
     """
@@ -193,8 +326,9 @@ def get_stock_info(symbol: str) -> Response:
         JSON response with current stock information.
     """
     try:
-        stock_info = stock_model.get_stock_info(symbol)
-        return make_response(jsonify(stock_info), 200)
+        return cached_response(stock_model.get_stock_entry(symbol), include_age=True)
+    except CircuitOpenError as e:
+        return upstream_unavailable(e)
     except Exception as e:
         return make_response(jsonify({'error': str(e)}), 404)
 
@@ -210,8 +344,9 @@ def get_company_info(symbol: str) -> Response:
         JSON response with company information.
     """
     try:
-        company_info = stock_model.get_company_info(symbol)
-        return make_response(jsonify(company_info), 200)
+        return cached_response(stock_model.get_company_entry(symbol), include_age=True)
+    except CircuitOpenError as e:
+        return upstream_unavailable(e)
     except Exception as e:
         return make_response(jsonify({'error': str(e)}), 404)
 
@@ -227,51 +362,316 @@ def get_stock_history(symbol: str) -> Response:
         JSON response with historical price data.
     """
     try:
-        historical_data = stock_model.get_historical_data(symbol)
-        return make_response(jsonify(historical_data), 200)
+        return cached_response(stock_model.get_history_entry(symbol))
+    except CircuitOpenError as e:
+        return upstream_unavailable(e)
+    except Exception as e:
+        return make_response(jsonify({'error': str(e)}), 404)
+
+@app.route('/api/stock/<symbol>/intraday', methods=['GET'])
+def get_stock_intraday(symbol: str) -> Response:
+    """
+    Get recent intraday bars.
+
+    Path Parameter:
+        - symbol (str): The stock symbol to look up.
+
+    Query Parameters:
+        - interval (str, optional): "1min", "5min" or "15min" (default "5min").
+        - limit (int, optional): Number of bars (default 100, max 1000).
+
+    Returns:
+        JSON response with OHLCV bars, oldest first.
+    """
+    try:
+        interval = request.args.get('interval', '5min')
+        limit = request.args.get('limit', 100, type=int)
+        if interval not in INTRADAY_INTERVALS or limit <= 0 or limit > 1000:
+            return make_response(jsonify({'error': f"interval must be one of {', '.join(INTRADAY_INTERVALS)} "
+                                                   "and limit between 1 and 1000"}), 400)
+
+        bars = intraday_model.get_bars(symbol, interval, limit)
+        return make_response(jsonify(bars), 200)
+    except CircuitOpenError as e:
+        return upstream_unavailable(e)
     except Exception as e:
         return make_response(jsonify({'error': str(e)}), 404)
 
+# Seconds between keep-alive comments on an idle price stream
+STREAM_HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT", "15"))
+
+@app.route('/api/stock/<symbol>/stream', methods=['GET'])
+def stream_stock_price(symbol: str) -> Response:
+    """
+    Stream live quotes as Server-Sent Events.
+
+    Path Parameter:
+        - symbol (str): The stock symbol to follow.
+
+    Returns:
+        text/event-stream response emitting a "quote" event for each new quote.
+    """
+    try:
+        # Validate the symbol (and prime the quote cache) before opening the stream
+        stock_model.get_stock_entry(symbol)
+    except CircuitOpenError as e:
+        return upstream_unavailable(e)
+    except Exception as e:
+        return make_response(jsonify({'error': str(e)}), 404)
+
+    subscription = quote_stream_model.subscribe(symbol)
+
+    def events():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                quote = subscription.get(timeout=STREAM_HEARTBEAT)
+                if quote is CLOSED:
+                    yield 'event: close\ndata: {"reason": "slow consumer"}\n\n'
+                    break
+                if quote is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: quote\ndata: {json.dumps(quote)}\n\n"
+        finally:
+            quote_stream_model.unsubscribe(subscription)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 ####################################################
 #
 # Portfolio Management
 #
 ####################################################
 
+class AccountAccessError(Exception):
+    """A request may not act on the account it named; status is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """The token of an "Authorization: Bearer <token>" header, if that is what was sent."""
+    scheme, _, token = (authorization or "").partition(" ")
+    return token.strip() if scheme.lower() == "bearer" else None
+
+
+def resolve_account(token: Optional[str], account_id: Any, trade: bool) -> int:
+    """
+    Account a portfolio request may act on: the account_id it names, which must be the
+    caller's own (the users.id the access token from /api/login was issued to). The default
+    account (DEFAULT_ACCOUNT_ID), holding the single-book lots from before accounts existed,
+    can be read by any logged-in caller but never traded.
+
+    Raises:
+        AccountAccessError: 401 without a valid token, 400 without an integer account_id,
+            403 for another user's account or a trade on the default account.
+    """
+    try:
+        caller = user_model.verify_token(token)
+    except ValueError as e:
+        raise AccountAccessError(str(e), 401)
+    if account_id is None:
+        raise AccountAccessError("account_id is required", 400)
+    try:
+        account_id = int(account_id)
+    except (TypeError, ValueError):
+        raise AccountAccessError("account_id must be an integer", 400)
+    if account_id == DEFAULT_ACCOUNT_ID:
+        if trade:
+            raise AccountAccessError("The default account is read-only", 403)
+    elif account_id != caller:
+        raise AccountAccessError(f"Not allowed to access account {account_id}", 403)
+    return account_id
+
+
+def account_route(trade: bool = False) -> Callable:
+    """
+    Decorate a portfolio route so it only runs for a caller allowed to act on the account
+    named by `account_id` (query string or JSON body); see resolve_account.
+
+    Args:
+        trade (bool): The route changes the account (buys and sells).
+    """
+    def decorator(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            account_id = request.args.get('account_id')
+            if account_id is None and request.is_json:
+                body = request.get_json(silent=True)
+                account_id = body.get('account_id') if isinstance(body, dict) else None
+            try:
+                g.account_id = resolve_account(bearer_token(request.headers.get('Authorization')), account_id, trade)
+            except AccountAccessError as e:
+                response = make_response(jsonify({'error': str(e)}), e.status)
+                if e.status == 401:
+                    response.headers['WWW-Authenticate'] = 'Bearer'
+                return response
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_account_id() -> int:
+    """Account the current request acts on, checked by @account_route."""
+    return g.account_id
+
 @app.route('/api/portfolio', methods=['GET'])
+@account_route()
 def get_portfolio() -> Response:
     """
-    Get current portfolio holdings.
+    Get an account's current portfolio holdings.
+
+    Query Parameters:
+        - account_id (int): The account.
 
     Returns:
         JSON response with portfolio holdings and their current values.
     """
     try:
-        portfolio = portfolio_model.get_portfolio()
+        portfolio = portfolio_model.get_portfolio(get_account_id())
         return make_response(jsonify(portfolio), 200)
+    except CircuitOpenError as e:
+        return upstream_unavailable(e)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
     except Exception as e:
         return make_response(jsonify({'error': str(e)}), 500)
 
 @app.route('/api/portfolio/value', methods=['GET'])
+@account_route()
 def get_portfolio_value() -> Response:
     """
-    Get total portfolio value and performance metrics.
+    Get an account's total portfolio value and performance metrics.
+
+    Query Parameters:
+        - account_id (int): The account.
+        - base_currency (str, optional): Currency to value holdings in (default USD).
 
     Returns:
-        JSON response with portfolio value and gains/losses.
+        JSON response with portfolio value and gains/losses, and the FX rates used.
     """
     try:
-        portfolio_value = portfolio_model.get_portfolio_value()
+        portfolio_value = portfolio_model.get_portfolio_value(get_account_id(),
+                                                              request.args.get('base_currency', 'USD'))
         return make_response(jsonify(portfolio_value), 200)
+    except CircuitOpenError as e:
+        return upstream_unavailable(e)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/portfolio/history', methods=['GET'])
+@account_route()
+def get_portfolio_history() -> Response:
+    """
+    Get an account's daily portfolio value over time.
+
+    Query Parameters:
+        - account_id (int): The account.
+        - start (str, optional): First date (YYYY-MM-DD).
+        - end (str, optional): Last date (YYYY-MM-DD).
+
+    Returns:
+        JSON response with one value point per trading day.
+    """
+    try:
+        history = portfolio_history_model.get_value_history(request.args.get('start'), request.args.get('end'),
+                                                            get_account_id())
+        return make_response(jsonify(history), 200)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/portfolio/risk', methods=['GET'])
+@account_route()
+def get_portfolio_risk() -> Response:
+    """
+    Get an account's portfolio risk analytics computed from stored daily closes.
+
+    Query Parameters:
+        - account_id (int): The account.
+        - benchmark (str, optional): Benchmark symbol for beta (default SPY).
+        - confidence (float, optional): VaR confidence level (default 0.95).
+        - lookback (int, optional): Number of daily returns to use (default 252).
+
+    Returns:
+        JSON response with volatility, beta, VaR and the correlation matrix.
+    """
+    try:
+        benchmark = request.args.get('benchmark', 'SPY')
+        confidence = request.args.get('confidence', 0.95, type=float)
+        lookback = request.args.get('lookback', 252, type=int)
+
+        risk = risk_model.get_portfolio_risk(benchmark, confidence, lookback, get_account_id())
+        return make_response(jsonify(risk), 200)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/portfolio/pnl', methods=['GET'])
+@account_route()
+def get_portfolio_pnl() -> Response:
+    """
+    Get an account's realized and unrealized profit and loss per position, from the transaction ledger.
+
+    Query Parameters:
+        - account_id (int): The account.
+
+    Returns:
+        JSON response with FIFO cost basis, realized and unrealized P&L per symbol.
+    """
+    try:
+        pnl = ledger_model.get_pnl(stock_model, get_account_id())
+        return make_response(jsonify(pnl), 200)
+    except CircuitOpenError as e:
+        return upstream_unavailable(e)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/transactions', methods=['GET'])
+@account_route()
+def get_transactions() -> Response:
+    """
+    List an account's recorded buy and sell transactions, newest first.
+
+    Query Parameters:
+        - account_id (int): The account.
+        - symbol (str, optional): Only transactions for this symbol.
+        - limit (int, optional): Maximum number of transactions (default 100, max 1000).
+        - before_id (int, optional): Only transactions older than this id, for paging.
+
+    Returns:
+        JSON response with the list of transactions.
+    """
+    try:
+        symbol = request.args.get('symbol')
+        limit = request.args.get('limit', 100, type=int)
+        before_id = request.args.get('before_id', type=int)
+
+        transactions = ledger_model.get_transactions(get_account_id(), symbol, limit, before_id)
+        return make_response(jsonify(transactions), 200)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
     except Exception as e:
         return make_response(jsonify({'error': str(e)}), 500)
 
 @app.route('/api/portfolio/buy', methods=['POST'])
+@account_route(trade=True)
 def buy_stock() -> Response:
     """
     Buy shares of a stock.
 
     Expected JSON Input:
+        - account_id (int): The account buying.
         - symbol (str): The stock symbol to buy.
         - shares (int): Number of shares to buy.
 
@@ -289,17 +689,23 @@ def buy_stock() -> Response:
         if not isinstance(shares, int) or shares <= 0:
             return make_response(jsonify({'error': 'Shares must be a positive integer'}), 400)
 
-        result = portfolio_model.buy_stock(symbol, shares)
+        result = portfolio_model.buy_stock(symbol, shares, get_account_id())
         return make_response(jsonify(result), 201)
+    except CircuitOpenError as e:
+        return upstream_unavailable(e)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
     except Exception as e:
         return make_response(jsonify({'error': str(e)}), 500)
 
 @app.route('/api/portfolio/sell', methods=['POST'])
+@account_route(trade=True)
 def sell_stock() -> Response:
     """
     Sell shares of a stock.
 
     Expected JSON Input:
+        - account_id (int): The account selling.
         - symbol (str): The stock symbol to sell.
         - shares (int): Number of shares to sell.
 
@@ -317,13 +723,199 @@ def sell_stock() -> Response:
         if not isinstance(shares, int) or shares <= 0:
             return make_response(jsonify({'error': 'Shares must be a positive integer'}), 400)
 
-        result = portfolio_model.sell_stock(symbol, shares)
+        result = portfolio_model.sell_stock(symbol, shares, get_account_id())
         return make_response(jsonify(result), 200)
+    except CircuitOpenError as e:
+        return upstream_unavailable(e)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
+####################################################
+#
+# Backtesting
+#
+####################################################
+
+@app.route('/api/backtest', methods=['POST'])
+def run_backtest() -> Response:
+    """
+    Backtest a trading rule over stored daily closes for one or more symbols.
+
+    Expected JSON Input:
+        - symbols (List[str]): Symbols to test.
+        - strategy (dict): {"type": "buy_and_hold" | "sma_cross" | "momentum", parameters};
+          a list-valued parameter is expanded into a grid.
+        - sizing (dict, optional): {"type": "shares", "shares": n} or {"type": "notional", "amount": x}.
+        - costs (dict, optional): {"commission": x, "slippage_bps": y}.
+        - start, end (str, optional): ISO date range.
+        - initial_cash (float, optional), include_curves (bool, optional), refresh (bool, optional).
+
+    Returns:
+        JSON response with summary statistics and equity curves per symbol and parameter set.
+    """
+    try:
+        spec = request.get_json(silent=True)
+        if not isinstance(spec, dict):
+            return make_response(jsonify({'error': 'A JSON backtest spec is required'}), 400)
+        return make_response(jsonify(backtest_model.run(spec)), 200)
+    except CircuitOpenError as e:
+        return upstream_unavailable(e)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
+####################################################
+#
+# Exports
+#
+####################################################
+
+def export_response(mimetype: str, chunks, filename: str) -> Response:
+    """Stream export chunks as a downloadable attachment (chunked, never buffered or compressed)."""
+    return Response(chunks, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/export/portfolio', methods=['GET'])
+@account_route()
+def export_portfolio() -> Response:
+    """
+    Export an account's lots or transactions as a streamed file.
+
+    Query Parameters:
+        - account_id (int): The account.
+        - dataset (str, optional): "lots" (default) or "transactions".
+        - format (str, optional): "csv" (default) or "ndjson".
+
+    Returns:
+        Streamed CSV or NDJSON response.
+    """
+    try:
+        dataset = request.args.get('dataset', 'lots')
+        fmt = request.args.get('format', 'csv')
+        account_id = get_account_id()
+
+        if dataset == 'lots':
+            mimetype, chunks = export_model.export_lots(account_id, fmt)
+        elif dataset == 'transactions':
+            mimetype, chunks = export_model.export_transactions(account_id, fmt)
+        else:
+            return make_response(jsonify({'error': 'dataset must be lots or transactions'}), 400)
+        return export_response(mimetype, chunks, f"{dataset}-{account_id}.{fmt}")
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/export/history', methods=['GET'])
+def export_history() -> Response:
+    """
+    Export stored daily bars for several symbols as a streamed file.
+
+    Query Parameters:
+        - symbols (str): Comma-separated symbols.
+        - start, end (str, optional): ISO date range (inclusive).
+        - format (str, optional): "csv" (default) or "ndjson".
+        - refresh (bool, optional): Fetch history missing the latest session first (one upstream call per symbol).
+
+    Returns:
+        Streamed CSV or NDJSON response ordered by symbol and date.
+    """
+    try:
+        symbols = request.args.get('symbols', '').split(',')
+        fmt = request.args.get('format', 'csv')
+
+        if request.args.get('refresh', 'false').lower() == 'true':
+            history_model.ensure_history([symbol for symbol in symbols if symbol.strip()])
+        mimetype, chunks = export_model.export_history(symbols, request.args.get('start'),
+                                                       request.args.get('end'), fmt)
+        return export_response(mimetype, chunks, f"history.{fmt}")
+    except CircuitOpenError as e:
+        return upstream_unavailable(e)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        return make_response(jsonify({'error': str(e)}), 500)
+
+
+####################################################
+#
+# Price Alerts
+#
+####################################################
+
+@app.route('/api/alerts', methods=['POST'])
+def create_alert() -> Response:
+    """
+    Register a price alert.
+
+    Expected JSON Input:
+        - symbol (str): The stock symbol to watch.
+        - direction (str): "above" or "below".
+        - threshold (float): The price level to cross.
+
+    Returns:
+        JSON response with the new alert.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return make_response(jsonify({'error': 'No input data provided'}), 400)
+
+        result = alert_model.create_alert(data.get('symbol'), data.get('direction'), data.get('threshold'))
+        return make_response(jsonify(result), 201)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 400)
+    except Exception as e:
+        return make_response(jsonify({'error': str(e)}), 500)
+
+@app.route('/api/alerts', methods=['GET'])
+def get_alerts() -> Response:
+    """
+    List price alerts.
+
+    Query Parameters:
+        - symbol (str, optional): Only alerts for this symbol.
+        - status (str, optional): "active" or "triggered".
+
+    Returns:
+        JSON response with the matching alerts.
+    """
+    try:
+        alerts = alert_model.get_alerts(request.args.get('symbol'), request.args.get('status'))
+        return make_response(jsonify(alerts), 200)
     except ValueError as e:
         return make_response(jsonify({'error': str(e)}), 400)
     except Exception as e:
         return make_response(jsonify({'error': str(e)}), 500)
 
+@app.route('/api/alerts/<int:alert_id>', methods=['DELETE'])
+def delete_alert(alert_id: int) -> Response:
+    """
+    Delete a price alert.
+
+    Path Parameter:
+        - alert_id (int): The alert to delete.
+
+    Returns:
+        JSON response confirming the deletion.
+    """
+    try:
+        result = alert_model.delete_alert(alert_id)
+        return make_response(jsonify(result), 200)
+    except ValueError as e:
+        return make_response(jsonify({'error': str(e)}), 404)
+    except Exception as e:
+        return make_response(jsonify({'error': str(e)}), 500)
+
 
 if __name__ == '__main__':
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    warm_caches()
     app.run(debug=True, host='0.0.0.0', port=6000)
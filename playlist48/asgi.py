@@ -0,0 +1,194 @@
+"""
+ASGI entry point with an asyncio execution path for the routes that wait on Alpha Vantage.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 6000
+
+For quote, history, intraday and company lookups, the portfolio views and trades, the market data a
+request needs is fetched on the event loop first: concurrently across symbols, and with
+one upstream call per symbol however many requests are waiting for it. The regular Flask
+handler from app.py then runs on a worker thread and finds that data in the cache, so a
+thread is only held for the local (SQLite) part of the request and one process can keep
+thousands of upstream waits in flight. All other routes go straight to Flask, and the
+synchronous app (gunicorn app:app) is unchanged.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from app import (AccountAccessError, app, backfill_ledger, bearer_token, portfolio_model, readiness, resolve_account,
+                 stock_model, symbol_model)
+from music_collection.models.stock_model import TRADE_QUOTE_MAX_AGE
+from music_collection.utils.circuit_breaker import CircuitOpenError
+from music_collection.utils.metrics import HTTP_REQUEST_DURATION, REQUEST_START_ENVIRON_KEY
+from music_collection.utils.wsgi_bridge import WsgiBridge, read_body
+
+
+# Threads running Flask handlers; each open price stream (SSE) holds one
+WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "64"))
+
+flask_app = WsgiBridge(app, max_threads=WSGI_THREADS)
+
+# (path parameters, query string, body, Authorization header)
+Prefetch = Callable[[Dict[str, str], Dict[str, List[str]], bytes, Optional[str]], Awaitable[None]]
+
+
+async def _prefetch_quote(path: Dict[str, str], query: Dict[str, List[str]], body: bytes,
+                          authorization: Optional[str]) -> None:
+    await stock_model.get_stock_entry_async(path["symbol"])
+
+
+async def _prefetch_history(path: Dict[str, str], query: Dict[str, List[str]], body: bytes,
+                            authorization: Optional[str]) -> None:
+    await stock_model.get_history_entry_async(path["symbol"])
+
+
+async def _prefetch_intraday(path: Dict[str, str], query: Dict[str, List[str]], body: bytes,
+                             authorization: Optional[str]) -> None:
+    await stock_model.get_intraday_entry_async(path["symbol"])
+
+
+async def _prefetch_company(path: Dict[str, str], query: Dict[str, List[str]], body: bytes,
+                            authorization: Optional[str]) -> None:
+    await stock_model.get_company_entry_async(path["symbol"])
+
+
+async def _prefetch_holdings(path: Dict[str, str], query: Dict[str, List[str]], body: bytes,
+                             authorization: Optional[str]) -> None:
+    """Quotes for every symbol the account holds, fetched concurrently."""
+    try:
+        account_id = resolve_account(bearer_token(authorization), query.get("account_id", [None])[0], trade=False)
+    except AccountAccessError:
+        return  # Flask rejects the request without calling upstream
+    positions = await asyncio.to_thread(portfolio_model.get_positions, account_id)
+    await stock_model.get_quotes_async(positions)
+
+
+async def _prefetch_trade(path: Dict[str, str], query: Dict[str, List[str]], body: bytes,
+                          authorization: Optional[str]) -> None:
+    """The quote a buy or sell will execute at, if the order is well formed."""
+    try:
+        order = json.loads(body)
+    except ValueError:
+        return
+    if not isinstance(order, dict):
+        return
+    try:
+        resolve_account(bearer_token(authorization), order.get("account_id"), trade=True)
+    except AccountAccessError:
+        return
+    symbol, shares = order.get("symbol"), order.get("shares")
+    if isinstance(symbol, str) and symbol and isinstance(shares, int) and shares > 0:
+        await stock_model.get_stock_entry_async(symbol, max_age=TRADE_QUOTE_MAX_AGE)
+
+
+# (method, path pattern, Flask rule used as the metrics label, prefetch, status when it fails)
+ROUTES: List[Tuple[str, re.Pattern, str, Prefetch, int]] = [
+    ("GET", re.compile(r"/api/stock/(?P<symbol>[^/]+)"), "/api/stock/<symbol>", _prefetch_quote, 404),
+    ("GET", re.compile(r"/api/stock/(?P<symbol>[^/]+)/history"), "/api/stock/<symbol>/history",
+     _prefetch_history, 404),
+    ("GET", re.compile(r"/api/stock/(?P<symbol>[^/]+)/intraday"), "/api/stock/<symbol>/intraday",
+     _prefetch_intraday, 404),
+    ("GET", re.compile(r"/api/stock/(?P<symbol>[^/]+)/company"), "/api/stock/<symbol>/company",
+     _prefetch_company, 404),
+    ("GET", re.compile(r"/api/portfolio"), "/api/portfolio", _prefetch_holdings, 500),
+    ("GET", re.compile(r"/api/portfolio/value"), "/api/portfolio/value", _prefetch_holdings, 500),
+    ("GET", re.compile(r"/api/portfolio/pnl"), "/api/portfolio/pnl", _prefetch_holdings, 500),
+    ("POST", re.compile(r"/api/portfolio/buy"), "/api/portfolio/buy", _prefetch_trade, 400),
+    ("POST", re.compile(r"/api/portfolio/sell"), "/api/portfolio/sell", _prefetch_trade, 400),
+]
+
+
+def match_route(method: str, path: str) -> Optional[Tuple[Dict[str, str], str, Prefetch, int]]:
+    for route_method, pattern, rule, prefetch, error_status in ROUTES:
+        if method == route_method:
+            match = pattern.fullmatch(path)
+            if match:
+                return match.groupdict(), rule, prefetch, error_status
+    return None
+
+
+async def send_json(send: Callable, status: int, payload: Dict[str, Any],
+                    headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def warm_caches_async() -> Dict[str, Any]:
+    """Async warm_caches: quotes and daily history for every held symbol, fetched concurrently."""
+    await asyncio.to_thread(backfill_ledger)
+    await asyncio.to_thread(symbol_model.ensure_loaded)
+    try:
+        symbols = await asyncio.to_thread(portfolio_model.get_held_symbols)
+    except Exception as e:
+        app.logger.error("Could not list held symbols for warm-up: %s", e)
+        symbols = []
+
+    async def warm(symbol: str) -> None:
+        await asyncio.gather(stock_model.get_stock_entry_async(symbol), stock_model.get_history_entry_async(symbol))
+
+    results = await asyncio.gather(*(warm(symbol) for symbol in symbols), return_exceptions=True)
+    warmed = [symbol for symbol, result in zip(symbols, results) if not isinstance(result, Exception)]
+    failed = [symbol for symbol, result in zip(symbols, results) if isinstance(result, Exception)]
+    app.logger.info("Cache warm-up complete: %d warmed, %d failed", len(warmed), len(failed))
+    readiness.set()
+    return {"warmed": warmed, "failed": failed}
+
+
+async def lifespan(receive: Callable, send: Callable) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await warm_caches_async()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await stock_model.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    start = time.perf_counter()
+    extras = {REQUEST_START_ENVIRON_KEY: start}
+    route = match_route(scope["method"], scope["path"])
+    if route is None:
+        await flask_app(scope, receive, send, environ_extras=extras)
+        return
+
+    path_params, rule, prefetch, error_status = route
+    body = await read_body(receive)
+    query = parse_qs(scope.get("query_string", b"").decode("latin1"))
+    authorization = next((value.decode("latin1") for name, value in scope.get("headers", [])
+                          if name.lower() == b"authorization"), None)
+    try:
+        await prefetch(path_params, query, body, authorization)
+    except CircuitOpenError as e:
+        # Same 503 and Retry-After as the Flask routes' upstream_unavailable
+        await send_json(send, 503, {"error": str(e)}, [(b"retry-after", e.retry_after_header.encode())])
+        HTTP_REQUEST_DURATION.labels(scope["method"], rule, 503).observe(time.perf_counter() - start)
+        return
+    except ValueError as e:
+        # Upstream had nothing for the symbol; answer as the Flask route would, without a second call
+        await send_json(send, error_status, {"error": str(e)})
+        HTTP_REQUEST_DURATION.labels(scope["method"], rule, error_status).observe(time.perf_counter() - start)
+        return
+    except Exception as e:
+        # Anything else (e.g. a database error) is left for the Flask handler to report
+        app.logger.warning("Prefetch for %s failed: %s", scope["path"], e)
+
+    await flask_app(scope, receive, send, body=body, environ_extras=extras)
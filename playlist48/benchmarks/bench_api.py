@@ -0,0 +1,256 @@
+"""
+Offline benchmark suite for the API hot paths.
+
+Runs the Flask app in-process (through its test client) against a temporary SQLite
+database (or in-memory databases with --storage memory) and the local fake market-data provider, and measures throughput and latency
+percentiles per route for a grid of portfolio sizes and concurrency levels:
+
+    python -m benchmarks.bench_api --sizes 10x5,50x20 --concurrency 1,8 --output results.json
+    python -m benchmarks.bench_api --baseline results.json   # exit 1 on regression
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from benchmarks.fake_market_data import FakeMarketDataServer
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "sql", "create_portfolio_table.sql")
+SCENARIOS = ("quote", "portfolio", "portfolio_value", "buy", "sell", "login")
+BENCH_USER = ("bench-user", "bench-password")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def parse_sizes(spec: str) -> List[Tuple[int, int]]:
+    """Parse "LOTSxSYMBOLS,..." into (lots per symbol, symbols) pairs."""
+    sizes = []
+    for part in spec.split(","):
+        lots, symbols = part.lower().split("x")
+        sizes.append((int(lots), int(symbols)))
+    return sizes
+
+
+def symbol_names(count: int) -> List[str]:
+    return [f"SYM{i:03d}" for i in range(count)]
+
+
+def seed_portfolio(storage, account_id: int, lots: int, symbols: int) -> None:
+    """Replace the account's portfolio with `lots` lots of 10 shares for each of `symbols` symbols."""
+    # Imported here: the app's configuration must be in the environment before its modules load
+    from music_collection.models.ledger_model import LedgerModel
+    from music_collection.models.portfolio_model import PortfolioModel
+
+    start = datetime.now() - timedelta(days=lots)
+    rows = [(account_id, symbol, 10, 100.0 + i, start + timedelta(days=i))
+            for symbol in symbol_names(symbols) for i in range(lots)]
+    with storage.account_connection(account_id, write=True) as conn:
+        conn.execute("DELETE FROM portfolio WHERE account_id = ?", (account_id,))
+        for table in ("transactions", "position_snapshot_rows", "position_snapshot_skipped"):
+            conn.execute(f"DELETE FROM {table} WHERE account_id = ?", (account_id,))
+        conn.executemany(
+            "INSERT INTO portfolio (account_id, symbol, shares, purchase_price, purchase_date) VALUES (?, ?, ?, ?, ?)",
+            rows)
+        # Matching buys, so the benchmark's sells replay against the ledger like real ones
+        cursor = conn.cursor()
+        for row in rows:
+            LedgerModel.append_transaction(cursor, row[0], row[1], "buy", row[2], row[3], row[4])
+        PortfolioModel.bump_version(conn.cursor(), account_id)
+        conn.commit()
+
+
+def make_request(client, scenario: str, symbols: List[str], i: int, account_id: int):
+    symbol = symbols[i % len(symbols)]
+    if scenario == "quote":
+        return client.get(f"/api/stock/{symbol}")
+    if scenario == "portfolio":
+        return client.get("/api/portfolio", query_string={"account_id": account_id})
+    if scenario == "portfolio_value":
+        return client.get("/api/portfolio/value", query_string={"account_id": account_id})
+    if scenario == "buy":
+        return client.post("/api/portfolio/buy", json={"account_id": account_id, "symbol": symbol, "shares": 1})
+    if scenario == "sell":
+        return client.post("/api/portfolio/sell", json={"account_id": account_id, "symbol": symbol, "shares": 1})
+    if scenario == "login":
+        return client.post("/api/login", json={"username": BENCH_USER[0], "password": BENCH_USER[1]})
+    raise ValueError(f"Unknown scenario {scenario}")
+
+
+def run_scenario(app, scenario: str, symbols: List[str], concurrency: int, requests: int, account_id: int,
+                 token: str) -> Dict:
+    """Issue `requests` requests split over `concurrency` threads and summarise latencies."""
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    per_thread = max(1, requests // concurrency)
+
+    def worker(offset: int):
+        client = app.test_client()
+        # Portfolio routes only serve the account the caller logged in as
+        client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+        local, local_errors = [], 0
+        for i in range(per_thread):
+            start = time.perf_counter()
+            response = make_request(client, scenario, symbols, offset + i, account_id)
+            local.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker, args=(n * per_thread,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(sizes, concurrency_levels, scenarios, requests: int, quote_ttl: float, backend: str = "file") -> Dict:
+    if backend == "file":
+        workdir = tempfile.mkdtemp(prefix="bench-")
+        db_path = os.path.join(workdir, "bench.db")
+        with sqlite3.connect(db_path) as conn, open(SCHEMA_PATH) as schema:
+            conn.executescript(schema.read())
+        os.environ["DB_PATH"] = db_path
+
+    with FakeMarketDataServer() as market:
+        # Configuration is read at import time, so set it before importing the app
+        os.environ["DB_BACKEND"] = backend
+        os.environ["ALPHA_VANTAGE_BASE_URL"] = market.url
+        os.environ["QUOTE_TTL"] = str(quote_ttl)
+        from app import app, stock_model, storage, user_model
+
+        # Per-connection INFO logging would dominate the timings
+        for name in list(logging.root.manager.loggerDict):
+            if name.startswith("music_collection"):
+                logging.getLogger(name).setLevel(logging.WARNING)
+
+        account_id = user_model.create_account(*BENCH_USER)["id"]
+        token = user_model.issue_token(account_id)
+        results = []
+        for lots, symbol_count in sizes:
+            symbols = symbol_names(symbol_count)
+            for concurrency in concurrency_levels:
+                for scenario in scenarios:
+                    seed_portfolio(storage, account_id, lots, symbol_count)
+                    stock_model.quote_cache.clear()
+                    calls_before = market.calls
+                    stats = run_scenario(app, scenario, symbols, concurrency, requests, account_id, token)
+                    stats.update({
+                        "scenario": scenario,
+                        "lots": lots,
+                        "symbols": symbol_count,
+                        "concurrency": concurrency,
+                        "upstream_calls": market.calls - calls_before,
+                    })
+                    results.append(stats)
+                    print(f"{scenario:16s} lots={lots:<5d} symbols={symbol_count:<4d} c={concurrency:<3d} "
+                          f"{stats['throughput_rps']:>9.1f} req/s  p50={stats['p50_ms']:.2f}ms  "
+                          f"p99={stats['p99_ms']:.2f}ms  errors={stats['errors']}")
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests_per_scenario": requests,
+            "quote_ttl": quote_ttl,
+            "storage": backend,
+        },
+        "results": results,
+    }
+
+
+def result_key(result: Dict) -> Tuple:
+    return result["scenario"], result["lots"], result["symbols"], result["concurrency"]
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return a description of every result that regressed beyond tolerance."""
+    previous = {result_key(r): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(result_key(result))
+        if before is None:
+            continue
+        if result["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{result_key(result)} p50 {before['p50_ms']}ms -> {result['p50_ms']}ms")
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{result_key(result)} throughput {before['throughput_rps']} -> {result['throughput_rps']} req/s")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the API hot paths offline.")
+    parser.add_argument("--sizes", default="10x5,100x20", help="Portfolio sizes as LOTSxSYMBOLS,...")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated thread counts")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario run")
+    parser.add_argument("--quote-ttl", type=float, default=15.0, help="Quote cache TTL; 0 disables caching")
+    parser.add_argument("--storage", choices=("file", "memory"), default="file",
+                        help="SQLite files in a temporary directory, or in-memory databases (no disk I/O)")
+    parser.add_argument("--output", default=f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args(argv)
+
+    results = run_suite(
+        parse_sizes(args.sizes),
+        [int(c) for c in args.concurrency.split(",")],
+        [s for s in args.scenarios.split(",") if s],
+        args.requests,
+        args.quote_ttl,
+        args.storage,
+    )
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+Local stand-in for the Alpha Vantage query endpoint.
+
+Serves deterministic GLOBAL_QUOTE, TIME_SERIES_DAILY, TIME_SERIES_INTRADAY, OVERVIEW and
+CURRENCY_EXCHANGE_RATE (from the bundled stub rate table) responses, and a
+LISTING_STATUS CSV, so the app can be exercised without network access or API quota:
+
+    python -m benchmarks.fake_market_data --port 8765
+    ALPHA_VANTAGE_BASE_URL=http://127.0.0.1:8765/query python app.py
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def base_price(symbol: str) -> float:
+    """Stable pseudo-random price between 10 and 510 for a symbol."""
+    digest = hashlib.md5(symbol.upper().encode()).digest()
+    return 10 + int.from_bytes(digest[:4], "big") % 50000 / 100
+
+
+def global_quote(symbol: str) -> dict:
+    price = base_price(symbol)
+    return {"Global Quote": {
+        "01. symbol": symbol.upper(),
+        "05. price": f"{price:.4f}",
+        "06. volume": "1000000",
+        "07. latest trading day": date.today().isoformat(),
+        "08. previous close": f"{price * 0.99:.4f}",
+        "09. change": f"{price * 0.01:.4f}",
+        "10. change percent": "1.0101%"
+    }}
+
+
+def daily_series(symbol: str, days: int = 100) -> dict:
+    price = base_price(symbol)
+    series = {}
+    day = date.today()
+    for i in range(days):
+        day -= timedelta(days=1)
+        while day.weekday() >= 5:
+            day -= timedelta(days=1)
+        # Small deterministic oscillation around the base price
+        close = price * (1 + 0.02 * ((i * 7919 + len(symbol)) % 11 - 5) / 5)
+        series[day.isoformat()] = {
+            "1. open": f"{close * 0.995:.4f}",
+            "2. high": f"{close * 1.01:.4f}",
+            "3. low": f"{close * 0.99:.4f}",
+            "4. close": f"{close:.4f}",
+            "5. volume": str(100000 + i)
+        }
+    return {"Meta Data": {"2. Symbol": symbol.upper()}, "Time Series (Daily)": series}
+
+
+def intraday_series(symbol: str, minutes: int = 100) -> dict:
+    """The latest `minutes` 1-minute bars, ending at the current minute."""
+    price = base_price(symbol)
+    series = {}
+    now = datetime.now().replace(second=0, microsecond=0)
+    for i in range(minutes):
+        close = price * (1 + 0.001 * ((i * 7919 + len(symbol)) % 11 - 5) / 5)
+        series[(now - timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S")] = {
+            "1. open": f"{close * 0.9995:.4f}",
+            "2. high": f"{close * 1.001:.4f}",
+            "3. low": f"{close * 0.999:.4f}",
+            "4. close": f"{close:.4f}",
+            "5. volume": str(1000 + i)
+        }
+    return {"Meta Data": {"2. Symbol": symbol.upper(), "4. Interval": "1min"}, "Time Series (1min)": series}
+
+
+def overview(symbol: str) -> dict:
+    return {
+        "Symbol": symbol.upper(),
+        "Name": f"{symbol.upper()} Corp",
+        "Description": "Synthetic company served by the fake market-data provider.",
+        "Exchange": "NASDAQ",
+        "Currency": "USD",
+        "Country": "USA",
+        "Sector": "TECHNOLOGY",
+        "Industry": "SOFTWARE",
+        "MarketCapitalization": "1000000000",
+        "PERatio": "20.0",
+        "DividendYield": "0.01",
+        "52WeekHigh": f"{base_price(symbol) * 1.2:.2f}",
+        "52WeekLow": f"{base_price(symbol) * 0.8:.2f}"
+    }
+
+
+LISTING_FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               "music_collection", "data", "listing_status.csv")
+FX_FIXTURE = os.path.join(os.path.dirname(LISTING_FIXTURE), "fx_rates.json")
+
+
+def exchange_rate(from_currency: str, to_currency: str) -> dict:
+    """Cross rate from the bundled table of units per US dollar."""
+    with open(FX_FIXTURE) as fixture:
+        rates = json.load(fixture)["rates"]
+    from_currency, to_currency = from_currency.upper(), to_currency.upper()
+    if from_currency not in rates or to_currency not in rates:
+        return {"Error Message": "Invalid API call. Please retry or visit the documentation for CURRENCY_EXCHANGE_RATE."}
+    rate = rates[to_currency] / rates[from_currency]
+    return {
+        "Realtime Currency Exchange Rate": {
+            "1. From_Currency Code": from_currency,
+            "3. To_Currency Code": to_currency,
+            "5. Exchange Rate": f"{rate:.6f}",
+            "6. Last Refreshed": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+            "7. Time Zone": "UTC",
+        }
+    }
+
+
+def listing_status() -> str:
+    """The bundled listing plus the synthetic SYMnnn symbols the benchmarks trade."""
+    with open(LISTING_FIXTURE) as fixture:
+        text = fixture.read()
+    synthetic = "".join(f"SYM{i:03d},Synthetic {i:03d} Corp,NASDAQ,Stock,2000-01-03,null,Active\n"
+                        for i in range(1000))
+    return text + synthetic
+
+
+RESPONSES = {
+    "GLOBAL_QUOTE": global_quote,
+    "TIME_SERIES_DAILY": daily_series,
+    "TIME_SERIES_INTRADAY": intraday_series,
+    "OVERVIEW": overview,
+}
+
+
+class FakeAlphaVantageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        function = query.get("function", [""])[0]
+        symbol = query.get("symbol", ["IBM"])[0]
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        self.server.calls += 1
+        if function == "LISTING_STATUS":
+            payload, content_type = listing_status().encode(), "text/csv"
+        elif function == "CURRENCY_EXCHANGE_RATE":
+            body = exchange_rate(query.get("from_currency", ["USD"])[0], query.get("to_currency", ["USD"])[0])
+            payload, content_type = json.dumps(body).encode(), "application/json"
+        else:
+            handler = RESPONSES.get(function)
+            body = handler(symbol) if handler else {"Error Message": f"Unknown function {function}"}
+            payload, content_type = json.dumps(body).encode(), "application/json"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeMarketDataServer:
+    """Runs the fake provider on a background thread; usable as a context manager."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.httpd = ThreadingHTTPServer((host, port), FakeAlphaVantageHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.calls = 0
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/query"
+
+    @property
+    def calls(self) -> int:
+        return self.httpd.calls
+
+    def start(self) -> "FakeMarketDataServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve fake Alpha Vantage responses.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to delay every response")
+    args = parser.parse_args()
+
+    server = FakeMarketDataServer(args.host, args.port, args.latency)
+    print(f"Fake market data at {server.url}")
+    server.httpd.serve_forever()
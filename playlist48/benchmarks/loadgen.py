@@ -0,0 +1,249 @@
+"""
+Open-loop load generator that replays the smoketest.sh flows against a running server.
+
+Virtual users arrive at a target rate (Poisson arrivals) regardless of how fast the
+server answers, and each one runs a weighted, randomly chosen scenario. Latency is
+measured from the time a request was *scheduled* to start, so queueing behind a slow
+server shows up in the percentiles instead of being hidden by coordinated omission.
+
+    python -m benchmarks.loadgen --base-url http://localhost:6000/api --rate 5,10,20,40 --duration 30
+
+Each comma-separated rate is run as its own step, so the step at which error rates
+(SQLite "database is locked", upstream rate limits, ...) or p99 climb is easy to spot.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from benchmarks.bench_api import percentile
+
+
+DEFAULT_WEIGHTS = {"browse": 5, "portfolio": 3, "trade": 2, "account": 1}
+
+
+class RouteStats:
+    """Latency samples and outcome counts for one route."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.statuses: Dict[str, int] = defaultdict(int)
+
+    def summary(self) -> Dict:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p90_ms": round(percentile(latencies, 90) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            "statuses": dict(self.statuses),
+        }
+
+
+class Recorder:
+    def __init__(self):
+        self.routes: Dict[str, RouteStats] = defaultdict(RouteStats)
+        self._lock = threading.Lock()
+
+    def record(self, route: str, latency: float, status: str, ok: bool) -> None:
+        with self._lock:
+            stats = self.routes[route]
+            stats.latencies.append(latency)
+            stats.statuses[status] += 1
+            if not ok:
+                stats.errors += 1
+
+
+class VirtualUser:
+    """Runs one scenario, timing each request from its scheduled start."""
+
+    def __init__(self, base_url: str, session: requests.Session, recorder: Recorder,
+                 symbols: List[str], timeout: float, account: Tuple[int, str]):
+        self.base_url = base_url
+        self.session = session
+        self.recorder = recorder
+        self.symbols = symbols
+        self.timeout = timeout
+        self.account_id, token = account
+        self.auth = {"Authorization": f"Bearer {token}"}
+
+    def call(self, route: str, method: str, path: str, scheduled: float, body: Optional[Dict] = None,
+             expect: Tuple[int, ...] = (200, 201), headers: Optional[Dict[str, str]] = None) -> bool:
+        try:
+            response = self.session.request(method, self.base_url + path, json=body, headers=headers,
+                                            timeout=self.timeout)
+            status, ok = str(response.status_code), response.status_code in expect
+        except requests.exceptions.Timeout:
+            status, ok = "timeout", False
+        except requests.exceptions.RequestException:
+            status, ok = "connection_error", False
+        self.recorder.record(route, time.perf_counter() - scheduled, status, ok)
+        return ok
+
+    # Each scenario mirrors a section of smoketest.sh. Only the first request carries
+    # the scheduled (possibly already late) start; later steps start when issued.
+
+    def browse(self, scheduled: float) -> None:
+        symbol = random.choice(self.symbols)
+        self.call("GET /health", "GET", "/health", scheduled)
+        self.call("GET /stock/<symbol>", "GET", f"/stock/{symbol}", time.perf_counter())
+        self.call("GET /stock/<symbol>/history", "GET", f"/stock/{symbol}/history", time.perf_counter())
+
+    def portfolio(self, scheduled: float) -> None:
+        account = f"?account_id={self.account_id}"
+        self.call("GET /portfolio", "GET", "/portfolio" + account, scheduled, headers=self.auth)
+        self.call("GET /portfolio/value", "GET", "/portfolio/value" + account, time.perf_counter(), headers=self.auth)
+
+    def trade(self, scheduled: float) -> None:
+        symbol = random.choice(self.symbols)
+        if self.call("POST /portfolio/buy", "POST", "/portfolio/buy", scheduled,
+                     {"account_id": self.account_id, "symbol": symbol, "shares": 2}, headers=self.auth):
+            self.call("GET /portfolio", "GET", f"/portfolio?account_id={self.account_id}", time.perf_counter(),
+                      headers=self.auth)
+            self.call("POST /portfolio/sell", "POST", "/portfolio/sell", time.perf_counter(),
+                      {"account_id": self.account_id, "symbol": symbol, "shares": 1}, headers=self.auth)
+
+    def account(self, scheduled: float) -> None:
+        username = f"load-{uuid.uuid4().hex[:12]}"
+        password = "loadtest-password"
+        if self.call("POST /create-account", "POST", "/create-account", scheduled,
+                     {"username": username, "password": password}):
+            self.call("POST /login", "POST", "/login", time.perf_counter(),
+                      {"username": username, "password": password})
+            self.call("POST /update-password", "POST", "/update-password", time.perf_counter(),
+                      {"username": username, "current_password": password, "new_password": password + "2"})
+
+
+def parse_weights(spec: Optional[str]) -> Dict[str, int]:
+    if not spec:
+        return dict(DEFAULT_WEIGHTS)
+    weights = {}
+    for part in spec.split(","):
+        name, weight = part.split("=")
+        if name not in DEFAULT_WEIGHTS:
+            raise ValueError(f"Unknown scenario {name}; choose from {sorted(DEFAULT_WEIGHTS)}")
+        weights[name] = int(weight)
+    return weights
+
+
+def create_trading_accounts(base_url: str, count: int, timeout: float) -> List[Tuple[int, str]]:
+    """Create and log in to the accounts the portfolio and trade scenarios act on, spread over the shards."""
+    accounts = []
+    for _ in range(count):
+        credentials = {"username": f"load-trader-{uuid.uuid4().hex[:12]}", "password": "loadtest-password"}
+        requests.post(base_url + "/create-account", json=credentials, timeout=timeout).raise_for_status()
+        response = requests.post(base_url + "/login", json=credentials, timeout=timeout)
+        response.raise_for_status()
+        accounts.append((response.json()["id"], response.json()["token"]))
+    return accounts
+
+
+def arrival_offsets(rate: float, duration: float, rng: random.Random = random) -> Iterator[float]:
+    """Scheduled start of each scenario in seconds from the step's start: Poisson arrivals at `rate`/s."""
+    offset = 0.0
+    while offset < duration:
+        yield offset
+        offset += rng.expovariate(rate)
+
+
+def run_step(base_url: str, rate: float, duration: float, weights: Dict[str, int], symbols: List[str],
+             max_workers: int, timeout: float, accounts: List[Tuple[int, str]]) -> Dict:
+    """Generate Poisson arrivals at `rate` scenarios/second for `duration` seconds."""
+    recorder = Recorder()
+    local = threading.local()
+    names = list(weights)
+    weight_values = [weights[name] for name in names]
+    late_starts = [0]
+
+    def run(scenario: str, scheduled: float) -> None:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        user = VirtualUser(base_url, local.session, recorder, symbols, timeout, random.choice(accounts))
+        getattr(user, scenario)(scheduled)
+
+    started = time.perf_counter()
+    arrivals = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for offset in arrival_offsets(rate, duration):
+            scheduled = started + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -0.01:
+                late_starts[0] += 1
+            scenario = random.choices(names, weight_values)[0]
+            # The intended start time is passed along, not the time a worker picks it up
+            pool.submit(run, scenario, scheduled)
+            arrivals += 1
+    elapsed = time.perf_counter() - started
+
+    routes = {route: stats.summary() for route, stats in sorted(recorder.routes.items())}
+    total = sum(r["requests"] for r in routes.values())
+    errors = sum(r["errors"] for r in routes.values())
+    return {
+        "target_rate": rate,
+        "arrivals": arrivals,
+        "achieved_rate": round(arrivals / duration, 2),
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "generator_late_starts": late_starts[0],
+        "routes": routes,
+    }
+
+
+def print_step(step: Dict) -> None:
+    print(f"\n=== rate {step['target_rate']}/s: {step['arrivals']} scenarios, {step['requests']} requests, "
+          f"error rate {step['error_rate']:.2%} (drained in {step['elapsed_s']}s) ===")
+    print(f"{'route':32s} {'n':>6s} {'err%':>7s} {'p50':>9s} {'p90':>9s} {'p99':>9s} {'max':>9s}")
+    for route, stats in step["routes"].items():
+        print(f"{route:32s} {stats['requests']:>6d} {stats['error_rate']:>7.2%} {stats['p50_ms']:>7.1f}ms "
+              f"{stats['p90_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms {stats['max_ms']:>7.1f}ms")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay smoketest flows as open-loop load.")
+    parser.add_argument("--base-url", default="http://localhost:6000/api")
+    parser.add_argument("--rate", default="5", help="Scenario arrivals per second; comma-separate to step up")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per rate step")
+    parser.add_argument("--weights", help="Scenario weights, e.g. browse=5,portfolio=3,trade=2,account=1")
+    parser.add_argument("--symbols", default="AAPL,GOOGL")
+    parser.add_argument("--accounts", type=int, default=8, help="Accounts the portfolio and trade scenarios use")
+    parser.add_argument("--max-workers", type=int, default=256, help="Upper bound on in-flight scenarios")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    weights = parse_weights(args.weights)
+    symbols = args.symbols.split(",")
+    accounts = create_trading_accounts(args.base_url, args.accounts, args.timeout)
+    steps = []
+    for rate in (float(r) for r in args.rate.split(",")):
+        step = run_step(args.base_url, rate, args.duration, weights, symbols, args.max_workers, args.timeout,
+                        accounts)
+        print_step(step)
+        steps.append(step)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"base_url": args.base_url, "weights": weights, "steps": steps}, f, indent=2)
+        print(f"\nWrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,5 +13,12 @@ else
     echo "Skipping database creation."
 fi
 
-# Start the Python application
-exec python app.py
+# Start the Python application: gunicorn by default, the Flask debug server when APP_MODE=dev,
+# uvicorn serving the ASGI entry point when APP_MODE=asgi
+if [ "$APP_MODE" = "dev" ]; then
+    exec python app.py
+elif [ "$APP_MODE" = "asgi" ]; then
+    exec uvicorn asgi:application --host 0.0.0.0 --port ${PORT:-6000} --workers ${WEB_CONCURRENCY:-1}
+else
+    exec gunicorn -c gunicorn.conf.py app:app
+fi
@@ -0,0 +1,37 @@
+# Gunicorn configuration for serving app:app in production.
+#
+#   gunicorn -c gunicorn.conf.py app:app
+#
+# The app is imported once in the master (preload_app) and its market-data caches are
+# warmed there before any worker is forked, so every worker starts with warm caches and
+# the Alpha Vantage quota is spent once rather than once per worker.
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '6000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    """Warm the caches in the master once the app is preloaded, before workers fork."""
+    from app import warm_caches
+
+    result = warm_caches()
+    server.log.info("Warmed caches for %d symbols (%d failed)", len(result["warmed"]), len(result["failed"]))
+
+
+def post_worker_init(worker):
+    """Warm the worker's own caches if it did not inherit them (e.g. preload disabled)."""
+    from app import readiness, warm_caches
+
+    if not readiness.is_set():
+        warm_caches()
@@ -0,0 +1,397 @@
+from bisect import bisect_left, bisect_right
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from music_collection.utils.logger import configure_logger
+from music_collection.utils.sql_utils import Storage, default_storage
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+DIRECTIONS = ("above", "below")
+# Seconds between checks of alerts_version; a change made by another process is picked up
+# within this delay
+ALERTS_SYNC_INTERVAL = float(os.getenv("ALERTS_SYNC_INTERVAL", "0.1"))
+# Versions of the alerts change log kept; a process further behind reloads every alert
+ALERTS_CHANGES_KEPT = int(os.getenv("ALERTS_CHANGES_KEPT", "10000"))
+
+
+class _SortedAlerts:
+    """Alert thresholds for one symbol and direction, kept sorted with their ids alongside."""
+
+    __slots__ = ("thresholds", "ids")
+
+    def __init__(self):
+        self.thresholds: List[float] = []
+        self.ids: List[int] = []
+
+    def add(self, threshold: float, alert_id: int) -> None:
+        i = bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(i, threshold)
+        self.ids.insert(i, alert_id)
+
+    def remove(self, threshold: float, alert_id: int) -> bool:
+        i = bisect_left(self.thresholds, threshold)
+        hi = bisect_right(self.thresholds, threshold)
+        for j in range(i, hi):
+            if self.ids[j] == alert_id:
+                del self.thresholds[j]
+                del self.ids[j]
+                return True
+        return False
+
+    def pop_range(self, lo: int, hi: int) -> List[Tuple[int, float]]:
+        """Remove and return (id, threshold) pairs in positions [lo, hi)."""
+        fired = list(zip(self.ids[lo:hi], self.thresholds[lo:hi]))
+        del self.thresholds[lo:hi]
+        del self.ids[lo:hi]
+        return fired
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class AlertModel:
+    """
+    Price alerts ("notify when AAPL crosses 200") evaluated against every new quote.
+
+    Active alerts are stored in SQLite and mirrored in memory as per-symbol sorted arrays,
+    one for upward and one for downward crossings. A new quote finds every alert crossed
+    between the previous and the new price with two binary searches (O(log n)); removing
+    fired alerts and inserting new ones shifts the symbol's arrays, O(n) in the worst case
+    but a memmove rather than a scan of the whole table.
+
+    Every change to the alerts table bumps alerts_version and logs the alerts it touched
+    in alerts_changes, in the same transaction. Each process checks the version at most
+    once per sync interval and replays the changes made since by other processes (e.g.
+    other pre-forked workers) onto its arrays. Firing is conditional on the alert still
+    being active, so a crossing seen by several processes is reported once.
+    """
+
+    def __init__(self, storage: Optional[Storage] = None, sync_interval: float = ALERTS_SYNC_INTERVAL):
+        self.storage = storage or default_storage()
+        self.sync_interval = sync_interval
+        self._above: Dict[str, _SortedAlerts] = {}
+        self._below: Dict[str, _SortedAlerts] = {}
+        self._index: Dict[int, Tuple[str, str, float]] = {}
+        self._last_price: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        # alerts_version the arrays reflect; None until loaded
+        self._version: Optional[int] = None
+        # When the version was last checked; None forces a check on next use
+        self._checked_at: Optional[float] = None
+
+    def _ensure_loaded(self) -> None:
+        """
+        Bring the arrays up to date with the alerts table, checking at most once per sync interval.
+
+        Changes made since the arrays' version are replayed from alerts_changes; every
+        active alert is reloaded only on first use or when the log no longer reaches back
+        that far.
+        """
+        now = time.monotonic()
+        with self._lock:
+            base = self._version
+            if base is not None and self._checked_at is not None and now - self._checked_at < self.sync_interval:
+                return
+            self._checked_at = now
+
+        changes = None
+        try:
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT version FROM alerts_version WHERE id = 1")
+                row = cursor.fetchone()
+                version = row[0] if row else 0
+                if version == base:
+                    return
+                if base is not None:
+                    cursor.execute(
+                        "SELECT c.version, c.alert_id, c.operation, a.symbol, a.direction, a.threshold "
+                        "FROM alerts_changes AS c LEFT JOIN alerts AS a ON a.id = c.alert_id "
+                        "WHERE c.version > ? ORDER BY c.version, c.alert_id",
+                        (base,)
+                    )
+                    changes = cursor.fetchall()
+                    # Every version logs at least one row, so the log is complete when it
+                    # starts right after the arrays' version
+                    if not changes or changes[0][0] != base + 1:
+                        changes = None
+                if changes is None:
+                    # Rows read after the version are at least that new; replaying a change
+                    # already reflected in them is a no-op
+                    cursor.execute(
+                        "SELECT id, symbol, direction, threshold FROM alerts "
+                        "WHERE triggered_at IS NULL ORDER BY threshold, id"
+                    )
+                    rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            raise ValueError(f"Failed to load alerts: {str(e)}")
+
+        if changes is not None:
+            with self._lock:
+                if self._version != base:
+                    # Another thread caught up first
+                    return
+                for _, alert_id, operation, symbol, direction, threshold in changes:
+                    if operation != "create":
+                        self._discard(alert_id)
+                    elif symbol is not None and alert_id not in self._index:
+                        # Created alerts already deleted again have no row left
+                        self._insert(alert_id, symbol, direction, threshold)
+                self._version = changes[-1][0]
+            logger.debug("Applied %d alert changes (version %d)", len(changes), changes[-1][0])
+            return
+
+        above: Dict[str, _SortedAlerts] = {}
+        below: Dict[str, _SortedAlerts] = {}
+        index: Dict[int, Tuple[str, str, float]] = {}
+        # Rows arrive sorted by threshold, so appending keeps every array sorted
+        for alert_id, symbol, direction, threshold in rows:
+            alerts = (above if direction == "above" else below).setdefault(symbol, _SortedAlerts())
+            alerts.thresholds.append(threshold)
+            alerts.ids.append(alert_id)
+            index[alert_id] = (symbol, direction, threshold)
+        with self._lock:
+            self._above, self._below, self._index = above, below, index
+            self._version = version
+        logger.info("Loaded %d active alerts (version %d)", len(rows), version)
+
+    @staticmethod
+    def _record(cursor: sqlite3.Cursor, operation: str, alert_ids: List[int]) -> int:
+        """
+        Bump alerts_version and log the changed alerts under the new version; call inside the
+        changing transaction. Returns the new version.
+        """
+        cursor.execute("UPDATE alerts_version SET version = version + 1 WHERE id = 1")
+        cursor.execute("SELECT version FROM alerts_version WHERE id = 1")
+        version = cursor.fetchone()[0]
+        cursor.executemany(
+            "INSERT INTO alerts_changes (version, alert_id, operation) VALUES (?, ?, ?)",
+            [(version, alert_id, operation) for alert_id in alert_ids]
+        )
+        cursor.execute("DELETE FROM alerts_changes WHERE version <= ?", (version - ALERTS_CHANGES_KEPT,))
+        return version
+
+    def _advance(self, version: int) -> bool:
+        """
+        Whether this process's own change can be applied to the arrays in place: true when
+        no other process changed the table in between. Otherwise the next check, made on
+        next use, replays both from the change log. Call with the lock held.
+        """
+        if self._version is not None and version == self._version + 1:
+            self._version = version
+            return True
+        self._checked_at = None
+        return False
+
+    def _book(self, direction: str) -> Dict[str, _SortedAlerts]:
+        return self._above if direction == "above" else self._below
+
+    def _insert(self, alert_id: int, symbol: str, direction: str, threshold: float) -> None:
+        self._book(direction).setdefault(symbol, _SortedAlerts()).add(threshold, alert_id)
+        self._index[alert_id] = (symbol, direction, threshold)
+
+    def _discard(self, alert_id: int) -> None:
+        entry = self._index.pop(alert_id, None)
+        if entry is not None:
+            symbol, direction, threshold = entry
+            self._book(direction)[symbol].remove(threshold, alert_id)
+
+    def create_alert(self, symbol: str, direction: str, threshold: float) -> Dict[str, Any]:
+        """
+        Register an alert that fires when the price crosses threshold in the given direction.
+
+        Args:
+            symbol (str): The stock symbol to watch.
+            direction (str): "above" for upward crossings, "below" for downward ones.
+            threshold (float): The price level.
+
+        Returns:
+            Dict describing the new alert.
+        """
+        if not symbol or not isinstance(symbol, str):
+            raise ValueError("Invalid symbol provided")
+        if direction not in DIRECTIONS:
+            raise ValueError("Direction must be 'above' or 'below'")
+        if isinstance(threshold, bool) or not isinstance(threshold, (int, float)) or threshold <= 0:
+            raise ValueError("Threshold must be a positive number")
+
+        self._ensure_loaded()
+        symbol = symbol.upper()
+        threshold = float(threshold)
+        created_at = datetime.now()
+        try:
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO alerts (symbol, direction, threshold, created_at) VALUES (?, ?, ?, ?)",
+                    (symbol, direction, threshold, created_at)
+                )
+                alert_id = cursor.lastrowid
+                version = self._record(cursor, "create", [alert_id])
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Database error: {str(e)}")
+            raise ValueError("Failed to create alert")
+
+        with self._lock:
+            if self._advance(version):
+                self._insert(alert_id, symbol, direction, threshold)
+
+        return {
+            "id": alert_id,
+            "symbol": symbol,
+            "direction": direction,
+            "threshold": threshold,
+            "created_at": created_at.isoformat()
+        }
+
+    def delete_alert(self, alert_id: int) -> Dict[str, Any]:
+        """Remove an alert, whether active or already triggered."""
+        self._ensure_loaded()
+        try:
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM alerts WHERE id = ?", (alert_id,))
+                deleted = cursor.rowcount
+                version = self._record(cursor, "delete", [alert_id]) if deleted else None
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Database error: {str(e)}")
+            raise ValueError("Failed to delete alert")
+
+        if not deleted:
+            raise ValueError(f"Alert {alert_id} not found")
+
+        with self._lock:
+            if self._advance(version):
+                self._discard(alert_id)
+
+        return {"id": alert_id, "message": "Alert deleted"}
+
+    def get_alerts(self, symbol: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List alerts, optionally filtered by symbol and status ("active" or "triggered")."""
+        query = "SELECT id, symbol, direction, threshold, created_at, triggered_at, triggered_price FROM alerts"
+        clauses, params = [], []
+        if symbol:
+            clauses.append("symbol = ?")
+            params.append(symbol.upper())
+        if status == "active":
+            clauses.append("triggered_at IS NULL")
+        elif status == "triggered":
+            clauses.append("triggered_at IS NOT NULL")
+        elif status is not None:
+            raise ValueError("Status must be 'active' or 'triggered'")
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY id"
+
+        try:
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+
+        return [{
+            "id": alert_id,
+            "symbol": alert_symbol,
+            "direction": direction,
+            "threshold": threshold,
+            "created_at": created_at,
+            "triggered_at": triggered_at,
+            "triggered_price": triggered_price
+        } for alert_id, alert_symbol, direction, threshold, created_at, triggered_at, triggered_price in rows]
+
+    def evaluate(self, symbol: str, price: float) -> List[Dict[str, Any]]:
+        """
+        Fire every alert for symbol crossed between the previous price and price.
+
+        The first price seen for a symbol only sets the baseline.
+
+        Returns:
+            List of the alerts that fired.
+        """
+        self._ensure_loaded()
+        symbol = symbol.upper()
+        fired: List[Tuple[int, str, float]] = []
+
+        with self._lock:
+            previous = self._last_price.get(symbol)
+            self._last_price[symbol] = price
+            if previous is None or previous == price:
+                return []
+
+            if price > previous:
+                alerts = self._above.get(symbol)
+                if alerts:
+                    # Upward crossing: previous < threshold <= price
+                    lo = bisect_right(alerts.thresholds, previous)
+                    hi = bisect_right(alerts.thresholds, price)
+                    fired = [(alert_id, "above", threshold) for alert_id, threshold in alerts.pop_range(lo, hi)]
+            else:
+                alerts = self._below.get(symbol)
+                if alerts:
+                    # Downward crossing: price <= threshold < previous
+                    lo = bisect_left(alerts.thresholds, price)
+                    hi = bisect_left(alerts.thresholds, previous)
+                    fired = [(alert_id, "below", threshold) for alert_id, threshold in alerts.pop_range(lo, hi)]
+
+            for alert_id, _, _ in fired:
+                self._index.pop(alert_id, None)
+
+        if not fired:
+            return []
+
+        triggered_at = datetime.now()
+        recorded: List[Tuple[int, str, float]] = []
+        try:
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                for alert in fired:
+                    # Only the first process to see the crossing records (and reports) it
+                    cursor.execute(
+                        "UPDATE alerts SET triggered_at = ?, triggered_price = ? "
+                        "WHERE id = ? AND triggered_at IS NULL",
+                        (triggered_at, price, alert[0])
+                    )
+                    if cursor.rowcount == 1:
+                        recorded.append(alert)
+                version = self._record(cursor, "trigger", [alert[0] for alert in recorded]) if recorded else None
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error("Failed to record %d triggered alerts: %s", len(fired), e)
+            return []
+
+        # The popped alerts are already gone from the arrays, so only the version moves
+        if version is not None:
+            with self._lock:
+                self._advance(version)
+        fired = recorded
+        if not fired:
+            return []
+
+        logger.info("%d alerts fired for %s at %s", len(fired), symbol, price)
+        return [{
+            "id": alert_id,
+            "symbol": symbol,
+            "direction": direction,
+            "threshold": threshold,
+            "triggered_price": price,
+            "triggered_at": triggered_at.isoformat()
+        } for alert_id, direction, threshold in fired]
+
+    def on_quote(self, symbol: str, quote: Dict[str, Any]) -> None:
+        """StockModel quote listener: evaluate alerts against the new price."""
+        price = quote.get("price")
+        if price:
+            self.evaluate(symbol, price)
@@ -0,0 +1,221 @@
+import itertools
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from music_collection.models.history_model import HistoryModel
+from music_collection.utils.backtest_utils import STRATEGIES, BacktestTask, run_tasks
+from music_collection.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# Worker processes backtests fan out to; 0 or 1 runs everything in the request's process
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", str(min(os.cpu_count() or 1, 8))))
+# Smaller requests run in-process, where pickling the data would cost more than it saves
+BACKTEST_PARALLEL_MIN_RUNS = int(os.getenv("BACKTEST_PARALLEL_MIN_RUNS", "16"))
+# Most symbol x parameter-set runs one request may ask for
+MAX_BACKTEST_RUNS = int(os.getenv("MAX_BACKTEST_RUNS", "5000"))
+MAX_BACKTEST_SYMBOLS = 500
+
+
+class BacktestModel:
+    """
+    Backtests of simple long-only trading rules over locally stored daily closes.
+
+    A request names symbols, a strategy whose parameters may be lists (a grid), position
+    sizing and trading costs. Closes for every symbol are loaded in one query, and each
+    symbol x parameter-set run is simulated with NumPy (see backtest_utils.backtest).
+    Large requests are split into chunks and run on a pool of worker processes, which is
+    created on first use and kept for later requests.
+    """
+
+    def __init__(self, history_model: HistoryModel, workers: int = BACKTEST_WORKERS,
+                 parallel_min_runs: int = BACKTEST_PARALLEL_MIN_RUNS):
+        self.history_model = history_model
+        self.workers = workers
+        self.parallel_min_runs = parallel_min_runs
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def run(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a backtest spec.
+
+        Args:
+            spec (Dict): symbols, strategy ({"type": ..., parameters}), sizing
+                ({"type": "shares", "shares": n} or {"type": "notional", "amount": x}),
+                costs ({"commission": x, "slippage_bps": y}), and optionally start, end,
+                initial_cash, include_curves and refresh.
+
+        Returns:
+            Dict with one result per symbol and parameter set, and the symbols without history.
+
+        Raises:
+            ValueError: If the spec is invalid or no symbol has enough stored history.
+        """
+        symbols = sorted({str(s).strip().upper() for s in spec.get("symbols") or [] if str(s).strip()})
+        if not symbols:
+            raise ValueError("At least one symbol is required")
+        if len(symbols) > MAX_BACKTEST_SYMBOLS:
+            raise ValueError(f"At most {MAX_BACKTEST_SYMBOLS} symbols can be backtested at once")
+        strategies = expand_strategy(spec.get("strategy") or {}, MAX_BACKTEST_RUNS // len(symbols))
+        sizing = parse_sizing(spec.get("sizing") or {"type": "notional", "amount": 10000})
+        costs = parse_costs(spec.get("costs") or {})
+        initial_cash = _number(spec.get("initial_cash", 100000), "initial_cash")
+        if initial_cash <= 0:
+            raise ValueError("initial_cash must be positive")
+        include_curves = bool(spec.get("include_curves", True))
+
+        if spec.get("refresh"):
+            self.history_model.ensure_history(symbols)
+        closes = self.history_model.load_closes(symbols, spec.get("start"), spec.get("end"))
+
+        tasks: List[BacktestTask] = []
+        missing = []
+        for symbol in symbols:
+            series = closes[symbol].dropna() if symbol in closes else None
+            if series is None or len(series) < 2:
+                missing.append(symbol)
+                continue
+            dates = [date.date().isoformat() for date in series.index]
+            tasks.append((symbol, dates, series.to_numpy(dtype=np.float64), strategies, sizing, costs,
+                          initial_cash, include_curves))
+        if not tasks:
+            raise ValueError("No stored history for the requested symbols and dates")
+
+        return {
+            "runs": self._execute(tasks, len(tasks) * len(strategies)),
+            "missing_symbols": missing
+        }
+
+    def _execute(self, tasks: List[BacktestTask], runs: int) -> List[Dict[str, Any]]:
+        if self.workers <= 1 or runs < self.parallel_min_runs:
+            return run_tasks(tasks)
+
+        # Split each symbol's parameter grid so a few symbols with a large grid still spread out
+        per_chunk = max(1, math.ceil(runs / (self.workers * 4)))
+        chunks: List[List[BacktestTask]] = []
+        current: List[BacktestTask] = []
+        size = 0
+        for symbol, dates, prices, strategies, *rest in tasks:
+            for i in range(0, len(strategies), per_chunk):
+                part = strategies[i:i + per_chunk]
+                current.append((symbol, dates, prices, part, *rest))
+                size += len(part)
+                if size >= per_chunk:
+                    chunks.append(current)
+                    current, size = [], 0
+        if current:
+            chunks.append(current)
+
+        try:
+            return [result for chunk in self._get_pool().map(run_tasks, chunks) for result in chunk]
+        except BrokenProcessPool as e:
+            # A worker died (e.g. killed for memory); start a fresh pool next time
+            logger.error("Backtest worker pool failed, running in-process: %s", e)
+            with self._lock:
+                self._pool = None
+            return run_tasks(tasks)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # A pool inherited through fork belongs to the parent; each worker process makes its own.
+        # Workers are spawned rather than forked, so they don't copy the server's threads and locks.
+        pid = os.getpid()
+        with self._lock:
+            if self._pool is None or self._pool_pid != pid:
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                self._pool_pid = pid
+            return self._pool
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown()
+            self._pool = None
+
+
+def expand_strategy(strategy: Dict[str, Any], max_combinations: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Validate a strategy spec and expand list-valued parameters into every combination.
+
+    The grid size is checked against max_combinations before anything is expanded.
+
+    Raises:
+        ValueError: If the type is unknown, a parameter is missing or invalid, or the grid
+            has more than max_combinations combinations.
+    """
+    kind = strategy.get("type")
+    if kind not in STRATEGIES:
+        raise ValueError(f"Strategy type must be one of {', '.join(STRATEGIES)}")
+    grid = {}
+    for name, default in STRATEGIES[kind].items():
+        value = strategy.get(name, default)
+        if value is None:
+            raise ValueError(f"Strategy {kind} requires {name}")
+        grid[name] = value if isinstance(value, list) else [value]
+        if not grid[name]:
+            raise ValueError(f"Strategy parameter {name} has no values")
+    if max_combinations is not None and math.prod(len(values) for values in grid.values()) > max_combinations:
+        raise ValueError(f"At most {MAX_BACKTEST_RUNS} symbol and parameter combinations can be run at once")
+    grid = {name: [_number(v, name) for v in values] for name, values in grid.items()}
+
+    combinations = []
+    for values in itertools.product(*grid.values()):
+        params = dict(zip(grid, values))
+        for name in ("fast", "slow", "lookback"):
+            if name in params:
+                if params[name] != int(params[name]) or params[name] < 1:
+                    raise ValueError(f"Strategy parameter {name} must be a positive integer")
+                params[name] = int(params[name])
+        if kind == "sma_cross" and params["fast"] >= params["slow"]:
+            continue
+        combinations.append({"type": kind, **params})
+    if not combinations:
+        raise ValueError("No valid parameter combinations (fast must be below slow)")
+    return combinations
+
+
+def parse_sizing(sizing: Dict[str, Any]) -> Dict[str, Any]:
+    kind = sizing.get("type")
+    if kind == "shares":
+        shares = _number(sizing.get("shares"), "shares")
+        if shares != int(shares) or shares <= 0:
+            raise ValueError("Sizing shares must be a positive integer")
+        return {"type": "shares", "shares": int(shares)}
+    if kind == "notional":
+        amount = _number(sizing.get("amount"), "amount")
+        if amount <= 0:
+            raise ValueError("Sizing amount must be positive")
+        return {"type": "notional", "amount": amount}
+    raise ValueError("Sizing type must be shares or notional")
+
+
+def parse_costs(costs: Dict[str, Any]) -> Dict[str, Any]:
+    commission = _number(costs.get("commission", 0), "commission")
+    slippage_bps = _number(costs.get("slippage_bps", 0), "slippage_bps")
+    if commission < 0 or slippage_bps < 0:
+        raise ValueError("Costs must not be negative")
+    return {"commission": commission, "slippage_bps": slippage_bps}
+
+
+def _number(value: Any, name: str) -> float:
+    if isinstance(value, bool):
+        raise ValueError(f"{name} must be a number")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a number")
+    return number
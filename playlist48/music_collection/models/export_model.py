@@ -0,0 +1,93 @@
+import itertools
+import sqlite3
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+from music_collection.utils.export_utils import FORMATS, iter_pages, primed
+from music_collection.utils.sql_utils import Storage, default_storage
+
+
+# Most symbols one history export may name
+MAX_EXPORT_SYMBOLS = 500
+
+LOT_COLUMNS = ("id", "symbol", "shares", "purchase_price", "purchase_date")
+TRANSACTION_COLUMNS = ("id", "symbol", "side", "shares", "price", "executed_at")
+HISTORY_COLUMNS = ("symbol", "date", "open", "high", "low", "close", "volume")
+
+
+class ExportModel:
+    """
+    Bulk exports streamed straight from SQLite.
+
+    Each export is a generator that reads keyset pages with short queries and encodes each
+    page as it is read, so memory use doesn't depend on the number of rows, the first bytes
+    are ready after the first page, and no lock is held between pages.
+    """
+
+    def __init__(self, storage: Optional[Storage] = None):
+        self.storage = storage or default_storage()
+
+    def export_lots(self, account_id: int, fmt: str = "csv") -> Tuple[str, Iterator[str]]:
+        """
+        Stream an account's open lots, oldest first.
+
+        Returns:
+            (mimetype, chunks)
+
+        Raises:
+            ValueError: If the format is not supported.
+            sqlite3.Error: If the query fails.
+        """
+        query = ("SELECT id, symbol, shares, purchase_price, purchase_date FROM portfolio "
+                 "WHERE account_id = ?")
+        return self._export(lambda: self.storage.account_connection(account_id), query, (account_id,), ("id",),
+                            LOT_COLUMNS, fmt)
+
+    def export_transactions(self, account_id: int, fmt: str = "csv") -> Tuple[str, Iterator[str]]:
+        """Stream an account's ledger, oldest first; see export_lots."""
+        query = ("SELECT id, symbol, side, shares, price, executed_at FROM transactions "
+                 "WHERE account_id = ?")
+        return self._export(lambda: self.storage.account_connection(account_id), query, (account_id,), ("id",),
+                            TRANSACTION_COLUMNS, fmt)
+
+    def export_history(self, symbols: Sequence[str], start: Optional[str] = None, end: Optional[str] = None,
+                       fmt: str = "csv") -> Tuple[str, Iterator[str]]:
+        """
+        Stream stored daily bars for several symbols, by symbol then date; see export_lots.
+
+        Raises:
+            ValueError: If no symbols or too many are given, or the format is not supported.
+        """
+        symbols = sorted({symbol.strip().upper() for symbol in symbols if symbol.strip()})
+        if not symbols:
+            raise ValueError("At least one symbol is required")
+        if len(symbols) > MAX_EXPORT_SYMBOLS:
+            raise ValueError(f"At most {MAX_EXPORT_SYMBOLS} symbols can be exported at once")
+
+        query = ("SELECT symbol, date, open, high, low, close, volume FROM price_history "
+                 f"WHERE symbol IN ({','.join('?' * len(symbols))})")
+        params: List[Any] = list(symbols)
+        if start:
+            query += " AND date >= ?"
+            params.append(start)
+        if end:
+            query += " AND date <= ?"
+            params.append(end)
+        return self._export(self.storage.connection, query, params, ("symbol", "date"), HISTORY_COLUMNS, fmt)
+
+    @staticmethod
+    def _export(connect, query: str, params: Sequence[Any], keys: Sequence[str], columns: Sequence[str],
+                fmt: str) -> Tuple[str, Iterator[str]]:
+        if fmt not in FORMATS:
+            raise ValueError(f"Format must be one of {', '.join(FORMATS)}")
+        mimetype, encode = FORMATS[fmt]
+
+        def chunks():
+            # Read the first page before the header, so a failing query raises from primed()
+            pages = iter_pages(connect, query, params, keys)
+            first = next(pages, None)
+            yield from encode(columns, itertools.chain([first] if first else [], pages))
+
+        try:
+            return mimetype, primed(chunks())
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
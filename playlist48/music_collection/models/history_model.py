@@ -0,0 +1,134 @@
+import logging
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from music_collection.models.stock_model import StockModel, last_completed_session
+from music_collection.utils.logger import configure_logger
+from music_collection.utils.sql_utils import Storage, default_storage
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class HistoryModel:
+    """
+    Local store of daily bars in the price_history table.
+
+    Bars fetched through StockModel are written to SQLite so analytics can run over
+    local data; a symbol is only refetched once its stored history is missing the
+    latest completed session.
+    """
+
+    def __init__(self, stock_model: StockModel, storage: Optional[Storage] = None):
+        self.stock_model = stock_model
+        self.storage = storage or default_storage()
+        self._stored_versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def store_daily_bars(self, symbol: str, bars: Dict[str, Dict]) -> int:
+        """
+        Upsert daily bars for symbol.
+
+        Args:
+            symbol (str): The stock symbol.
+            bars (Dict): Mapping of ISO date to open/high/low/close/volume, as returned by
+                StockModel.get_historical_data.
+
+        Returns:
+            int: The number of bars written.
+        """
+        rows = [(symbol.upper(), date, bar["open"], bar["high"], bar["low"], bar["close"], bar["volume"])
+                for date, bar in bars.items()]
+        try:
+            with self.storage.connection() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO price_history (symbol, date, open, high, low, close, volume) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            raise ValueError(f"Failed to store history for {symbol}: {str(e)}")
+        return len(rows)
+
+    def latest_dates(self, symbols: Iterable[str]) -> Dict[str, str]:
+        """Most recent stored bar date for each symbol that has any history."""
+        symbols = [s.upper() for s in symbols]
+        if not symbols:
+            return {}
+        placeholders = ",".join("?" * len(symbols))
+        try:
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"SELECT symbol, MAX(date) FROM price_history WHERE symbol IN ({placeholders}) GROUP BY symbol",
+                    symbols
+                )
+                return dict(cursor.fetchall())
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+
+    def ensure_history(self, symbols: Iterable[str]) -> Dict[str, str]:
+        """
+        Make sure every symbol has history up to the last completed session, fetching and
+        storing bars for those that don't.
+
+        Returns:
+            Dict of symbol to latest stored bar date after the refresh.
+        """
+        symbols = sorted({s.upper() for s in symbols})
+        latest = self.latest_dates(symbols)
+        session = last_completed_session()
+        for symbol in symbols:
+            if latest.get(symbol, "") >= session:
+                continue
+            entry = self.stock_model.get_history_entry(symbol)
+            with self._lock:
+                if self._stored_versions.get(symbol) == entry.version:
+                    continue
+                self._stored_versions[symbol] = entry.version
+            self.store_daily_bars(symbol, entry.value)
+            if entry.value:
+                latest[symbol] = max(entry.value)
+        return latest
+
+    def load_closes(self, symbols: Iterable[str], start: Optional[str] = None,
+                    end: Optional[str] = None) -> pd.DataFrame:
+        """
+        Load stored daily closes as a date-indexed DataFrame with one column per symbol.
+
+        Args:
+            symbols: The symbols to load.
+            start (str, optional): First ISO date to include.
+            end (str, optional): Last ISO date to include.
+
+        Returns:
+            pd.DataFrame: Closes aligned on date; missing bars are NaN.
+        """
+        symbols = [s.upper() for s in symbols]
+        if not symbols:
+            return pd.DataFrame()
+        query = f"SELECT date, symbol, close FROM price_history WHERE symbol IN ({','.join('?' * len(symbols))})"
+        params: List = list(symbols)
+        if start:
+            query += " AND date >= ?"
+            params.append(start)
+        if end:
+            query += " AND date <= ?"
+            params.append(end)
+
+        try:
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+
+        frame = pd.DataFrame(rows, columns=["date", "symbol", "close"])
+        closes = frame.pivot(index="date", columns="symbol", values="close").sort_index()
+        closes.index = pd.to_datetime(closes.index)
+        return closes.reindex(columns=symbols)
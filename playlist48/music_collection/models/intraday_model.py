@@ -0,0 +1,179 @@
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from music_collection.models.stock_model import INTRADAY_MAX_SYMBOLS, MARKET_TIMEZONE, StockModel
+from music_collection.utils.bar_utils import Bars, BarRingBuffer, concat_bars, empty_bars, resample_bars
+from music_collection.utils.logger import configure_logger
+from music_collection.utils.sql_utils import Storage, default_storage
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# 1-minute bars kept in memory per symbol (48 bytes each); older bars are spilled to SQLite
+INTRADAY_BUFFER_BARS = int(os.getenv("INTRADAY_BUFFER_BARS", "2000"))
+
+# Supported bar sizes in minutes; all are derived from 1-minute bars
+INTERVALS = {"1min": 1, "5min": 5, "15min": 15}
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def to_epoch(timestamp: str) -> int:
+    """Epoch seconds of an Alpha Vantage intraday timestamp (US/Eastern wall time)."""
+    return int(datetime.strptime(timestamp, TIMESTAMP_FORMAT).replace(tzinfo=MARKET_TIMEZONE).timestamp())
+
+
+def from_epoch(seconds: int) -> str:
+    return datetime.fromtimestamp(seconds, MARKET_TIMEZONE).strftime(TIMESTAMP_FORMAT)
+
+
+class IntradayModel:
+    """
+    Intraday bars per symbol, built from 1-minute bars fetched through StockModel.
+
+    Recent bars live in a fixed-size BarRingBuffer per symbol, and at most max_symbols
+    buffers are kept, so memory stays bounded however long the process runs. Bars pushed
+    out of a buffer (or dropped with their buffer) are written to the intraday_bars table
+    in one batch, and read back when a request reaches past the buffer. 5 and 15-minute
+    bars are resampled from the 1-minute bars rather than fetched.
+    """
+
+    def __init__(self, stock_model: StockModel, buffer_bars: int = INTRADAY_BUFFER_BARS,
+                 max_symbols: int = INTRADAY_MAX_SYMBOLS, storage: Optional[Storage] = None):
+        self.stock_model = stock_model
+        self.storage = storage or default_storage()
+        self.buffer_bars = buffer_bars
+        self.max_symbols = max_symbols
+        self._buffers: "OrderedDict[str, BarRingBuffer]" = OrderedDict()
+        self._ingested_versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def get_bars(self, symbol: str, interval: str = "1min", limit: int = 100) -> Dict[str, Any]:
+        """
+        Get the most recent intraday bars for symbol.
+
+        Args:
+            symbol (str): The stock symbol.
+            interval (str): "1min", "5min" or "15min".
+            limit (int): Number of bars to return (1-1000).
+
+        Returns:
+            Dict with the bars (oldest first) and the age of the underlying data.
+
+        Raises:
+            ValueError: If the interval or limit is invalid, or the data can't be fetched.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Interval must be one of {', '.join(INTERVALS)}")
+        if limit <= 0 or limit > 1000:
+            raise ValueError("Limit must be between 1 and 1000")
+        symbol = symbol.upper()
+        entry = self.stock_model.get_intraday_entry(symbol)
+        self.ingest(symbol, entry.value, entry.version)
+
+        minutes = INTERVALS[interval]
+        # Enough 1-minute bars for `limit` buckets, plus one for a partly filled first bucket
+        needed = limit * minutes + minutes
+        with self._lock:
+            buffer = self._buffer(symbol)
+            recent = buffer.snapshot()
+            oldest_buffered = buffer.first_timestamp
+        if len(recent[0]) < needed:
+            older = self._read_spilled(symbol, oldest_buffered, needed - len(recent[0]))
+            recent = concat_bars(older, recent)
+
+        timestamps, prices, volumes = resample_bars(recent, minutes * 60)
+        timestamps, prices, volumes = timestamps[-limit:], prices[-limit:], volumes[-limit:]
+        return {
+            "symbol": symbol,
+            "interval": interval,
+            "as_of": entry.as_of(),
+            "stale": not entry.is_fresh(),
+            "bars": [{
+                "timestamp": from_epoch(int(ts)),
+                "open": float(row[0]),
+                "high": float(row[1]),
+                "low": float(row[2]),
+                "close": float(row[3]),
+                "volume": int(volume)
+            } for ts, row, volume in zip(timestamps, prices, volumes)]
+        }
+
+    def ingest(self, symbol: str, bars: Dict[str, Dict[str, Any]], version: str) -> None:
+        """
+        Add fetched 1-minute bars (timestamp -> bar) to the symbol's buffer, spilling evicted
+        bars to SQLite. A response that was already ingested (same version) is skipped.
+        """
+        if self._ingested_versions.get(symbol) == version:
+            return
+        ordered = sorted(bars.items())
+        timestamps = np.array([to_epoch(timestamp) for timestamp, _ in ordered], dtype=np.int64)
+        prices = np.array([[bar["open"], bar["high"], bar["low"], bar["close"]] for _, bar in ordered],
+                          dtype=np.float64).reshape(-1, 4)
+        volumes = np.array([bar["volume"] for _, bar in ordered], dtype=np.int64)
+
+        with self._lock:
+            if self._ingested_versions.get(symbol) == version:
+                return
+            self._ingested_versions[symbol] = version
+            evicted = [(symbol, self._buffer(symbol).extend(timestamps, prices, volumes))]
+            while len(self._buffers) > self.max_symbols:
+                dropped, buffer = self._buffers.popitem(last=False)
+                self._ingested_versions.pop(dropped, None)
+                evicted.append((dropped, buffer.snapshot()))
+        self._spill(evicted)
+
+    def _buffer(self, symbol: str) -> BarRingBuffer:
+        buffer = self._buffers.get(symbol)
+        if buffer is None:
+            buffer = self._buffers[symbol] = BarRingBuffer(self.buffer_bars)
+        self._buffers.move_to_end(symbol)
+        return buffer
+
+    def _spill(self, evicted: List) -> None:
+        rows = [(symbol, int(ts), float(row[0]), float(row[1]), float(row[2]), float(row[3]), int(volume))
+                for symbol, (timestamps, prices, volumes) in evicted
+                for ts, row, volume in zip(timestamps, prices, volumes)]
+        if not rows:
+            return
+        try:
+            with self.storage.connection() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO intraday_bars (symbol, ts, open, high, low, close, volume) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            # Losing spilled bars only shortens the history available; keep serving
+            logger.error("Failed to spill %d intraday bars: %s", len(rows), e)
+
+    def _read_spilled(self, symbol: str, before: Optional[int], count: int) -> Bars:
+        """The `count` newest spilled bars older than `before` (all spilled bars if None)."""
+        query = "SELECT ts, open, high, low, close, volume FROM intraday_bars WHERE symbol = ?"
+        params: List[Any] = [symbol]
+        if before is not None:
+            query += " AND ts < ?"
+            params.append(before)
+        query += " ORDER BY ts DESC LIMIT ?"
+        params.append(count)
+        try:
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()[::-1]
+        except sqlite3.Error as e:
+            logger.error("Failed to read spilled intraday bars for %s: %s", symbol, e)
+            return empty_bars()
+        if not rows:
+            return empty_bars()
+        table = np.array(rows, dtype=np.float64)
+        return table[:, 0].astype(np.int64), table[:, 1:5], table[:, 5].astype(np.int64)
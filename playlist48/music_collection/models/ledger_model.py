@@ -0,0 +1,389 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from music_collection.utils.fifo_utils import consume_fifo, realized_gain
+from music_collection.utils.logger import configure_logger
+from music_collection.utils.sql_utils import Storage, default_storage
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# Take a new snapshot once this many transactions have accumulated since the last one
+SNAPSHOT_EVERY = int(os.getenv("LEDGER_SNAPSHOT_EVERY", "500"))
+# ...or when this many seconds have passed and there is anything new
+SNAPSHOT_INTERVAL = float(os.getenv("LEDGER_SNAPSHOT_INTERVAL", "300"))
+# Older snapshots beyond this many are deleted during compaction
+SNAPSHOTS_KEPT = int(os.getenv("LEDGER_SNAPSHOTS_KEPT", "3"))
+
+
+class Position:
+    """Open FIFO lots and realized P&L for one symbol."""
+
+    __slots__ = ("lots", "realized_pnl")
+
+    def __init__(self, lots: Optional[List[List[float]]] = None, realized_pnl: float = 0.0):
+        self.lots = deque(lots or [])
+        self.realized_pnl = realized_pnl
+
+    @property
+    def shares(self) -> int:
+        return int(sum(shares for shares, _ in self.lots))
+
+    @property
+    def cost_basis(self) -> float:
+        return sum(shares * price for shares, price in self.lots)
+
+    def apply(self, side: str, shares: int, price: float) -> None:
+        if side == "buy":
+            self.lots.append([shares, price])
+            return
+        consumed = consume_fifo([(i, lot[0], lot[1]) for i, lot in enumerate(self.lots)], shares)
+        self.realized_pnl += realized_gain(consumed, price)
+        for i, _, left, _ in reversed(consumed):
+            if left == 0:
+                del self.lots[i]
+            else:
+                self.lots[i][0] = left
+
+
+class LedgerModel:
+    """
+    Append-only ledger of every buy and sell, with periodic position snapshots.
+
+    Current positions and realized P&L come from the latest snapshot plus the short tail
+    of transactions after it, rather than a replay of the whole ledger. Each shard keeps
+    its own ledger and snapshots, covering every account stored on it. A background
+    thread takes new snapshots and compacts old ones outside the request path.
+    """
+
+    def __init__(self, snapshot_every: int = SNAPSHOT_EVERY, snapshot_interval: float = SNAPSHOT_INTERVAL,
+                 snapshots_kept: int = SNAPSHOTS_KEPT, storage: Optional[Storage] = None):
+        self.storage = storage or default_storage()
+        self.snapshot_every = snapshot_every
+        self.snapshot_interval = snapshot_interval
+        self.snapshots_kept = snapshots_kept
+        self._pending = 0
+        self._wakeup = threading.Event()
+        self._worker_pid: Optional[int] = None
+        self._worker_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def append_transaction(cursor: sqlite3.Cursor, account_id: int, symbol: str, side: str, shares: int,
+                           price: float, executed_at: datetime) -> int:
+        """
+        Append a transaction using the caller's cursor, so it commits atomically with the
+        caller's lot changes.
+
+        Returns:
+            int: The new transaction id.
+        """
+        cursor.execute(
+            "INSERT INTO transactions (account_id, symbol, side, shares, price, executed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (account_id, symbol, side, shares, price, executed_at)
+        )
+        return cursor.lastrowid
+
+    def backfill_opening_buys(self) -> int:
+        """
+        Record an opening buy for every lot of an account that has no ledger yet.
+
+        Lots written before the ledger existed (or loaded straight into the portfolio table)
+        would otherwise be sold against positions the replay has never seen. Safe to run on
+        every start: an account is only backfilled while it has no transactions.
+
+        Returns:
+            int: Number of opening buys written, over all shards.
+        """
+        written = 0
+        for shard in self.storage.all_shards():
+            try:
+                with self.storage.shard_connection(shard, write=True) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(
+                        "INSERT INTO transactions (account_id, symbol, side, shares, price, executed_at) "
+                        "SELECT account_id, symbol, 'buy', shares, purchase_price, purchase_date FROM portfolio AS lot "
+                        "WHERE NOT EXISTS (SELECT 1 FROM transactions WHERE transactions.account_id = lot.account_id) "
+                        "ORDER BY purchase_date, id"
+                    )
+                    written += cursor.rowcount
+                    conn.commit()
+            except sqlite3.Error as e:
+                raise sqlite3.Error(f"Database error: {str(e)}")
+        if written:
+            logger.info("Backfilled %d opening buys for lots recorded before the ledger", written)
+        return written
+
+    def transaction_recorded(self) -> None:
+        """Note a committed transaction; wakes the snapshot worker once enough have piled up."""
+        self._ensure_worker()
+        self._pending += 1
+        if self._pending >= self.snapshot_every:
+            self._wakeup.set()
+
+    def get_transactions(self, account_id: int, symbol: Optional[str] = None, limit: int = 100,
+                         before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """List an account's transactions newest first, paginated with before_id."""
+        if limit <= 0 or limit > 1000:
+            raise ValueError("Limit must be between 1 and 1000")
+        query = "SELECT id, symbol, side, shares, price, executed_at FROM transactions WHERE account_id = ?"
+        params: List[Any] = [account_id]
+        if symbol:
+            query += " AND symbol = ?"
+            params.append(symbol)
+        if before_id:
+            query += " AND id < ?"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+
+        try:
+            with self.storage.account_connection(account_id) as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+
+        return [{
+            "id": txn_id,
+            "symbol": txn_symbol,
+            "side": side,
+            "shares": shares,
+            "price": price,
+            "executed_at": executed_at
+        } for txn_id, txn_symbol, side, shares, price, executed_at in rows]
+
+    def get_positions(self, account_id: int) -> Tuple[Dict[str, Position], int]:
+        """
+        Rebuild an account's positions from the latest snapshot plus the transactions after it.
+
+        Returns:
+            (positions by symbol, id of the last transaction covered)
+        """
+        self._ensure_worker()
+        try:
+            with self.storage.account_connection(account_id) as conn:
+                positions, last_id, failed = self._replay(conn.cursor(), account_id)
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+        if account_id in failed:
+            raise ValueError(failed[account_id])
+        return {symbol: position for (_, symbol), position in positions.items()}, last_id
+
+    def get_ledger_tail(self, account_id: int, after_id: int = 0) -> Tuple[List[Tuple], int]:
+        """
+        An account's transactions after after_id, in the order they are replayed.
+
+        Returns:
+            (rows of (id, symbol, side, shares, price, executed_at), number of the account's
+            transactions with an id up to after_id, so a caller that replayed those can tell
+            whether any were deleted since)
+        """
+        try:
+            with self.storage.account_connection(account_id) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*) FROM transactions WHERE account_id = ? AND id <= ?",
+                               (account_id, after_id))
+                covered = cursor.fetchone()[0]
+                cursor.execute(
+                    "SELECT id, symbol, side, shares, price, executed_at FROM transactions "
+                    "WHERE account_id = ? AND id > ? ORDER BY id",
+                    (account_id, after_id)
+                )
+                rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+        return rows, covered
+
+    @staticmethod
+    def position_history(positions: Dict[str, Position], rows: List[Tuple]) -> List[Dict[str, Any]]:
+        """
+        Apply ledger rows from get_ledger_tail to positions (in place), recording each
+        symbol's shares and FIFO cost basis after every transaction.
+        """
+        history = []
+        for txn_id, symbol, side, shares, price, _ in rows:
+            position = positions.setdefault(symbol, Position())
+            position.apply(side, shares, price)
+            history.append({
+                "id": txn_id,
+                "symbol": symbol,
+                "shares": position.shares,
+                "cost_basis": position.cost_basis
+            })
+        return history
+
+    def get_pnl(self, stock_model, account_id: int) -> Dict[str, Any]:
+        """An account's positions with realized and unrealized P&L, priced with live quotes."""
+        positions, last_id = self.get_positions(account_id)
+        rows = []
+        for symbol in sorted(positions):
+            position = positions[symbol]
+            shares = position.shares
+            row = {
+                "symbol": symbol,
+                "shares": shares,
+                "cost_basis": position.cost_basis,
+                "avg_cost": position.cost_basis / shares if shares else 0.0,
+                "realized_pnl": position.realized_pnl,
+                "current_price": None,
+                "price_as_of": None,
+                "price_stale": False,
+                "market_value": 0.0,
+                "unrealized_pnl": 0.0
+            }
+            if shares:
+                quote = stock_model.get_stock_info(symbol)
+                price = quote["price"]
+                row["current_price"] = price
+                row["price_as_of"] = quote.get("as_of")
+                row["price_stale"] = quote.get("stale", False)
+                row["market_value"] = price * shares
+                row["unrealized_pnl"] = price * shares - position.cost_basis
+            rows.append(row)
+
+        return {
+            "as_of_transaction_id": last_id,
+            "positions": rows,
+            "total_realized_pnl": sum(row["realized_pnl"] for row in rows),
+            "total_unrealized_pnl": sum(row["unrealized_pnl"] for row in rows)
+        }
+
+    @staticmethod
+    def _replay(cursor, account_id: Optional[int] = None
+                ) -> Tuple[Dict[Tuple[int, str], Position], int, Dict[int, str]]:
+        """
+        Positions keyed by (account_id, symbol) on one shard: the latest snapshot plus the tail.
+
+        An account whose ledger cannot be replayed (a sell its buys don't cover) is left out
+        of the positions and reported in the third element, account id -> error, so one bad
+        account doesn't stop the others from being replayed or snapshotted.
+        """
+        account_filter = "" if account_id is None else " AND account_id = ?"
+        account_params = () if account_id is None else (account_id,)
+
+        cursor.execute("SELECT id, last_transaction_id FROM position_snapshots ORDER BY id DESC LIMIT 1")
+        snapshot = cursor.fetchone()
+        positions: Dict[Tuple[int, str], Position] = {}
+        snapshot_id, last_id = snapshot if snapshot is not None else (0, 0)
+        if snapshot is not None:
+            cursor.execute(
+                "SELECT account_id, symbol, lots, realized_pnl FROM position_snapshot_rows WHERE snapshot_id = ?"
+                + account_filter,
+                (snapshot_id,) + account_params
+            )
+            positions = {(account, symbol): Position(json.loads(lots), realized_pnl)
+                         for account, symbol, lots, realized_pnl in cursor.fetchall()}
+
+        # Accounts the snapshot skipped are replayed from their first transaction
+        cursor.execute(
+            "SELECT id, account_id, symbol, side, shares, price FROM transactions "
+            "WHERE (id > ? OR account_id IN (SELECT account_id FROM position_snapshot_skipped WHERE snapshot_id = ?))"
+            + account_filter + " ORDER BY id",
+            (last_id, snapshot_id) + account_params
+        )
+        failed: Dict[int, str] = {}
+        for txn_id, account, symbol, side, shares, price in cursor.fetchall():
+            last_id = max(last_id, txn_id)
+            if account in failed:
+                continue
+            try:
+                positions.setdefault((account, symbol), Position()).apply(side, shares, price)
+            except ValueError as e:
+                failed[account] = f"Ledger of account {account} cannot be replayed at transaction {txn_id}: {e}"
+        if failed:
+            positions = {key: position for key, position in positions.items() if key[0] not in failed}
+        return positions, last_id, failed
+
+    def take_snapshot(self) -> List[int]:
+        """
+        Persist current positions on every shard as a new snapshot and compact old ones.
+
+        Returns:
+            The new snapshot ids; shards with nothing new since their last snapshot are skipped.
+        """
+        with self._lock:
+            self._pending = 0
+            snapshot_ids = []
+            for shard in self.storage.all_shards():
+                snapshot_id = self._snapshot_shard(shard)
+                if snapshot_id is not None:
+                    snapshot_ids.append(snapshot_id)
+        return snapshot_ids
+
+    def _snapshot_shard(self, shard: int) -> Optional[int]:
+        try:
+            with self.storage.shard_connection(shard) as conn:
+                positions, last_id, failed = self._replay(conn.cursor())
+
+            with self.storage.shard_connection(shard, write=True) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT MAX(last_transaction_id) FROM position_snapshots")
+                if last_id == (cursor.fetchone()[0] or 0):
+                    return None
+
+                cursor.execute(
+                    "INSERT INTO position_snapshots (last_transaction_id, created_at) VALUES (?, ?)",
+                    (last_id, datetime.now())
+                )
+                snapshot_id = cursor.lastrowid
+                cursor.executemany(
+                    "INSERT INTO position_snapshot_rows "
+                    "(snapshot_id, account_id, symbol, shares, cost_basis, realized_pnl, lots) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(snapshot_id, account, symbol, p.shares, p.cost_basis, p.realized_pnl, json.dumps(list(p.lots)))
+                     for (account, symbol), p in positions.items()]
+                )
+                cursor.executemany(
+                    "INSERT INTO position_snapshot_skipped (snapshot_id, account_id, error) VALUES (?, ?, ?)",
+                    [(snapshot_id, account, error) for account, error in failed.items()]
+                )
+                self._compact(cursor)
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error("Failed to take ledger snapshot of shard %d: %s", shard, e)
+            return None
+
+        for error in failed.values():
+            logger.error("Ledger snapshot %d of shard %d skipped an account: %s", snapshot_id, shard, error)
+        logger.info("Ledger snapshot %d of shard %d taken through transaction %d", snapshot_id, shard, last_id)
+        return snapshot_id
+
+    def _compact(self, cursor) -> None:
+        cursor.execute(
+            "SELECT id FROM position_snapshots ORDER BY id DESC LIMIT -1 OFFSET ?", (self.snapshots_kept,)
+        )
+        stale = [(row[0],) for row in cursor.fetchall()]
+        if stale:
+            cursor.executemany("DELETE FROM position_snapshot_rows WHERE snapshot_id = ?", stale)
+            cursor.executemany("DELETE FROM position_snapshot_skipped WHERE snapshot_id = ?", stale)
+            cursor.executemany("DELETE FROM position_snapshots WHERE id = ?", stale)
+
+    def _ensure_worker(self) -> None:
+        # Threads don't survive fork, so each (pre-forked) worker process starts its own
+        pid = os.getpid()
+        if self._worker_pid == pid:
+            return
+        with self._worker_lock:
+            if self._worker_pid == pid:
+                return
+            self._worker_pid = pid
+            threading.Thread(target=self._run_worker, name="ledger-snapshots", daemon=True).start()
+
+    def _run_worker(self) -> None:
+        while True:
+            self._wakeup.wait(self.snapshot_interval)
+            self._wakeup.clear()
+            try:
+                self.take_snapshot()
+            except Exception as e:
+                logger.error("Ledger snapshot worker error: %s", e)
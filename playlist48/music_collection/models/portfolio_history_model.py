@@ -0,0 +1,215 @@
+import json
+import sqlite3
+import threading
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from music_collection.models.history_model import HistoryModel
+from music_collection.models.ledger_model import Position
+from music_collection.models.portfolio_model import DEFAULT_ACCOUNT_ID, PortfolioModel
+from music_collection.utils.sql_utils import Storage, default_storage
+
+
+# Calendar days of closes loaded before the first recomputed date, so prices can be
+# carried forward over weekends and holidays
+FFILL_WINDOW = timedelta(days=10)
+
+
+class PortfolioHistoryModel:
+    """
+    Daily value of an account's portfolio, reconstructed from its transaction ledger.
+
+    Replaying the ledger gives each symbol's shares and FIFO cost basis after every buy
+    and sell, so positions sold since still count on the days they were held. Holdings
+    on each trading day are the last of those positions on or before it, valued against
+    stored daily closes in one vectorized pass. Lots recorded before the ledger existed
+    are covered by the opening buys LedgerModel.backfill_opening_buys writes for them.
+
+    Daily snapshots are saved in portfolio_value_history, along with the open lots after
+    the last transaction they cover. Later calls replay only the transactions after it
+    onto those lots and recompute from the last snapshot onward. The series is rebuilt
+    when a covered transaction was deleted or a new one is dated before the last snapshot.
+    """
+
+    def __init__(self, portfolio_model: PortfolioModel, history_model: HistoryModel,
+                 storage: Optional[Storage] = None):
+        self.portfolio_model = portfolio_model
+        self.storage = storage or portfolio_model.storage
+        self.history_model = history_model
+        self._locks: Dict[int, threading.Lock] = {}
+
+    def get_value_history(self, start: Optional[str] = None, end: Optional[str] = None,
+                          account_id: int = DEFAULT_ACCOUNT_ID) -> Dict[str, Any]:
+        """
+        Get an account's daily portfolio value between start and end (inclusive ISO dates).
+
+        Returns:
+            Dict with the requested range and one point per trading day.
+        """
+        for value in (start, end):
+            if value:
+                try:
+                    pd.Timestamp(value)
+                except ValueError:
+                    raise ValueError(f"Invalid date: {value}")
+
+        with self._locks.setdefault(account_id, threading.Lock()):
+            self._refresh(account_id)
+        return {
+            "start": start,
+            "end": end,
+            "points": self._load_snapshots(account_id, start, end)
+        }
+
+    def _refresh(self, account_id: int, rebuild: bool = False) -> None:
+        ledger_model = self.portfolio_model.ledger_model
+        state = None if rebuild else self._load_state(account_id)
+        after_id = state[1] if state else 0
+        transactions, covered = ledger_model.get_ledger_tail(account_id, after_id)
+        dates = pd.to_datetime([row[5] for row in transactions], format="ISO8601").normalize()
+
+        positions: Dict[str, Position] = {}
+        recompute_from = None
+        if state is not None:
+            through_date, _, transaction_count, lots = state
+            recompute_from = pd.Timestamp(through_date)
+            if covered != transaction_count or (len(dates) and dates.min() < recompute_from):
+                # The snapshots no longer match the ledger they were built from
+                self._refresh(account_id, rebuild=True)
+                return
+            positions = {symbol: Position(symbol_lots) for symbol, symbol_lots in json.loads(lots).items()}
+
+        symbols = sorted(set(positions) | {row[1] for row in transactions})
+        if not symbols:
+            self._replace_snapshots(account_id, [], None)
+            return
+
+        self.history_model.ensure_history(symbols)
+        load_start = None if recompute_from is None else (recompute_from - FFILL_WINDOW).date().isoformat()
+        closes = self.history_model.load_closes(symbols, start=load_start).ffill()
+        # The last snapshot may have been taken before that day's close, so it is redone
+        calendar = closes.index if recompute_from is None else closes.index[closes.index >= recompute_from]
+        if len(calendar) == 0:
+            return
+        last_date = calendar[-1]
+
+        # Positions carried over from the last snapshot hold from its date until changed
+        seed = [{"symbol": symbol, "shares": position.shares, "cost_basis": position.cost_basis}
+                for symbol, position in positions.items()]
+        # Transactions dated after the last close are left out of the saved state and
+        # replayed again next time, so the saved lots are those as of last_date
+        later = dates > last_date
+        settled = int(later.argmax()) if later.any() else len(transactions)
+        history = ledger_model.position_history(positions, transactions[:settled])
+        saved_lots = json.dumps({symbol: list(position.lots) for symbol, position in positions.items()})
+        history += ledger_model.position_history(positions, transactions[settled:])
+
+        changes = pd.DataFrame(seed + history, columns=["symbol", "shares", "cost_basis"])
+        changes["date"] = pd.DatetimeIndex([recompute_from] * len(seed)).append(dates)
+        # Rows are in replay order, so the last one per day is the position at that day's end
+        shares = changes.pivot_table(index="date", columns="symbol", values="shares", aggfunc="last")
+        costs = changes.pivot_table(index="date", columns="symbol", values="cost_basis", aggfunc="last")
+
+        holdings = self._as_of(shares, calendar, symbols)
+        cost_basis = self._as_of(costs, calendar, symbols)
+        prices = closes.loc[calendar, symbols]
+
+        contributions = holdings * prices
+        contributions[holdings == 0] = 0.0
+        # Skip days where a held symbol has no price yet (before its stored history starts)
+        priced = ~contributions.isna().any(axis=1)
+        values = contributions[priced].sum(axis=1)
+        basis = cost_basis[priced].sum(axis=1)
+
+        rows = [(account_id, date.date().isoformat(), float(value), float(cost))
+                for date, value, cost in zip(values.index, values.to_numpy(), basis.to_numpy())]
+        last_id = transactions[settled - 1][0] if settled else after_id
+        new_state = (last_date.date().isoformat(), last_id, covered + settled, saved_lots)
+        if recompute_from is None:
+            self._replace_snapshots(account_id, rows, new_state)
+        else:
+            self._append_snapshots(account_id, rows, new_state)
+
+    @staticmethod
+    def _as_of(levels: pd.DataFrame, calendar: pd.DatetimeIndex, symbols: List[str]) -> pd.DataFrame:
+        """Value of a per-symbol series on each calendar day (carrying forward between changes)."""
+        combined = levels.index.union(calendar)
+        return levels.reindex(combined).ffill().reindex(calendar).reindex(columns=symbols).fillna(0.0)
+
+    def _load_state(self, account_id: int) -> Optional[Tuple[str, int, int, str]]:
+        """(through_date, last_transaction_id, transaction_count, positions JSON) of the saved snapshots."""
+        try:
+            with self.storage.account_connection(account_id) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT through_date, last_transaction_id, transaction_count, positions "
+                    "FROM portfolio_history_state WHERE account_id = ?", (account_id,)
+                )
+                row = cursor.fetchone()
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+        return row
+
+    def _save_state(self, cursor, account_id: int, state: Optional[Tuple[str, int, int, str]]) -> None:
+        if state is None:
+            cursor.execute("DELETE FROM portfolio_history_state WHERE account_id = ?", (account_id,))
+        else:
+            cursor.execute(
+                "INSERT OR REPLACE INTO portfolio_history_state "
+                "(account_id, through_date, last_transaction_id, transaction_count, positions) VALUES (?, ?, ?, ?, ?)",
+                (account_id,) + state
+            )
+
+    def _replace_snapshots(self, account_id: int, rows, state: Optional[Tuple[str, int, int, str]]) -> None:
+        try:
+            with self.storage.account_connection(account_id, write=True) as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM portfolio_value_history WHERE account_id = ?", (account_id,))
+                cursor.executemany(
+                    "INSERT INTO portfolio_value_history (account_id, date, value, cost_basis) VALUES (?, ?, ?, ?)", rows
+                )
+                self._save_state(cursor, account_id, state)
+                conn.commit()
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+
+    def _append_snapshots(self, account_id: int, rows, state: Tuple[str, int, int, str]) -> None:
+        try:
+            with self.storage.account_connection(account_id, write=True) as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO portfolio_value_history (account_id, date, value, cost_basis) "
+                    "VALUES (?, ?, ?, ?)", rows
+                )
+                self._save_state(cursor, account_id, state)
+                conn.commit()
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+
+    def _load_snapshots(self, account_id: int, start: Optional[str], end: Optional[str]) -> List[Dict[str, Any]]:
+        query = "SELECT date, value, cost_basis FROM portfolio_value_history WHERE account_id = ?"
+        params: List[Any] = [account_id]
+        if start:
+            query += " AND date >= ?"
+            params.append(start)
+        if end:
+            query += " AND date <= ?"
+            params.append(end)
+        query += " ORDER BY date"
+
+        try:
+            with self.storage.account_connection(account_id) as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+
+        return [{
+            "date": date,
+            "value": value,
+            "cost_basis": cost_basis,
+            "gain_loss": value - cost_basis
+        } for date, value, cost_basis in rows]
@@ -1,16 +1,101 @@
+import os
 import sqlite3
-from typing import Dict, List, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
-from .stock_model import StockModel
-from music_collection.utils.sql_utils import get_db_connection
+
+import numpy as np
+
+from .ledger_model import LedgerModel
+from .stock_model import TRADE_QUOTE_MAX_AGE, StockModel
+from music_collection.utils.cache import CacheEntry, TTLCache
+from music_collection.utils.circuit_breaker import CircuitOpenError
+from music_collection.utils.fifo_utils import consume_fifo, realized_gain
+from music_collection.utils.fx_utils import convert, listing_currency, major_currency, normalize_currency
+from music_collection.utils.metrics import PORTFOLIO_VALUATIONS
+from music_collection.utils.sql_utils import Storage, default_storage
+
+
+# Lots recorded before portfolios were per-account belong to this account
+DEFAULT_ACCOUNT_ID = 0
+# Accounts whose valuation is kept in memory; the least recently read one is dropped beyond this
+VALUATION_CACHE_ACCOUNTS = int(os.getenv("VALUATION_CACHE_ACCOUNTS", "10000"))
+
+# Valuation counters by result, looked up once rather than on every valuation
+_VALUATIONS_HIT = PORTFOLIO_VALUATIONS.labels("hit")
+_VALUATIONS_PARTIAL = PORTFOLIO_VALUATIONS.labels("partial")
+_VALUATIONS_FULL = PORTFOLIO_VALUATIONS.labels("full")
+
+
+class _Holding:
+    """One position valued at one quote version, in its listing currency."""
+
+    __slots__ = ("symbol", "currency", "shares", "avg_purchase_price", "quote_version", "current_price",
+                 "current_value", "total_gain_loss")
+
+    def __init__(self, symbol: str, shares: int, avg_purchase_price: float, quote: CacheEntry):
+        self.symbol = symbol
+        self.currency = listing_currency(symbol)
+        self.shares = shares
+        self.avg_purchase_price = avg_purchase_price
+        self.quote_version = quote.version
+        self.current_price = quote.value["price"]
+        self.current_value = self.current_price * shares
+        self.total_gain_loss = (self.current_price - avg_purchase_price) * shares
+
+
+class _Valuation:
+    """
+    An account's holdings as of one portfolio version and one set of quotes.
+
+    Reusable while the portfolio version is unchanged, none of the quotes has expired and
+    each held symbol's cached quote is still the entry it was valued at. quote_generation
+    is the quote cache generation when that was last confirmed: while it hasn't moved, no
+    quote at all has been stored and the per-symbol check is skipped. Value, cost and gain are kept as an n x 3 array in
+    listing currencies; totals in a base currency are cached per base and set of FX rates.
+    """
+
+    __slots__ = ("portfolio_version", "quote_generation", "holdings", "quotes", "expires_at", "currencies",
+                 "amounts", "totals")
+
+    def __init__(self, portfolio_version: int, quote_generation: int, holdings: List[_Holding],
+                 quotes: List[CacheEntry]):
+        self.portfolio_version = portfolio_version
+        self.quote_generation = quote_generation
+        self.holdings = holdings
+        self.quotes = quotes
+        self.expires_at = min((quote.expires_at for quote in quotes), default=float("inf"))
+        self.currencies = [holding.currency for holding in holdings]
+        self.amounts = np.array([(h.current_value, h.avg_purchase_price * h.shares, h.total_gain_loss)
+                                 for h in holdings], dtype=np.float64).reshape(-1, 3)
+        # base currency -> (FX rate versions, [total value, total cost, total gain/loss])
+        self.totals: Dict[str, Tuple[Tuple, np.ndarray]] = {}
 
 
 class PortfolioModel:
-    def __init__(self):
-        self.db_path = "stocks.db"
-        self.stock_model = StockModel()
+    """
+    Per-account portfolios of stock lots.
 
-    def buy_stock(self, symbol: str, shares: int) -> Dict:
+    Every method takes the users.id of the account it works on. Account data lives on the
+    SQLite shard chosen by hash of that id, so trades only take that shard's write lock.
+
+    Valuations are cached per account, keyed on the account's portfolio version (bumped in
+    the same transaction as every lot change) and the versions of the quotes used, so
+    repeated reads don't re-run the aggregation or the arithmetic, and a price tick only
+    reprices the holding it belongs to.
+    """
+
+    def __init__(self, stock_model: Optional[StockModel] = None, ledger_model: Optional[LedgerModel] = None,
+                 storage: Optional[Storage] = None):
+        self.storage = storage or default_storage()
+        self.stock_model = stock_model or StockModel()
+        self.ledger_model = ledger_model or LedgerModel(storage=self.storage)
+        self._valuations: "OrderedDict[int, _Valuation]" = OrderedDict()
+        self._valuations_lock = threading.Lock()
+
+    def buy_stock(self, symbol: str, shares: int, account_id: int = DEFAULT_ACCOUNT_ID) -> Dict:
         """Buy shares of a stock and add to portfolio."""
 
         
@@ -20,224 +105,333 @@ class PortfolioModel:
         if not isinstance(shares, int) or shares <= 0:
             raise ValueError("Shares must be a positive integer")
             
-        # Get current stock price
-        stock_info = self.stock_model.get_stock_info(symbol)
+        # Get current stock price; trades never execute at a stale quote
+        stock_info = self.stock_model.get_stock_info(symbol, max_age=TRADE_QUOTE_MAX_AGE)
         current_price = stock_info["price"]
+        now = datetime.now()
 
         try:
-        # Use the context manager to handle the database connection
-            with sqlite3.connect('/app/db/stocks.db') as conn:
+            with self.storage.account_connection(account_id, write=True) as conn:
                 cursor = conn.cursor()
                 cursor.execute(
-                "INSERT INTO portfolio (symbol, shares, purchase_price, purchase_date) VALUES (?, ?, ?, ?)",
-                (symbol, shares, current_price, datetime.now())
+                    "INSERT INTO portfolio (account_id, symbol, shares, purchase_price, purchase_date) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (account_id, symbol, shares, current_price, now)
                 )
+                self.ledger_model.append_transaction(cursor, account_id, symbol, "buy", shares, current_price, now)
+                self.bump_version(cursor, account_id)
                 conn.commit()
         except sqlite3.Error as e:
             print(f"Database error: {str(e)}")
             raise ValueError("Failed to record purchase in database")
-        except Exception as e:
-            print(f"Error buying stock: {str(e)}")
-            raise ValueError(f"Failed to buy {shares} shares of {symbol}")
+        self.ledger_model.transaction_recorded()
 
+        return {
+            "symbol": symbol,
+            "shares": shares,
+            "price_per_share": current_price,
+            "price_as_of": stock_info.get("as_of"),
+            "price_stale": stock_info.get("stale", False),
+            "total_cost": current_price * shares
+        }
 
-
-            
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "INSERT INTO portfolio (symbol, shares, purchase_price, purchase_date) VALUES (?, ?, ?, ?)",
-                    (symbol, shares, current_price, datetime.now())
-                )
-                conn.commit()
-                
-            return {
-                "symbol": symbol,
-                "shares": shares,
-                "price_per_share": current_price,
-                "total_cost": current_price * shares
-            }
-        
-
-    def sell_stock(self, symbol: str, shares: int) -> Dict:
-        """Sell shares of a stock from portfolio."""
+    def sell_stock(self, symbol: str, shares: int, account_id: int = DEFAULT_ACCOUNT_ID) -> Dict:
+        """Sell shares of a stock from portfolio, matching lots oldest first (FIFO)."""
         if not symbol or not isinstance(symbol, str):
             raise ValueError("Invalid symbol provided")
         if not isinstance(shares, int) or shares <= 0:
             raise ValueError("Shares must be a positive integer")
         # Check if we have enough shares
-        total_shares = self._get_total_shares(symbol)
+        total_shares = self._get_total_shares(symbol, account_id)
         if total_shares < shares:
             raise ValueError(f"Not enough shares to sell. You own {total_shares} shares of {symbol}")
         
-        # Get current stock price
-        stock_info = self.stock_model.get_stock_info(symbol)
+        # Get current stock price; trades never execute at a stale quote
+        stock_info = self.stock_model.get_stock_info(symbol, max_age=TRADE_QUOTE_MAX_AGE)
         current_price = stock_info["price"]
         
-        # Remove shares from portfolio
-        shares_to_remove = shares
         try:
-            with get_db_connection() as conn:
+            # The write lock spans the lot read, so a concurrent sale can't consume the same lots
+            with self.storage.account_connection(account_id, write=True) as conn:
                 cursor = conn.cursor()
                 
                 # Get portfolio entries ordered by purchase date (FIFO)
                 cursor.execute(
-                    "SELECT id, shares FROM portfolio WHERE symbol = ? ORDER BY purchase_date",
-                    (symbol,)
+                    "SELECT id, shares, purchase_price FROM portfolio WHERE account_id = ? AND symbol = ? "
+                    "ORDER BY purchase_date, id",
+                    (account_id, symbol)
                 )
-                entries = cursor.fetchall()
-                
-                for entry_id, entry_shares in entries:
-                    if shares_to_remove <= 0:
-                        break
-                        
-                    if entry_shares <= shares_to_remove:
-                        # Remove entire entry
-                        cursor.execute("DELETE FROM portfolio WHERE id = ?", (entry_id,))
-                        shares_to_remove -= entry_shares
-                    else:
-                        # Update entry with remaining shares
-                        cursor.execute(
-                            "UPDATE portfolio SET shares = ? WHERE id = ?",
-                            (entry_shares - shares_to_remove, entry_id)
-                        )
-                        shares_to_remove = 0
-                        
-                conn.commit()
-        except sqlite3.Error as e:
-            raise sqlite3.Error(f"Database error: {str(e)}")
+                consumed = consume_fifo(cursor.fetchall(), shares)
 
-            
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Get portfolio entries ordered by purchase date (FIFO)
-                cursor.execute(
-                    "SELECT id, shares FROM portfolio WHERE symbol = ? ORDER BY purchase_date",
-                    (symbol,)
+                cursor.executemany(
+                    "DELETE FROM portfolio WHERE id = ?",
+                    [(entry_id,) for entry_id, _, left, _ in consumed if left == 0]
                 )
-                entries = cursor.fetchall()
-                
-                if not entries:
-                    raise ValueError(f"No portfolio entries found for {symbol}")
-                
-                shares_to_remove = shares
-                for entry_id, entry_shares in entries:
-                    if shares_to_remove <= 0:
-                        break
-                        
-                    if entry_shares <= shares_to_remove:
-                        cursor.execute("DELETE FROM portfolio WHERE id = ?", (entry_id,))
-                        shares_to_remove -= entry_shares
-                    else:
-                        cursor.execute(
-                            "UPDATE portfolio SET shares = ? WHERE id = ?",
-                            (entry_shares - shares_to_remove, entry_id)
-                        )
-                        shares_to_remove = 0
-                        
+                cursor.executemany(
+                    "UPDATE portfolio SET shares = ? WHERE id = ?",
+                    [(left, entry_id) for entry_id, _, left, _ in consumed if left > 0]
+                )
+                self.ledger_model.append_transaction(cursor, account_id, symbol, "sell", shares, current_price, datetime.now())
+                self.bump_version(cursor, account_id)
                 conn.commit()
-                
-            return {
-                "symbol": symbol,
-                "shares_sold": shares,
-                "price_per_share": current_price,
-                "total_value": current_price * shares
-            }
-        except sqlite3.Error as e:
-            print(f"Database error: {str(e)}")
-            raise ValueError("Failed to record sale in database")
-        except Exception as e:
-            print(f"Error selling stock: {str(e)}")
-            raise ValueError(f"Failed to sell {shares} shares of {symbol}")
-
-    def get_portfolio(self) -> List[Dict]:
-        """Get current portfolio with latest stock prices."""
-        portfolio = []
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Get unique symbols and total shares
-                cursor.execute("""
-                    SELECT symbol, SUM(shares) as total_shares
-                    FROM portfolio
-                    GROUP BY symbol
-                    HAVING total_shares > 0
-                """)
-                
-                holdings = cursor.fetchall()
-                
-                for symbol, shares in holdings:
-                    # Get current stock price
-                    stock_info = self.stock_model.get_stock_info(symbol)
-                    current_price = stock_info["price"]
-                    
-                    # Calculate average purchase price
-                    cursor.execute("""
-                        SELECT AVG(purchase_price)
-                        FROM portfolio
-                        WHERE symbol = ?
-                    """, (symbol,))
-                    avg_purchase_price = cursor.fetchone()[0]
-                    
-                    portfolio.append({
-                        "symbol": symbol,
-                        "shares": shares,
-                        "current_price": current_price,
-                        "current_value": current_price * shares,
-                        "avg_purchase_price": avg_purchase_price,
-                        "total_gain_loss": (current_price - avg_purchase_price) * shares
-                    })
         except sqlite3.Error as e:
             raise sqlite3.Error(f"Database error: {str(e)}")
-                
-        return portfolio
+        self.ledger_model.transaction_recorded()
+
+        return {
+            "symbol": symbol,
+            "shares_sold": shares,
+            "price_per_share": current_price,
+            "price_as_of": stock_info.get("as_of"),
+            "price_stale": stock_info.get("stale", False),
+            "total_value": current_price * shares,
+            "realized_gain_loss": realized_gain(consumed, current_price)
+        }
+
+    def get_portfolio(self, account_id: int = DEFAULT_ACCOUNT_ID) -> List[Dict]:
+        """Get an account's current portfolio with latest stock prices."""
+        valuation = self._valuation(account_id)
+        return [{
+            "symbol": holding.symbol,
+            "currency": holding.currency,
+            "shares": holding.shares,
+            "current_price": holding.current_price,
+            "price_as_of": quote.as_of(),
+            "price_stale": not quote.is_fresh(),
+            "current_value": holding.current_value,
+            "avg_purchase_price": holding.avg_purchase_price,
+            "total_gain_loss": holding.total_gain_loss
+        } for holding, quote in zip(valuation.holdings, valuation.quotes)]
 
-    def get_portfolio_value(self) -> Dict:
-        """Calculate total portfolio value and gains/losses."""
+    def get_portfolio_value(self, account_id: int = DEFAULT_ACCOUNT_ID, base_currency: str = "USD") -> Dict:
+        """
+        Calculate an account's total portfolio value and gains/losses in base_currency.
+
+        Holdings are valued in their listing currency and converted at current FX rates (cost
+        included), fetching one rate per distinct currency rather than one per holding.
+        """
+        base_currency = normalize_currency(base_currency)
         try:
-            portfolio = self.get_portfolio()
+            valuation = self._valuation(account_id)
             
-            if not portfolio:
+            if not valuation.holdings:
                 return {
                     "total_value": 0.0,
                     "total_cost": 0.0,
                     "total_gain_loss": 0.0,
-                    "total_gain_loss_percent": 0.0
+                    "total_gain_loss_percent": 0.0,
+                    "base_currency": base_currency,
+                    "fx_rates": {},
+                    "prices_as_of": None,
+                    "stale": False
                 }
-            
-            total_value = sum(holding["current_value"] for holding in portfolio)
-            total_cost = sum(holding["avg_purchase_price"] * holding["shares"] for holding in portfolio)
-            total_gain_loss = sum(holding["total_gain_loss"] for holding in portfolio)
-            
+
+            rates, fx_entries = self._fx_rates(set(valuation.currencies), base_currency)
+            fx_versions = tuple(sorted((pair, entry.version) for pair, entry in fx_entries.items()))
+            cached = valuation.totals.get(base_currency)
+            if cached is not None and cached[0] == fx_versions:
+                totals = cached[1]
+            else:
+                totals = convert(valuation.amounts, valuation.currencies, rates).sum(axis=0)
+                valuation.totals[base_currency] = (fx_versions, totals)
+            total_value, total_cost, total_gain_loss = (float(total) for total in totals)
+
             return {
                 "total_value": total_value,
                 "total_cost": total_cost,
                 "total_gain_loss": total_gain_loss,
-                "total_gain_loss_percent": (total_gain_loss / total_cost * 100) if total_cost > 0 else 0
-            }
-        except ZeroDivisionError:
-            return {
-                "total_value": 0.0,
-                "total_cost": 0.0,
-                "total_gain_loss": 0.0,
-                "total_gain_loss_percent": 0.0
+                "total_gain_loss_percent": (total_gain_loss / total_cost * 100) if total_cost > 0 else 0,
+                "base_currency": base_currency,
+                "fx_rates": {currency: rate for currency, rate in rates.items() if currency != base_currency},
+                # The oldest quote the value is based on, and whether any quote or rate is stale
+                "prices_as_of": min(quote.as_of() for quote in valuation.quotes),
+                "stale": not all(entry.is_fresh() for entry in valuation.quotes + list(fx_entries.values()))
             }
+        except (CircuitOpenError, ValueError):
+            raise
         except Exception as e:
             print(f"Error calculating portfolio value: {str(e)}")
             raise ValueError("Failed to calculate portfolio value")
 
-    def _get_total_shares(self, symbol: str) -> int:
-        """Get total shares owned of a particular stock."""
+    def _fx_rates(self, currencies, base_currency: str) -> Tuple[Dict[str, float], Dict[str, CacheEntry]]:
+        """
+        Rate into base_currency for each currency, and the FX cache entries used (by pair).
+        Minor units (GBX) are converted through their major currency.
+        """
+        base_major, base_factor = major_currency(base_currency)
+        rates, entries = {}, {}
+        for currency in currencies:
+            major, factor = major_currency(currency)
+            if major == base_major:
+                rates[currency] = factor / base_factor
+                continue
+            pair = f"{major}/{base_major}"
+            if pair not in entries:
+                entries[pair] = self.stock_model.get_exchange_rate_entry(major, base_major)
+            rates[currency] = factor * entries[pair].value["rate"] / base_factor
+        return rates, entries
+
+    def _valuation(self, account_id: int) -> _Valuation:
+        """
+        The account's valuation, reusing as much of the cached one as is still valid: all of
+        it while no lot or quote has changed, the unchanged holdings while only some quotes
+        have, and nothing (re-aggregating the lots) once the portfolio version has moved.
+        """
+        quotes = self.stock_model.quote_cache
+        version = self._get_version(account_id)
+        cached = self._valuations.get(account_id)
+        if (cached is not None and cached.portfolio_version == version and time.time() < cached.expires_at
+                and self._quotes_unchanged(cached, quotes)):
+            _VALUATIONS_HIT.inc()
+            with self._valuations_lock:
+                if account_id in self._valuations:
+                    self._valuations.move_to_end(account_id)
+            return cached
+
+        # Read before the quotes, so a quote stored meanwhile invalidates this valuation next time
+        generation = quotes.generation
+        if cached is not None and cached.portfolio_version == version:
+            positions = [(h.symbol, h.shares, h.avg_purchase_price) for h in cached.holdings]
+            previous = {holding.symbol: holding for holding in cached.holdings}
+            _VALUATIONS_PARTIAL.inc()
+        else:
+            positions = self._load_holdings(account_id)
+            previous = {}
+            _VALUATIONS_FULL.inc()
+
+        holdings, entries = [], []
+        for symbol, shares, avg_purchase_price in positions:
+            quote = self.stock_model.get_stock_entry(symbol)
+            holding = previous.get(symbol)
+            if holding is None or holding.quote_version != quote.version:
+                holding = _Holding(symbol, shares, avg_purchase_price, quote)
+            holdings.append(holding)
+            entries.append(quote)
+
+        valuation = _Valuation(version, generation, holdings, entries)
+        with self._valuations_lock:
+            self._valuations[account_id] = valuation
+            self._valuations.move_to_end(account_id)
+            while len(self._valuations) > VALUATION_CACHE_ACCOUNTS:
+                self._valuations.popitem(last=False)
+        return valuation
+
+    @staticmethod
+    def _quotes_unchanged(valuation: _Valuation, quotes: TTLCache) -> bool:
+        """
+        Whether no held symbol's quote has been replaced since the valuation. Quotes for
+        other symbols (other accounts' holdings, stream pollers) don't count.
+        """
+        generation = quotes.generation
+        if valuation.quote_generation == generation:
+            return True
+        for holding, quote in zip(valuation.holdings, valuation.quotes):
+            if quotes.peek(holding.symbol) is not quote:
+                return False
+        # Confirmed as of this generation; the next read can skip the check
+        valuation.quote_generation = generation
+        return True
+
+    def _load_holdings(self, account_id: int) -> List[Tuple[str, int, float]]:
+        """(symbol, total shares, average purchase price) for every symbol the account holds."""
+        try:
+            with self.storage.account_connection(account_id) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT symbol, SUM(shares) as total_shares, AVG(purchase_price)
+                    FROM portfolio
+                    WHERE account_id = ?
+                    GROUP BY symbol
+                    HAVING total_shares > 0
+                """, (account_id,))
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+
+    def _get_version(self, account_id: int) -> int:
+        try:
+            with self.storage.account_connection(account_id) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT version FROM portfolio_versions WHERE account_id = ?", (account_id,))
+                row = cursor.fetchone()
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+        return row[0] if row else 0
+
+    @staticmethod
+    def bump_version(cursor: sqlite3.Cursor, account_id: int) -> None:
+        """
+        Mark an account's lots as changed, invalidating cached valuations in every process.
+        Call inside the transaction that changes the lots.
+        """
+        cursor.execute(
+            "INSERT INTO portfolio_versions (account_id, version) VALUES (?, 1) "
+            "ON CONFLICT (account_id) DO UPDATE SET version = version + 1",
+            (account_id,)
+        )
+
+    def get_positions(self, account_id: int = DEFAULT_ACCOUNT_ID) -> Dict[str, int]:
+        """Get total shares held per symbol in an account, without fetching quotes."""
+        try:
+            with self.storage.account_connection(account_id) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT symbol, SUM(shares) as total_shares
+                    FROM portfolio
+                    WHERE account_id = ?
+                    GROUP BY symbol
+                    HAVING total_shares > 0
+                """, (account_id,))
+                return dict(cursor.fetchall())
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+
+    def get_lots(self, account_id: int = DEFAULT_ACCOUNT_ID) -> List[Dict]:
+        """Get every open lot in an account, oldest first."""
         try:
-            with get_db_connection() as conn:
+            with self.storage.account_connection(account_id) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT id, symbol, shares, purchase_price, purchase_date FROM portfolio WHERE account_id = ? "
+                    "ORDER BY purchase_date, id",
+                    (account_id,)
+                )
+                return [{
+                    "id": lot_id,
+                    "symbol": symbol,
+                    "shares": shares,
+                    "purchase_price": purchase_price,
+                    "purchase_date": purchase_date
+                } for lot_id, symbol, shares, purchase_price, purchase_date in cursor.fetchall()]
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
 
+    def get_held_symbols(self) -> List[str]:
+        """Get every symbol with a positive number of shares in any account, across all shards."""
+        symbols = set()
+        try:
+            for shard in self.storage.all_shards():
+                with self.storage.shard_connection(shard) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("""
+                        SELECT symbol, SUM(shares) as total_shares
+                        FROM portfolio
+                        GROUP BY account_id, symbol
+                        HAVING total_shares > 0
+                    """)
+                    symbols.update(symbol for symbol, _ in cursor.fetchall())
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+        return sorted(symbols)
 
+    def _get_total_shares(self, symbol: str, account_id: int = DEFAULT_ACCOUNT_ID) -> int:
+        """Get total shares of a particular stock owned by an account."""
+        try:
+            with self.storage.account_connection(account_id) as conn:
                 cursor = conn.cursor()
                 cursor.execute(
-                    "SELECT SUM(shares) FROM portfolio WHERE symbol = ?",
-                    (symbol,)
+                    "SELECT SUM(shares) FROM portfolio WHERE account_id = ? AND symbol = ?",
+                    (account_id, symbol)
                 )
                 result = cursor.fetchone()[0]
         except sqlite3.Error as e:
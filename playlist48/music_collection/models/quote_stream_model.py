@@ -0,0 +1,148 @@
+import logging
+import os
+import queue
+import threading
+from typing import Any, Dict, Optional, Set
+
+from music_collection.models.stock_model import QUOTE_TTL, StockModel
+from music_collection.utils.logger import configure_logger
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# How often each symbol's poller refreshes its quote (seconds)
+STREAM_POLL_INTERVAL = float(os.getenv("STREAM_POLL_INTERVAL", str(QUOTE_TTL)))
+# Quotes buffered per client before it is considered too slow and dropped
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "16"))
+
+# Placed on a subscriber's queue when it has been dropped
+CLOSED = object()
+
+
+class Subscription:
+    """A single client's bounded queue of quotes for one symbol."""
+
+    def __init__(self, symbol: str, maxsize: int = STREAM_QUEUE_SIZE):
+        self.symbol = symbol
+        self.dropped = False
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def get(self, timeout: float) -> Optional[Any]:
+        """
+        Wait for the next quote.
+
+        Returns:
+            The quote dict, CLOSED if the subscription was dropped, or None on timeout.
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def offer(self, quote: Dict[str, Any]) -> bool:
+        """Queue a quote without blocking; returns False if the queue is full."""
+        try:
+            self._queue.put_nowait(quote)
+            return True
+        except queue.Full:
+            return False
+
+    def close(self) -> None:
+        """Discard pending quotes and wake the consumer with CLOSED."""
+        self.dropped = True
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._queue.put_nowait(CLOSED)
+
+
+class _Poller:
+    def __init__(self, symbol: str, last_version: Optional[str] = None):
+        self.symbol = symbol
+        # Version of the last quote subscribers were sent, published or not
+        self.last_version = last_version
+        self.stop = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+
+class QuoteStreamModel:
+    """
+    Fans out live quotes to streaming clients.
+
+    One background poller runs per subscribed symbol and pushes each new quote to every
+    subscriber of that symbol, so upstream calls scale with distinct symbols rather than
+    with connected clients. A poller stops when its symbol loses its last subscriber.
+    """
+
+    def __init__(self, stock_model: StockModel, poll_interval: float = STREAM_POLL_INTERVAL):
+        self.stock_model = stock_model
+        self.poll_interval = poll_interval
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._pollers: Dict[str, _Poller] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, symbol: str) -> Subscription:
+        """Register a new subscriber for symbol, starting its poller if needed."""
+        symbol = symbol.upper()
+        subscription = Subscription(symbol)
+
+        # Send the last known quote straight away so the client doesn't wait a full interval
+        entry = self.stock_model.quote_cache.peek(symbol)
+        if entry is not None:
+            subscription.offer(entry.value)
+
+        with self._lock:
+            self._subscribers.setdefault(symbol, set()).add(subscription)
+            if symbol not in self._pollers:
+                # The quote just sent counts as published, so the first poll doesn't repeat it
+                poller = _Poller(symbol, entry.version if entry is not None else None)
+                poller.thread = threading.Thread(
+                    target=self._poll, args=(poller,), name=f"quote-poller-{symbol}", daemon=True)
+                self._pollers[symbol] = poller
+                poller.thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscriber; stops the symbol's poller when it was the last one."""
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.symbol)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.symbol]
+                poller = self._pollers.pop(subscription.symbol, None)
+                if poller is not None:
+                    poller.stop.set()
+
+    def subscriber_count(self, symbol: str) -> int:
+        return len(self._subscribers.get(symbol.upper(), ()))
+
+    def active_symbols(self) -> Set[str]:
+        return set(self._pollers)
+
+    def publish(self, symbol: str, quote: Dict[str, Any]) -> None:
+        """Push a quote to every subscriber of symbol, dropping those that can't keep up."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(symbol, ()))
+
+        for subscription in subscribers:
+            if not subscription.offer(quote):
+                logger.info("Dropping slow stream subscriber for %s", symbol)
+                self.unsubscribe(subscription)
+                subscription.close()
+
+    def _poll(self, poller: _Poller) -> None:
+        while not poller.stop.is_set():
+            try:
+                entry = self.stock_model.get_stock_entry(poller.symbol)
+                if entry.version != poller.last_version:
+                    poller.last_version = entry.version
+                    self.publish(poller.symbol, entry.value)
+            except Exception as e:
+                logger.warning("Stream poll failed for %s: %s", poller.symbol, e)
+            poller.stop.wait(self.poll_interval)
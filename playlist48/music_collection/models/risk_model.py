@@ -0,0 +1,152 @@
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from music_collection.models.history_model import HistoryModel
+from music_collection.models.portfolio_model import DEFAULT_ACCOUNT_ID, PortfolioModel
+
+
+TRADING_DAYS = 252
+# Risk results kept in memory, one per account and parameter set; the least recently read
+# is dropped beyond this
+RISK_CACHE_ENTRIES = int(os.getenv("RISK_CACHE_ENTRIES", "1000"))
+
+
+class RiskModel:
+    """
+    Portfolio risk analytics over locally stored daily closes.
+
+    The closes of every holding (and the benchmark) are aligned into one date x symbol
+    matrix and all statistics are computed on it with NumPy. Results are memoized on the
+    positions, parameters and latest stored bar per symbol, so they are only recomputed
+    when the book changes or a new bar arrives. Only the latest result per account and
+    parameter set is kept, for up to RISK_CACHE_ENTRIES of them.
+    """
+
+    def __init__(self, portfolio_model: PortfolioModel, history_model: HistoryModel):
+        self.portfolio_model = portfolio_model
+        self.history_model = history_model
+        # (account_id, benchmark, confidence, lookback) -> (positions and bars, result)
+        self._memo: "OrderedDict[Tuple, Tuple[Tuple, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_portfolio_risk(self, benchmark: str = "SPY", confidence: float = 0.95,
+                           lookback: int = TRADING_DAYS, account_id: int = DEFAULT_ACCOUNT_ID) -> Dict[str, Any]:
+        """
+        Compute volatility, correlation, beta and historical VaR for an account's portfolio.
+
+        Args:
+            benchmark (str): Symbol used as the market for beta.
+            confidence (float): VaR confidence level, e.g. 0.95.
+            lookback (int): Maximum number of daily returns to use.
+            account_id (int): The account whose holdings are analysed.
+
+        Returns:
+            Dict with portfolio-level figures, per-holding figures and the correlation matrix.
+        """
+        if not 0.5 <= confidence < 1:
+            raise ValueError("Confidence must be between 0.5 and 1")
+        if lookback < 2:
+            raise ValueError("Lookback must be at least 2 days")
+
+        benchmark = benchmark.upper()
+        positions = self.portfolio_model.get_positions(account_id)
+        if not positions:
+            raise ValueError("Portfolio is empty")
+
+        symbols = sorted(positions)
+        latest = self.history_model.ensure_history(symbols + [benchmark])
+        key = (account_id, benchmark, confidence, lookback)
+        inputs = (tuple((s, positions[s]) for s in symbols), tuple(sorted(latest.items())))
+
+        cached = self._memo.get(key)
+        if cached is not None and cached[0] == inputs:
+            with self._lock:
+                if key in self._memo:
+                    self._memo.move_to_end(key)
+            return cached[1]
+
+        result = self._compute(positions, symbols, benchmark, confidence, lookback)
+        with self._lock:
+            self._memo[key] = (inputs, result)
+            self._memo.move_to_end(key)
+            while len(self._memo) > RISK_CACHE_ENTRIES:
+                self._memo.popitem(last=False)
+        return result
+
+    def _compute(self, positions: Dict[str, int], symbols, benchmark: str, confidence: float,
+                 lookback: int) -> Dict[str, Any]:
+        columns = symbols + ([benchmark] if benchmark not in symbols else [])
+        closes = self.history_model.load_closes(columns)
+        closes = closes.ffill().dropna().tail(lookback + 1)
+        if len(closes) < 3:
+            raise ValueError("Not enough overlapping history to compute risk")
+
+        prices = closes.to_numpy(dtype=float)
+        returns = prices[1:] / prices[:-1] - 1.0
+        holding_returns = returns[:, :len(symbols)]
+        benchmark_returns = returns[:, columns.index(benchmark)]
+
+        shares = np.array([positions[s] for s in symbols], dtype=float)
+        values = shares * prices[-1, :len(symbols)]
+        total_value = float(values.sum())
+        weights = values / total_value
+
+        portfolio_returns = holding_returns @ weights
+        annualize = math.sqrt(TRADING_DAYS)
+        holding_vol = holding_returns.std(axis=0, ddof=1) * annualize
+        portfolio_vol = float(portfolio_returns.std(ddof=1) * annualize)
+
+        benchmark_var = float(benchmark_returns.var(ddof=1))
+        centered_bench = benchmark_returns - benchmark_returns.mean()
+        if benchmark_var > 0:
+            holding_beta = (holding_returns - holding_returns.mean(axis=0)).T @ centered_bench / (
+                (len(returns) - 1) * benchmark_var)
+            portfolio_beta = float((portfolio_returns - portfolio_returns.mean()) @ centered_bench / (
+                (len(returns) - 1) * benchmark_var))
+        else:
+            holding_beta = np.full(len(symbols), np.nan)
+            portfolio_beta = float("nan")
+
+        correlation = np.corrcoef(holding_returns, rowvar=False) if len(symbols) > 1 else np.ones((1, 1))
+
+        # Historical VaR/CVaR: losses at the (1 - confidence) quantile of daily returns
+        cutoff = float(np.quantile(portfolio_returns, 1 - confidence))
+        tail = portfolio_returns[portfolio_returns <= cutoff]
+        var_percent = -cutoff
+        cvar_percent = -float(tail.mean()) if tail.size else var_percent
+
+        return {
+            "as_of": closes.index[-1].date().isoformat(),
+            "observations": int(len(returns)),
+            "benchmark": benchmark,
+            "confidence": confidence,
+            "portfolio": {
+                "value": total_value,
+                "volatility": portfolio_vol,
+                "beta": _clean(portfolio_beta),
+                "var_1d": var_percent * total_value,
+                "var_1d_percent": var_percent * 100,
+                "cvar_1d": cvar_percent * total_value
+            },
+            "holdings": [{
+                "symbol": symbol,
+                "shares": int(positions[symbol]),
+                "weight": float(weights[i]),
+                "volatility": float(holding_vol[i]),
+                "beta": _clean(float(holding_beta[i]))
+            } for i, symbol in enumerate(symbols)],
+            "correlation": {
+                "symbols": symbols,
+                "matrix": [[_clean(float(v)) for v in row] for row in correlation]
+            }
+        }
+
+
+def _clean(value: float) -> Optional[float]:
+    """NaN is not valid JSON; report undefined statistics as null."""
+    return None if math.isnan(value) else value
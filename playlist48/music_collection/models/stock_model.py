@@ -1,30 +1,391 @@
-from typing import Dict, Any
+from typing import Awaitable, Callable, Dict, Any, Iterable, List, Optional
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import asyncio
 import requests
 import os
+import threading
+import time
+import weakref
 from dotenv import load_dotenv
+import httpx
+
+from music_collection.utils.cache import CacheEntry, TTLCache
+from music_collection.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from music_collection.utils.fx_utils import load_stub_rates, normalize_currency, stub_rate
+from music_collection.utils.metrics import (CACHE_STALE_SERVED, UPSTREAM_ERRORS, UPSTREAM_QUOTA_REMAINING,
+                                            UPSTREAM_REQUEST_DURATION)
+
+# Freshness windows for cached market data (seconds)
+QUOTE_TTL = float(os.getenv("QUOTE_TTL", "15"))
+COMPANY_TTL = float(os.getenv("COMPANY_TTL", "86400"))
+INTRADAY_TTL = float(os.getenv("INTRADAY_TTL", "60"))
+# Symbols with intraday data in memory: both the cached upstream responses and the
+# IntradayModel ring buffers (the least recently used one is spilled and dropped beyond this)
+INTRADAY_MAX_SYMBOLS = int(os.getenv("INTRADAY_MAX_SYMBOLS", "500"))
+FX_TTL = float(os.getenv("FX_TTL", "3600"))
+
+# Where exchange rates come from: "alpha_vantage" (CURRENCY_EXCHANGE_RATE) or "stub"
+# (the bundled FX_STUB_RATES table, for offline use)
+FX_PROVIDER = os.getenv("FX_PROVIDER", "alpha_vantage")
+
+# Expired market data is still served, marked stale, for this long while a refresh runs
+STALE_TTL = float(os.getenv("MARKET_DATA_STALE_TTL", "86400"))
+# Oldest quote a trade executes at; an older one is refetched first, never served stale
+TRADE_QUOTE_MAX_AGE = float(os.getenv("TRADE_QUOTE_MAX_AGE", str(QUOTE_TTL)))
+
+# Alpha Vantage's free tier allows this many calls per day
+DAILY_CALL_LIMIT = int(os.getenv("ALPHA_VANTAGE_DAILY_LIMIT", "25"))
+
+# Upper bound on concurrent upstream connections from the async client (per event loop)
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "32"))
+
+# Seconds an upstream call may take before it is abandoned
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "5"))
+
+# Consecutive upstream failures that open the circuit, and seconds before it lets a probe through
+UPSTREAM_FAILURE_THRESHOLD = int(os.getenv("UPSTREAM_FAILURE_THRESHOLD", "5"))
+UPSTREAM_RESET_TIMEOUT = float(os.getenv("UPSTREAM_RESET_TIMEOUT", "30"))
+
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+# Daily bars are published shortly after the 16:00 close
+MARKET_CLOSE_HOUR = 16
+MARKET_CLOSE_DELAY = timedelta(minutes=30)
+
+
+def last_completed_session(now: datetime = None) -> str:
+    """ISO date of the most recent weekday session whose daily bar should be published."""
+    now = now or datetime.now(MARKET_TIMEZONE)
+    close = now.replace(hour=MARKET_CLOSE_HOUR, minute=0, second=0, microsecond=0) + MARKET_CLOSE_DELAY
+    day = now.date() if now >= close else now.date() - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day.isoformat()
+
+
+def seconds_until_next_close(now: datetime = None) -> float:
+    """Seconds until the next weekday market close (plus publishing delay)."""
+    now = now or datetime.now(MARKET_TIMEZONE)
+    close = now.replace(hour=MARKET_CLOSE_HOUR, minute=0, second=0, microsecond=0) + MARKET_CLOSE_DELAY
+    if close <= now:
+        close += timedelta(days=1)
+    while close.weekday() >= 5:
+        close += timedelta(days=1)
+    return (close - now).total_seconds()
+
 
 class StockModel:
     def __init__(self):
         load_dotenv()
         self.api_key = os.getenv('ALPHA_VANTAGE_API_KEY')
-        self.base_url = 'https://www.alphavantage.co/query'
+        self.base_url = os.getenv('ALPHA_VANTAGE_BASE_URL', 'https://www.alphavantage.co/query')
+        self.quote_cache = TTLCache("quote")
+        self.history_cache = TTLCache("history")
+        self.company_cache = TTLCache("company")
+        self.intraday_cache = TTLCache("intraday", max_entries=INTRADAY_MAX_SYMBOLS)
+        self.fx_cache = TTLCache("fx")
+        # Stale-served counters by cache name, looked up once rather than on every serve
+        self._stale_served = {cache.name: CACHE_STALE_SERVED.labels(cache.name)
+                              for cache in (self.quote_cache, self.history_cache, self.company_cache,
+                                            self.intraday_cache, self.fx_cache)}
+        self.fx_provider = FX_PROVIDER
+        self._stub_rates: Optional[Dict[str, float]] = None
+        self._quota_lock = threading.Lock()
+        self._quota_day = None
+        self._calls_today = 0
+        self._quote_listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self.breaker = CircuitBreaker("Alpha Vantage", UPSTREAM_FAILURE_THRESHOLD, UPSTREAM_RESET_TIMEOUT)
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._symbol_directory = None
+        # Per event loop: the shared async HTTP client and the fetches in flight
+        self._async_state = weakref.WeakKeyDictionary()
+
+    def add_quote_listener(self, listener: Callable[[str, Dict[str, Any]], None]) -> None:
+        """Register a callback invoked with (symbol, quote) whenever a new quote is fetched."""
+        self._quote_listeners.append(listener)
+
+    def set_symbol_directory(self, directory) -> None:
+        """Reject symbols the directory (anything with is_known(symbol)) doesn't list, before calling upstream."""
+        self._symbol_directory = directory
 
-    def get_stock_info(self, symbol: str) -> Dict[str, Any]:
-        """Get current stock information."""
-        params = {
+    def _check_symbol(self, symbol: str) -> None:
+        if self._symbol_directory is not None and not self._symbol_directory.is_known(symbol):
+            raise ValueError(f"Unknown symbol: {symbol}")
+
+    def _notify_quote(self, symbol: str, quote: Dict[str, Any]) -> None:
+        for listener in self._quote_listeners:
+            try:
+                listener(symbol, quote)
+            except Exception as e:
+                print(f"Quote listener error: {str(e)}")
+
+    def _call_api(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Call Alpha Vantage, recording latency, errors and the remaining daily quota.
+
+        Raises:
+            CircuitOpenError: If recent calls failed and the circuit is refusing new ones.
+        """
+        function = params['function']
+        self.breaker.check()
+        start = time.perf_counter()
+        data = None
+        try:
+            response = requests.get(self.base_url, params=params, timeout=UPSTREAM_TIMEOUT)
+            data = response.json()
+        except requests.exceptions.Timeout:
+            UPSTREAM_ERRORS.labels(function, "timeout").inc()
+            raise
+        except requests.exceptions.RequestException:
+            UPSTREAM_ERRORS.labels(function, "request").inc()
+            raise
+        except ValueError:
+            UPSTREAM_ERRORS.labels(function, "invalid_json").inc()
+            raise
+        finally:
+            UPSTREAM_REQUEST_DURATION.labels(function).observe(time.perf_counter() - start)
+            if data is None:
+                self.breaker.record_failure()
+        return self._record_call(function, data)
+
+    async def _call_api_async(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Async counterpart of _call_api, sharing one connection pool per event loop."""
+        function = params['function']
+        self.breaker.check()
+        start = time.perf_counter()
+        data = None
+        try:
+            response = await self._loop_state().client.get(self.base_url, params=params)
+            data = response.json()
+        except httpx.TimeoutException:
+            UPSTREAM_ERRORS.labels(function, "timeout").inc()
+            raise
+        except httpx.HTTPError:
+            UPSTREAM_ERRORS.labels(function, "request").inc()
+            raise
+        except ValueError:
+            UPSTREAM_ERRORS.labels(function, "invalid_json").inc()
+            raise
+        finally:
+            UPSTREAM_REQUEST_DURATION.labels(function).observe(time.perf_counter() - start)
+            if data is None:
+                self.breaker.record_failure()
+        return self._record_call(function, data)
+
+    def _call_api_checked(self, params: Dict[str, Any], what: str, symbol: str) -> Dict[str, Any]:
+        """_call_api, reporting any transport or decoding failure as a ValueError."""
+        try:
+            return self._call_api(params)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            print(f"Exception: {str(e)}")
+            raise ValueError(f"Could not fetch {what} for symbol {symbol}")
+
+    async def _call_api_checked_async(self, params: Dict[str, Any], what: str, symbol: str) -> Dict[str, Any]:
+        """_call_api_async, reporting any transport or decoding failure as a ValueError."""
+        try:
+            return await self._call_api_async(params)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            print(f"Exception: {str(e)}")
+            raise ValueError(f"Could not fetch {what} for symbol {symbol}")
+
+    def _record_call(self, function: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        # Rate-limit and quota messages come back as a 200 with a "Note" or "Information" key
+        rate_limited = "Note" in data or "Information" in data
+        with self._quota_lock:
+            today = datetime.now(MARKET_TIMEZONE).date()
+            if today != self._quota_day:
+                self._quota_day = today
+                self._calls_today = 0
+            self._calls_today += 1
+            if rate_limited:
+                self._calls_today = max(self._calls_today, DAILY_CALL_LIMIT)
+            UPSTREAM_QUOTA_REMAINING.set(max(0, DAILY_CALL_LIMIT - self._calls_today))
+        if rate_limited:
+            UPSTREAM_ERRORS.labels(function, "rate_limited").inc()
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return data
+
+    def fetch_listing_status(self) -> str:
+        """
+        Download Alpha Vantage's LISTING_STATUS CSV of active listings.
+
+        Raises:
+            CircuitOpenError: If recent calls failed and the circuit is refusing new ones.
+            ValueError: If the response is not a listing (e.g. an error or quota message).
+        """
+        function = 'LISTING_STATUS'
+        self.breaker.check()
+        start = time.perf_counter()
+        text = None
+        try:
+            response = requests.get(self.base_url, params={'function': function, 'apikey': self.api_key},
+                                    timeout=UPSTREAM_TIMEOUT)
+            response.raise_for_status()
+            text = response.text
+        except requests.exceptions.Timeout:
+            UPSTREAM_ERRORS.labels(function, "timeout").inc()
+            raise
+        except requests.exceptions.RequestException:
+            UPSTREAM_ERRORS.labels(function, "request").inc()
+            raise
+        finally:
+            UPSTREAM_REQUEST_DURATION.labels(function).observe(time.perf_counter() - start)
+            if text is None:
+                self.breaker.record_failure()
+
+        # Errors and quota messages come back as JSON rather than CSV
+        if text.lstrip().startswith("{"):
+            self._record_call(function, response.json())
+            raise ValueError(f"Could not fetch the symbol listing: {text[:200]}")
+        self._record_call(function, {})
+        return text
+
+    def _stale_entry(self, cache: TTLCache, key: str) -> Optional[CacheEntry]:
+        """An expired entry that may still be served while it is refreshed, if there is one."""
+        entry = cache.peek(key)
+        if entry is not None and time.time() < entry.expires_at + STALE_TTL:
+            self._stale_served[cache.name].inc()
+            return entry
+        return None
+
+    def _serve(self, cache: TTLCache, key: str, fetch: Callable[[], CacheEntry],
+               check_symbol: bool = True) -> CacheEntry:
+        """
+        Return the fresh entry for key; failing that a stale one while fetch refreshes it on a
+        background thread; failing that, call fetch now (for a symbol key, only if it is listed).
+        """
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        stale = self._stale_entry(cache, key)
+        if stale is None:
+            if check_symbol:
+                self._check_symbol(key)
+            return fetch()
+        self._refresh_in_background((cache.name, key), fetch)
+        return stale
+
+    def _refresh_in_background(self, key, fetch: Callable[[], CacheEntry]) -> None:
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                fetch()
+            except Exception as e:
+                print(f"Background refresh of {key[1]} failed: {str(e)}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"refresh-{key[0]}-{key[1]}", daemon=True).start()
+
+    async def _serve_async(self, cache: TTLCache, key: str, fetch: Callable[[], Awaitable[CacheEntry]]) -> CacheEntry:
+        """Async _serve: the fetch (now or in the background) is shared with concurrent callers."""
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        stale = self._stale_entry(cache, key)
+        if stale is None:
+            # The first check may load the symbol directory from SQLite or upstream
+            await asyncio.to_thread(self._check_symbol, key)
+            return await self._single_flight((cache.name, key), fetch)
+        refresh = self._start_flight((cache.name, key), fetch)
+        # Nobody may await a background refresh; take its error (already logged) off the future
+        refresh.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return stale
+
+    def get_stock_info(self, symbol: str, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Get current stock information, with when it was fetched ("as_of") and whether it is "stale".
+        See get_stock_entry for max_age.
+        """
+        return self._with_age(self.get_stock_entry(symbol, max_age))
+
+    @staticmethod
+    def _with_age(entry: CacheEntry) -> Dict[str, Any]:
+        return dict(entry.value, as_of=entry.as_of(), stale=not entry.is_fresh())
+
+    def get_stock_entry(self, symbol: str, max_age: Optional[float] = None) -> CacheEntry:
+        """
+        Get current stock information as a cache entry (value, version and freshness).
+
+        An expired quote is returned while a refresh runs in the background. With max_age
+        (trades: TRADE_QUOTE_MAX_AGE), a cached quote older than max_age seconds is never
+        returned; a new one is fetched now instead.
+
+        Raises:
+            CircuitOpenError: If a fetch is needed and Alpha Vantage calls are being refused.
+            ValueError: If the symbol is unknown or the quote can't be fetched.
+        """
+        key = symbol.upper()
+
+        def fetch():
+            entry = self.quote_cache.set(key, self._fetch_stock_info(symbol), QUOTE_TTL)
+            self._notify_quote(key, entry.value)
+            return entry
+        if max_age is not None:
+            entry = self.quote_cache.get(key)
+            if entry is not None and entry.age() <= max_age:
+                return entry
+            self._check_symbol(key)
+            return fetch()
+        return self._serve(self.quote_cache, key, fetch)
+
+    async def get_stock_info_async(self, symbol: str) -> Dict[str, Any]:
+        """Get current stock information without blocking the event loop."""
+        return self._with_age(await self.get_stock_entry_async(symbol))
+
+    async def get_stock_entry_async(self, symbol: str, max_age: Optional[float] = None) -> CacheEntry:
+        """Async get_stock_entry: concurrent callers for the same symbol share one upstream fetch."""
+        key = symbol.upper()
+
+        async def fetch():
+            data = await self._call_api_checked_async(self._stock_info_params(symbol), "data", symbol)
+            entry = self.quote_cache.set(key, self._parse_stock_info(symbol, data), QUOTE_TTL)
+            # Listeners (alert evaluation) query SQLite, so keep them off the event loop
+            await asyncio.to_thread(self._notify_quote, key, entry.value)
+            return entry
+        if max_age is not None:
+            entry = self.quote_cache.get(key)
+            if entry is not None and entry.age() <= max_age:
+                return entry
+            await asyncio.to_thread(self._check_symbol, key)
+            return await self._single_flight((self.quote_cache.name, key), fetch)
+        return await self._serve_async(self.quote_cache, key, fetch)
+
+    async def get_quotes_async(self, symbols: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch quotes for several symbols concurrently; returns symbol -> quote."""
+        keys = sorted({symbol.upper() for symbol in symbols})
+        quotes = await asyncio.gather(*(self.get_stock_info_async(key) for key in keys))
+        return dict(zip(keys, quotes))
+
+    def _stock_info_params(self, symbol: str) -> Dict[str, Any]:
+        return {
             'function': 'GLOBAL_QUOTE',
             'symbol': symbol,
             'apikey': self.api_key
         }
-        
+
+    def _fetch_stock_info(self, symbol: str) -> Dict[str, Any]:
+        data = self._call_api_checked(self._stock_info_params(symbol), "data", symbol)
+        return self._parse_stock_info(symbol, data)
+
+    def _parse_stock_info(self, symbol: str, data: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            response = requests.get(self.base_url, params=params)
-            data = response.json()
-            
             if "Global Quote" not in data or not data["Global Quote"]:
                 print(f"API Response: {data}")
                 raise ValueError(f"Could not fetch data for symbol {symbol}")
-            
+
             quote = data["Global Quote"]
             return {
                 "symbol": quote.get("01. symbol", symbol),
@@ -41,20 +402,42 @@ class StockModel:
 
     def get_historical_data(self, symbol: str) -> Dict[str, Any]:
         """Get historical stock data."""
-        params = {
+        return self.get_history_entry(symbol).value
+
+    def get_history_entry(self, symbol: str) -> CacheEntry:
+        """Get daily history as a cache entry, valid until the next market close."""
+        key = symbol.upper()
+
+        def fetch():
+            return self.history_cache.set(key, self._fetch_historical_data(symbol), seconds_until_next_close())
+        return self._serve(self.history_cache, key, fetch)
+
+    async def get_history_entry_async(self, symbol: str) -> CacheEntry:
+        """Async get_history_entry: concurrent callers for the same symbol share one upstream fetch."""
+        key = symbol.upper()
+
+        async def fetch():
+            data = await self._call_api_checked_async(self._historical_data_params(symbol), "historical data", symbol)
+            return self.history_cache.set(key, self._parse_historical_data(symbol, data), seconds_until_next_close())
+        return await self._serve_async(self.history_cache, key, fetch)
+
+    def _historical_data_params(self, symbol: str) -> Dict[str, Any]:
+        return {
             'function': 'TIME_SERIES_DAILY',
             'symbol': symbol,
             'apikey': self.api_key
         }
-        
+
+    def _fetch_historical_data(self, symbol: str) -> Dict[str, Any]:
+        data = self._call_api_checked(self._historical_data_params(symbol), "historical data", symbol)
+        return self._parse_historical_data(symbol, data)
+
+    def _parse_historical_data(self, symbol: str, data: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            response = requests.get(self.base_url, params=params)
-            data = response.json()
-            
             if "Time Series (Daily)" not in data:
                 print(f"API Response: {data}")
                 raise ValueError(f"Could not fetch historical data for symbol {symbol}")
-            
+
             time_series = data["Time Series (Daily)"]
             return {date: {
                 "open": float(values["1. open"]),
@@ -66,3 +449,187 @@ class StockModel:
         except Exception as e:
             print(f"Exception: {str(e)}")
             raise ValueError(f"Could not fetch historical data for symbol {symbol}")
+
+    def get_intraday_entry(self, symbol: str) -> CacheEntry:
+        """Get the latest 1-minute bars (timestamp in US/Eastern -> bar) as a cache entry."""
+        key = symbol.upper()
+
+        def fetch():
+            return self.intraday_cache.set(key, self._fetch_intraday_data(symbol), INTRADAY_TTL)
+        return self._serve(self.intraday_cache, key, fetch)
+
+    async def get_intraday_entry_async(self, symbol: str) -> CacheEntry:
+        """Async get_intraday_entry: concurrent callers for the same symbol share one upstream fetch."""
+        key = symbol.upper()
+
+        async def fetch():
+            data = await self._call_api_checked_async(self._intraday_data_params(symbol), "intraday data", symbol)
+            return self.intraday_cache.set(key, self._parse_intraday_data(symbol, data), INTRADAY_TTL)
+        return await self._serve_async(self.intraday_cache, key, fetch)
+
+    def _intraday_data_params(self, symbol: str) -> Dict[str, Any]:
+        # Coarser intervals are resampled from these, so only 1-minute bars are ever fetched
+        return {
+            'function': 'TIME_SERIES_INTRADAY',
+            'symbol': symbol,
+            'interval': '1min',
+            'apikey': self.api_key
+        }
+
+    def _fetch_intraday_data(self, symbol: str) -> Dict[str, Any]:
+        data = self._call_api_checked(self._intraday_data_params(symbol), "intraday data", symbol)
+        return self._parse_intraday_data(symbol, data)
+
+    def _parse_intraday_data(self, symbol: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            if "Time Series (1min)" not in data:
+                print(f"API Response: {data}")
+                raise ValueError(f"Could not fetch intraday data for symbol {symbol}")
+
+            time_series = data["Time Series (1min)"]
+            return {timestamp: {
+                "open": float(values["1. open"]),
+                "high": float(values["2. high"]),
+                "low": float(values["3. low"]),
+                "close": float(values["4. close"]),
+                "volume": int(values["5. volume"])
+            } for timestamp, values in time_series.items()}
+        except Exception as e:
+            print(f"Exception: {str(e)}")
+            raise ValueError(f"Could not fetch intraday data for symbol {symbol}")
+
+    def get_company_info(self, symbol: str) -> Dict[str, Any]:
+        """Get company fundamentals."""
+        return self.get_company_entry(symbol).value
+
+    def get_company_entry(self, symbol: str) -> CacheEntry:
+        """Get company fundamentals as a cache entry, valid for a day."""
+        key = symbol.upper()
+
+        def fetch():
+            return self.company_cache.set(key, self._fetch_company_info(symbol), COMPANY_TTL)
+        return self._serve(self.company_cache, key, fetch)
+
+    async def get_company_entry_async(self, symbol: str) -> CacheEntry:
+        """Async get_company_entry: concurrent callers for the same symbol share one upstream fetch."""
+        key = symbol.upper()
+
+        async def fetch():
+            data = await self._call_api_checked_async(self._company_info_params(symbol), "company data", symbol)
+            return self.company_cache.set(key, self._parse_company_info(symbol, data), COMPANY_TTL)
+        return await self._serve_async(self.company_cache, key, fetch)
+
+    def _company_info_params(self, symbol: str) -> Dict[str, Any]:
+        return {
+            'function': 'OVERVIEW',
+            'symbol': symbol,
+            'apikey': self.api_key
+        }
+
+    def _fetch_company_info(self, symbol: str) -> Dict[str, Any]:
+        data = self._call_api_checked(self._company_info_params(symbol), "company data", symbol)
+        return self._parse_company_info(symbol, data)
+
+    def _parse_company_info(self, symbol: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            if "Symbol" not in data:
+                print(f"API Response: {data}")
+                raise ValueError(f"Could not fetch company data for symbol {symbol}")
+
+            return {
+                "symbol": data.get("Symbol", symbol),
+                "name": data.get("Name", ""),
+                "description": data.get("Description", ""),
+                "exchange": data.get("Exchange", ""),
+                "currency": data.get("Currency", ""),
+                "country": data.get("Country", ""),
+                "sector": data.get("Sector", ""),
+                "industry": data.get("Industry", ""),
+                "market_capitalization": data.get("MarketCapitalization", ""),
+                "pe_ratio": data.get("PERatio", ""),
+                "dividend_yield": data.get("DividendYield", ""),
+                "52_week_high": data.get("52WeekHigh", ""),
+                "52_week_low": data.get("52WeekLow", "")
+            }
+        except Exception as e:
+            print(f"Exception: {str(e)}")
+            raise ValueError(f"Could not fetch company data for symbol {symbol}")
+
+    def get_exchange_rate(self, from_currency: str, to_currency: str) -> float:
+        """Units of to_currency per unit of from_currency."""
+        return self.get_exchange_rate_entry(from_currency, to_currency).value["rate"]
+
+    def get_exchange_rate_entry(self, from_currency: str, to_currency: str) -> CacheEntry:
+        """
+        Get an exchange rate as a cache entry, fetched at most once per pair every FX_TTL seconds.
+
+        Raises:
+            ValueError: If a currency code is invalid or the rate can't be fetched.
+        """
+        from_currency, to_currency = normalize_currency(from_currency), normalize_currency(to_currency)
+        key = f"{from_currency}/{to_currency}"
+
+        def fetch():
+            return self.fx_cache.set(key, self._fetch_exchange_rate(from_currency, to_currency), FX_TTL)
+        return self._serve(self.fx_cache, key, fetch, check_symbol=False)
+
+    def _exchange_rate_params(self, from_currency: str, to_currency: str) -> Dict[str, Any]:
+        return {
+            'function': 'CURRENCY_EXCHANGE_RATE',
+            'from_currency': from_currency,
+            'to_currency': to_currency,
+            'apikey': self.api_key
+        }
+
+    def _fetch_exchange_rate(self, from_currency: str, to_currency: str) -> Dict[str, Any]:
+        pair = f"{from_currency}/{to_currency}"
+        if self.fx_provider == "stub":
+            if self._stub_rates is None:
+                self._stub_rates = load_stub_rates()
+            return {"pair": pair, "rate": stub_rate(self._stub_rates, from_currency, to_currency),
+                    "source": "stub"}
+        data = self._call_api_checked(self._exchange_rate_params(from_currency, to_currency), "exchange rate", pair)
+        try:
+            rate = float(data["Realtime Currency Exchange Rate"]["5. Exchange Rate"])
+        except (KeyError, TypeError, ValueError):
+            print(f"API Response: {data}")
+            raise ValueError(f"Could not fetch exchange rate for {pair}")
+        if rate <= 0:
+            raise ValueError(f"Could not fetch exchange rate for {pair}")
+        return {"pair": pair, "rate": rate, "source": "alpha_vantage"}
+
+    def _loop_state(self) -> "_LoopState":
+        loop = asyncio.get_running_loop()
+        state = self._async_state.get(loop)
+        if state is None:
+            state = self._async_state[loop] = _LoopState()
+        return state
+
+    async def _single_flight(self, key, fetch: Callable[[], Awaitable[CacheEntry]]) -> CacheEntry:
+        """Run fetch once for key; callers arriving while it is in flight await the same result."""
+        # shield: one caller being cancelled (client gone) must not cancel the others' fetch
+        return await asyncio.shield(self._start_flight(key, fetch))
+
+    def _start_flight(self, key, fetch: Callable[[], Awaitable[CacheEntry]]) -> asyncio.Future:
+        """The in-flight fetch for key, started if there is none."""
+        inflight = self._loop_state().inflight
+        future = inflight.get(key)
+        if future is None:
+            future = inflight[key] = asyncio.ensure_future(fetch())
+            future.add_done_callback(lambda _: inflight.pop(key, None))
+        return future
+
+    async def aclose(self) -> None:
+        """Close the async HTTP client of the running event loop."""
+        state = self._async_state.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state.client.aclose()
+
+
+class _LoopState:
+    """Async resources that belong to one event loop."""
+
+    def __init__(self):
+        self.client = httpx.AsyncClient(limits=httpx.Limits(max_connections=UPSTREAM_MAX_CONNECTIONS),
+                                        timeout=UPSTREAM_TIMEOUT)
+        self.inflight: Dict[Any, asyncio.Future] = {}
@@ -0,0 +1,314 @@
+import csv
+import io
+import logging
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from music_collection.models.stock_model import StockModel
+from music_collection.utils.fx_utils import exchange_suffix
+from music_collection.utils.logger import configure_logger
+from music_collection.utils.sql_utils import Storage, default_storage
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# Listings used when Alpha Vantage can't be reached and nothing has been stored yet
+LISTING_FIXTURE = os.getenv(
+    "SYMBOL_LISTING_FIXTURE",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "listing_status.csv")
+)
+# Seconds between downloads of the listing
+SYMBOL_REFRESH_INTERVAL = float(os.getenv("SYMBOL_REFRESH_INTERVAL", "86400"))
+# Seconds between the background worker's checks for a due refresh or a newer stored directory;
+# also how often a failed download is retried while only the fixture is stored
+SYMBOL_CHECK_INTERVAL = float(os.getenv("SYMBOL_CHECK_INTERVAL", "600"))
+
+# Sorts after any character that can appear in a key, closing a prefix range for bisect
+_PREFIX_END = "\uffff"
+
+
+class SymbolIndex:
+    """
+    Immutable in-memory prefix index over a symbol directory.
+
+    Symbols and the words of company names are kept in sorted lists, so every matching
+    key for a prefix is one bisect away and a lookup costs O(log n + results).
+    """
+
+    def __init__(self, listings: List[Dict[str, str]]):
+        self.listings = {listing["symbol"]: listing for listing in listings}
+        self.symbols = sorted(self.listings)
+        words = sorted({(word, listing["symbol"])
+                        for listing in listings for word in listing["name"].lower().split()})
+        self.name_words = [word for word, _ in words]
+        self.name_symbols = [symbol for _, symbol in words]
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self.listings
+
+    def search(self, query: str, limit: int) -> List[Dict[str, str]]:
+        """
+        Listings whose symbol or a name word starts with query: the exact symbol first, then
+        symbol prefix matches (shortest first), then name matches.
+        """
+        symbol_prefix = query.upper()
+        start = bisect_left(self.symbols, symbol_prefix)
+        end = bisect_left(self.symbols, symbol_prefix + _PREFIX_END, start)
+        matches = sorted(self.symbols[start:end], key=lambda symbol: (len(symbol), symbol))
+
+        if len(matches) < limit:
+            word_prefix = query.lower()
+            start = bisect_left(self.name_words, word_prefix)
+            end = bisect_left(self.name_words, word_prefix + _PREFIX_END, start)
+            seen = set(matches)
+            for symbol in self.name_symbols[start:end]:
+                if symbol not in seen:
+                    seen.add(symbol)
+                    matches.append(symbol)
+                    if len(matches) >= limit:
+                        break
+
+        return [self.listings[symbol] for symbol in matches[:limit]]
+
+
+def parse_listing_csv(text: str) -> List[Dict[str, str]]:
+    """Active listings from an Alpha Vantage LISTING_STATUS CSV."""
+    listings = []
+    for row in csv.DictReader(io.StringIO(text)):
+        symbol = (row.get("symbol") or "").strip().upper()
+        if not symbol or row.get("status", "Active") != "Active":
+            continue
+        listings.append({
+            "symbol": symbol,
+            "name": (row.get("name") or "").strip(),
+            "exchange": row.get("exchange") or "",
+            "asset_type": row.get("assetType") or "",
+            "ipo_date": row.get("ipoDate") or ""
+        })
+    return listings
+
+
+class SymbolModel:
+    """
+    Directory of listed symbols, stored in the symbols table and searched in memory.
+
+    The listing is downloaded from Alpha Vantage (LISTING_STATUS) at most once per
+    SYMBOL_REFRESH_INTERVAL across all processes sharing the database: a process claims
+    the refresh in symbol_directory_state before downloading, and the others skip it.
+    Each process keeps a SymbolIndex built from the stored table and swaps in a new one
+    when the table changes.
+
+    While no directory is available, or only the bundled fixture could be loaded, every
+    symbol is accepted; a fixture directory is replaced as soon as a download succeeds,
+    retried every SYMBOL_CHECK_INTERVAL.
+    """
+
+    def __init__(self, stock_model: StockModel, refresh_interval: float = SYMBOL_REFRESH_INTERVAL,
+                 check_interval: float = SYMBOL_CHECK_INTERVAL, storage: Optional[Storage] = None):
+        self.stock_model = stock_model
+        self.storage = storage or default_storage()
+        self.refresh_interval = refresh_interval
+        self.check_interval = check_interval
+        self._index = SymbolIndex([])
+        self._loaded_at: Optional[str] = None
+        self._source: Optional[str] = None
+        self._load_attempted = False
+        self._lock = threading.Lock()
+        self._worker_pid: Optional[int] = None
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, str]]:
+        """
+        Find listings by symbol or company-name prefix.
+
+        Raises:
+            ValueError: If the query is empty or the limit is out of range.
+        """
+        query = (query or "").strip()
+        if not query:
+            raise ValueError("Query parameter q is required")
+        if limit <= 0 or limit > 100:
+            raise ValueError("Limit must be between 1 and 100")
+        return self._current_index().search(query, limit)
+
+    def is_known(self, symbol: str) -> bool:
+        """
+        Whether symbol is listed; always True while no downloaded directory has been loaded.
+        The directory covers US listings only, so symbols on other exchanges (TSCO.LON) pass.
+        """
+        index = self._current_index()
+        if not index or self._source != "alpha_vantage":
+            return True
+        return symbol in index or bool(exchange_suffix(symbol))
+
+    def get_status(self) -> Dict[str, Any]:
+        return {"symbols": len(self._index), "refreshed_at": self._loaded_at, "source": self._source}
+
+    def ensure_loaded(self) -> None:
+        """Load the directory if this model hasn't tried yet; otherwise done lazily on first use."""
+        if self._load_attempted:
+            return
+        with self._lock:
+            if self._load_attempted:
+                return
+            self._load_attempted = True
+            try:
+                self.load()
+            except Exception as e:
+                logger.error("Could not load the symbol directory: %s", e)
+
+    def _current_index(self) -> SymbolIndex:
+        self.ensure_loaded()
+        self._ensure_worker()
+        return self._index
+
+    def load(self) -> int:
+        """
+        Build the index from the stored directory, downloading it first if none is stored
+        and no other process is already doing so.
+
+        Returns:
+            int: The number of symbols indexed.
+        """
+        refreshed_at, source = self._stored_state()
+        if refreshed_at is None:
+            return self.refresh() if self._claim_refresh(None) else 0
+        self._swap_index(self._read_listings(), refreshed_at, source)
+        return len(self._index)
+
+    def refresh(self) -> int:
+        """
+        Download the listing, replace the stored directory with it and swap in a new index.
+
+        Falls back to the bundled fixture when the download fails and nothing is stored yet.
+
+        Returns:
+            int: The number of symbols indexed.
+        """
+        try:
+            listings = parse_listing_csv(self.stock_model.fetch_listing_status())
+            source = "alpha_vantage"
+        except Exception as e:
+            if self._stored_state()[0] is not None:
+                raise ValueError(f"Could not refresh the symbol directory: {str(e)}")
+            logger.warning("Listing download failed (%s); loading %s", e, LISTING_FIXTURE)
+            with open(LISTING_FIXTURE) as fixture:
+                listings = parse_listing_csv(fixture.read())
+            source = "fixture"
+        if not listings:
+            raise ValueError("The symbol listing is empty")
+
+        # Precise enough that a claim made against the previous refresh never matches this one
+        refreshed_at = datetime.now().isoformat(timespec="microseconds")
+        try:
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM symbols")
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO symbols (symbol, name, exchange, asset_type, ipo_date) "
+                    "VALUES (:symbol, :name, :exchange, :asset_type, :ipo_date)", listings
+                )
+                cursor.execute(
+                    "INSERT OR REPLACE INTO symbol_directory_state (id, refreshed_at, source, symbols, claimed_at) "
+                    "VALUES (1, ?, ?, ?, NULL)", (refreshed_at, source, len(listings))
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+
+        self._swap_index(listings, refreshed_at, source)
+        logger.info("Symbol directory refreshed from %s: %d symbols", source, len(listings))
+        return len(listings)
+
+    def _swap_index(self, listings: List[Dict[str, str]], refreshed_at: str, source: Optional[str]) -> None:
+        # Readers hold a reference to the old index; replacing the attribute is atomic
+        self._index = SymbolIndex(listings)
+        self._loaded_at = refreshed_at
+        self._source = source
+
+    def _stored_state(self) -> Tuple[Optional[str], Optional[str]]:
+        """(refreshed_at, source) of the stored directory; (None, None) if none is stored."""
+        try:
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT refreshed_at, source FROM symbol_directory_state WHERE id = 1")
+                row = cursor.fetchone()
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+        return (row[0], row[1]) if row else (None, None)
+
+    def _claim_refresh(self, refreshed_at: Optional[str]) -> bool:
+        """
+        Claim the next download for this process. Fails if another process refreshed the
+        directory since refreshed_at was read, or holds a claim younger than the check
+        interval (a claim whose download failed expires then, throttling retries).
+        """
+        now = time.time()
+        try:
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("INSERT OR IGNORE INTO symbol_directory_state (id) VALUES (1)")
+                cursor.execute(
+                    "UPDATE symbol_directory_state SET claimed_at = ? "
+                    "WHERE id = 1 AND refreshed_at IS ? AND (claimed_at IS NULL OR claimed_at <= ?)",
+                    (now, refreshed_at, now - self.check_interval)
+                )
+                conn.commit()
+                return cursor.rowcount == 1
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+
+    def _read_listings(self) -> List[Dict[str, str]]:
+        try:
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT symbol, name, exchange, asset_type, ipo_date FROM symbols")
+                rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Database error: {str(e)}")
+        return [{"symbol": symbol, "name": name, "exchange": exchange, "asset_type": asset_type,
+                 "ipo_date": ipo_date} for symbol, name, exchange, asset_type, ipo_date in rows]
+
+    def _refresh_due(self, refreshed_at: Optional[str], source: Optional[str]) -> bool:
+        if refreshed_at is None:
+            return True
+        # A fixture is only a stand-in, so the download is retried on every check
+        interval = self.refresh_interval if source == "alpha_vantage" else self.check_interval
+        age = time.time() - datetime.fromisoformat(refreshed_at).timestamp()
+        return age >= interval
+
+    def check(self) -> None:
+        """Refresh the directory if it is due, or reload it if another process refreshed it."""
+        refreshed_at, source = self._stored_state()
+        if self._refresh_due(refreshed_at, source) and self._claim_refresh(refreshed_at):
+            self.refresh()
+        elif refreshed_at is not None and refreshed_at != self._loaded_at:
+            self._swap_index(self._read_listings(), refreshed_at, source)
+
+    def _ensure_worker(self) -> None:
+        # Threads don't survive fork, so each (pre-forked) worker process starts its own
+        pid = os.getpid()
+        if self._worker_pid == pid:
+            return
+        with self._lock:
+            if self._worker_pid == pid:
+                return
+            self._worker_pid = pid
+            threading.Thread(target=self._run_worker, name="symbol-directory", daemon=True).start()
+
+    def _run_worker(self) -> None:
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                self.check()
+            except Exception as e:
+                logger.error("Symbol directory refresh failed: %s", e)
@@ -1,12 +1,30 @@
 import sqlite3
 import hashlib
+import logging
 import os
 from typing import Dict, Optional
-from music_collection.utils.sql_utils import get_db_connection
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from music_collection.utils.logger import configure_logger
+from music_collection.utils.sql_utils import Storage, default_storage
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# Signs the access tokens issued at login. Every worker and instance must share it; without
+# it a random key is used, so tokens stop working on restart (and across unforked workers).
+AUTH_SECRET_KEY = os.getenv("AUTH_SECRET_KEY")
+# Seconds an access token stays valid after login
+AUTH_TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", "86400"))
 
 class UserModel:
-    def __init__(self):
-        self.db_path = "users.db"
+    def __init__(self, storage: Optional[Storage] = None, secret_key: Optional[str] = AUTH_SECRET_KEY,
+                 token_ttl: int = AUTH_TOKEN_TTL):
+        self.storage = storage or default_storage()
+        if not secret_key:
+            logger.warning("AUTH_SECRET_KEY is not set; access tokens will not survive a restart")
+            secret_key = os.urandom(32).hex()
+        self._tokens = URLSafeTimedSerializer(secret_key, salt="access-token")
+        self.token_ttl = token_ttl
 
     def hash_password(self, password: str, salt: bytes = None) -> Dict[str, bytes]:
         """
@@ -58,7 +76,7 @@ class UserModel:
         hashed_data = self.hash_password(password)
         
         try:
-            with get_db_connection() as conn:
+            with self.storage.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Insert new user
@@ -82,6 +100,25 @@ class UserModel:
             print(f"Database error: {str(e)}")
             raise ValueError("Failed to create account")
 
+    def account_exists(self, user_id: int) -> bool:
+        """
+        Check whether a user account exists.
+        
+        Args:
+            user_id (int): The users.id of the account
+        
+        Returns:
+            bool: True if the account exists
+        """
+        try:
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM users WHERE id = ?", (user_id,))
+                return cursor.fetchone() is not None
+        except sqlite3.Error as e:
+            print(f"Database error: {str(e)}")
+            raise ValueError("Failed to look up account")
+
     def login(self, username: str, password: str) -> Dict:
         """
         Authenticate a user.
@@ -98,7 +135,7 @@ class UserModel:
             raise ValueError("Username and password are required")
         
         try:
-            with get_db_connection() as conn:
+            with self.storage.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Retrieve user data
@@ -120,12 +157,48 @@ class UserModel:
                 return {
                     "id": user_id,
                     "username": username,
+                    "token": self.issue_token(user_id),
+                    "expires_in": self.token_ttl,
                     "message": "Login successful"
                 }
         except sqlite3.Error as e:
             print(f"Database error: {str(e)}")
             raise ValueError("Login failed")
 
+    def issue_token(self, user_id: int) -> str:
+        """
+        Issue a signed access token for a user; it proves the caller logged in as them.
+
+        Args:
+            user_id (int): The users.id the token is issued to
+
+        Returns:
+            str: Token to send as "Authorization: Bearer <token>"
+        """
+        return self._tokens.dumps({"id": user_id})
+
+    def verify_token(self, token: Optional[str]) -> int:
+        """
+        Check an access token without touching the database.
+
+        Args:
+            token (str): A token from issue_token
+
+        Returns:
+            int: The users.id it was issued to
+
+        Raises:
+            ValueError: If the token is missing, forged or expired
+        """
+        if not token:
+            raise ValueError("Authentication required")
+        try:
+            return int(self._tokens.loads(token, max_age=self.token_ttl)["id"])
+        except SignatureExpired:
+            raise ValueError("Access token expired; log in again")
+        except (BadSignature, KeyError, TypeError, ValueError):
+            raise ValueError("Invalid access token")
+
     def update_password(self, username: str, old_password: str, new_password: str) -> Dict:
         """
         Update a user's password.
@@ -143,7 +216,7 @@ class UserModel:
             raise ValueError("New password must be at least 8 characters long")
         
         try:
-            with get_db_connection() as conn:
+            with self.storage.connection() as conn:
                 cursor = conn.cursor()
                 
                 # First, verify the old password
@@ -0,0 +1,141 @@
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from music_collection.utils.fifo_utils import consume_fifo, realized_gain
+
+
+TRADING_DAYS = 252
+
+# Strategy type -> {parameter: default}; a parameter without a default (None) is required
+STRATEGIES: Dict[str, Dict[str, Any]] = {
+    "buy_and_hold": {},
+    "sma_cross": {"fast": None, "slow": None},
+    "momentum": {"lookback": None, "threshold": 0.0},
+}
+
+# One unit of parallel work: (symbol, ISO dates, closes, strategy parameter sets, sizing, costs,
+# initial cash, include equity curve)
+BacktestTask = Tuple[str, List[str], np.ndarray, List[Dict[str, Any]], Dict[str, Any], Dict[str, Any], float, bool]
+
+
+def moving_average(prices: np.ndarray, window: int) -> np.ndarray:
+    """Trailing simple moving average; NaN until `window` prices are available."""
+    result = np.full(len(prices), np.nan)
+    if window <= len(prices):
+        sums = np.cumsum(np.r_[0.0, prices])
+        result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+
+def strategy_signal(prices: np.ndarray, strategy: Dict[str, Any]) -> np.ndarray:
+    """Whether the strategy wants to be long after each close (boolean array)."""
+    kind = strategy["type"]
+    if kind == "buy_and_hold":
+        return np.ones(len(prices), dtype=bool)
+    if kind == "sma_cross":
+        # NaN comparisons are False, so there is no position until the slow average exists
+        return moving_average(prices, strategy["fast"]) > moving_average(prices, strategy["slow"])
+    if kind == "momentum":
+        lookback = strategy["lookback"]
+        signal = np.zeros(len(prices), dtype=bool)
+        if lookback < len(prices):
+            signal[lookback:] = prices[lookback:] / prices[:-lookback] - 1.0 > strategy["threshold"]
+        return signal
+    raise ValueError(f"Unknown strategy: {kind}")
+
+
+def target_shares(prices: np.ndarray, held: np.ndarray, sizing: Dict[str, Any]) -> np.ndarray:
+    """
+    Shares held after each close. "shares" sizing holds a fixed count; "notional" sizing buys
+    as many whole shares as the amount pays for at entry and keeps that count until exit.
+    """
+    if sizing["type"] == "shares":
+        return np.where(held, sizing["shares"], 0).astype(np.int64)
+    entries = held & ~np.r_[False, held[:-1]]
+    entry_shares = np.where(entries, np.floor(sizing["amount"] / prices), 0).astype(np.int64)
+    # Carry each entry's share count forward to the bars held after it
+    last_entry = np.maximum.accumulate(np.where(entries, np.arange(len(prices)), 0))
+    return np.where(held, entry_shares[last_entry], 0)
+
+
+def backtest(dates: Sequence[str], prices: np.ndarray, strategy: Dict[str, Any], sizing: Dict[str, Any],
+             costs: Dict[str, Any], initial_cash: float, include_curve: bool = True) -> Dict[str, Any]:
+    """
+    Simulate a long-only strategy on one symbol's daily closes.
+
+    The signal is computed on each close and traded at the next close, so no trade uses a
+    price it couldn't have known. Positions, cash flows and the equity curve are computed as
+    whole-array operations; only the (few) trades are walked one by one, matching sales
+    against purchase lots oldest first with the same FIFO helpers live sales use.
+
+    Returns:
+        Dict of summary statistics, the trade count and, optionally, the equity curve.
+    """
+    held = np.r_[False, strategy_signal(prices, strategy)[:-1]]
+    shares = target_shares(prices, held, sizing)
+    traded = np.diff(shares, prepend=0)
+
+    slippage = costs["slippage_bps"] / 10_000
+    fills = prices * (1 + np.sign(traded) * slippage)
+    commissions = np.where(traded != 0, costs["commission"], 0.0)
+    cash = initial_cash + np.cumsum(-traded * fills - commissions)
+    equity = cash + shares * prices
+
+    realized, wins, sells, lots = 0.0, 0, 0, []
+    for i in np.flatnonzero(traded):
+        if traded[i] > 0:
+            lots.append((int(i), int(traded[i]), float(fills[i])))
+            continue
+        consumed = consume_fifo(lots, int(-traded[i]))
+        gain = realized_gain(consumed, float(fills[i]))
+        realized += gain
+        wins += gain > 0
+        sells += 1
+        _, _, left, _ = consumed[-1]
+        lots = ([(consumed[-1][0], left, consumed[-1][3])] if left else []) + lots[len(consumed):]
+
+    returns = equity[1:] / equity[:-1] - 1.0
+    volatility = float(returns.std(ddof=1)) if len(returns) > 1 else 0.0
+    drawdowns = equity / np.maximum.accumulate(equity) - 1.0
+    years = len(prices) / TRADING_DAYS
+    total_return = float(equity[-1] / initial_cash - 1.0)
+
+    result = {
+        "start": dates[0],
+        "end": dates[-1],
+        "final_equity": float(equity[-1]),
+        "total_return": total_return,
+        "cagr": _clean((1.0 + total_return) ** (1.0 / years) - 1.0 if total_return > -1.0 else -1.0),
+        "volatility": volatility * math.sqrt(TRADING_DAYS),
+        "sharpe": _clean(float(returns.mean()) / volatility * math.sqrt(TRADING_DAYS) if volatility > 0 else None),
+        "max_drawdown": float(drawdowns.min()),
+        "exposure": float(held.mean()),
+        "trades": int(np.count_nonzero(traded)),
+        "win_rate": wins / sells if sells else None,
+        "realized_gain_loss": realized,
+        "unrealized_gain_loss": sum(count * (float(prices[-1]) - price) for _, count, price in lots),
+        "costs": float(np.sum(np.abs(traded) * prices * slippage) + commissions.sum()),
+        "shares_held": int(shares[-1])
+    }
+    if include_curve:
+        result["equity_curve"] = [{"date": date, "equity": float(value)} for date, value in zip(dates, equity)]
+    return result
+
+
+def run_tasks(tasks: Sequence[BacktestTask]) -> List[Dict[str, Any]]:
+    """Run every parameter set of every task; the unit of work sent to a pool process."""
+    results = []
+    for symbol, dates, prices, strategies, sizing, costs, initial_cash, include_curve in tasks:
+        for strategy in strategies:
+            result = backtest(dates, prices, strategy, sizing, costs, initial_cash, include_curve)
+            results.append({"symbol": symbol, "strategy": strategy, **result})
+    return results
+
+
+def _clean(value: Optional[float]) -> Optional[float]:
+    """NaN and infinities are not valid JSON; report undefined statistics as null."""
+    if value is None or not math.isfinite(value):
+        return None
+    return float(value)
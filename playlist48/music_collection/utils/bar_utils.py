@@ -0,0 +1,120 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+# (timestamps, prices, volumes): epoch seconds (int64), open/high/low/close rows (float64, n x 4)
+# and volumes (int64), in ascending timestamp order
+Bars = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def empty_bars() -> Bars:
+    return np.empty(0, dtype=np.int64), np.empty((0, 4), dtype=np.float64), np.empty(0, dtype=np.int64)
+
+
+def concat_bars(*parts: Bars) -> Bars:
+    return (np.concatenate([part[0] for part in parts]),
+            np.concatenate([part[1] for part in parts]),
+            np.concatenate([part[2] for part in parts]))
+
+
+class BarRingBuffer:
+    """
+    Fixed-capacity store of OHLCV bars in preallocated NumPy arrays.
+
+    Memory is allocated once (48 bytes per bar) and never grows: once the buffer is full,
+    each new bar overwrites the oldest, and extend() hands the overwritten bars back so
+    the caller can persist them. Not thread-safe; callers serialize access.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive")
+        self.capacity = capacity
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._prices = np.zeros((capacity, 4), dtype=np.float64)
+        self._volumes = np.zeros(capacity, dtype=np.int64)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def first_timestamp(self) -> Optional[int]:
+        return int(self._timestamps[self._start]) if self._size else None
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return int(self._timestamps[(self._start + self._size - 1) % self.capacity]) if self._size else None
+
+    def extend(self, timestamps: np.ndarray, prices: np.ndarray, volumes: np.ndarray) -> Bars:
+        """
+        Append bars in ascending timestamp order.
+
+        Bars older than the newest stored bar are ignored; one with the same timestamp
+        replaces it (the latest bar of a session is revised until it closes).
+
+        Returns:
+            The bars evicted to make room, oldest first.
+        """
+        last = self.last_timestamp
+        if last is not None:
+            same = timestamps == last
+            if same.any():
+                slot = (self._start + self._size - 1) % self.capacity
+                self._prices[slot] = prices[same][-1]
+                self._volumes[slot] = volumes[same][-1]
+            newer = timestamps > last
+            timestamps, prices, volumes = timestamps[newer], prices[newer], volumes[newer]
+
+        count = len(timestamps)
+        if count == 0:
+            return empty_bars()
+        if count >= self.capacity:
+            keep = count - self.capacity
+            evicted = concat_bars(self.snapshot(), (timestamps[:keep], prices[:keep], volumes[:keep]))
+            self._start, self._size = 0, self.capacity
+            self._timestamps[:] = timestamps[keep:]
+            self._prices[:] = prices[keep:]
+            self._volumes[:] = volumes[keep:]
+            return evicted
+
+        overflow = max(0, self._size + count - self.capacity)
+        evicted = self._slice(0, overflow)
+        self._start = (self._start + overflow) % self.capacity
+        self._size -= overflow
+        slots = (self._start + self._size + np.arange(count)) % self.capacity
+        self._timestamps[slots] = timestamps
+        self._prices[slots] = prices
+        self._volumes[slots] = volumes
+        self._size += count
+        return evicted
+
+    def snapshot(self) -> Bars:
+        """Copies of the stored bars, oldest first."""
+        return self._slice(0, self._size)
+
+    def _slice(self, offset: int, count: int) -> Bars:
+        slots = (self._start + offset + np.arange(count)) % self.capacity
+        return self._timestamps[slots], self._prices[slots], self._volumes[slots]
+
+
+def resample_bars(bars: Bars, seconds: int) -> Bars:
+    """
+    Aggregate bars into buckets of `seconds` aligned to the epoch: first open, highest high,
+    lowest low, last close and summed volume per bucket.
+    """
+    timestamps, prices, volumes = bars
+    if len(timestamps) == 0 or seconds <= 0:
+        return bars
+    buckets = timestamps - timestamps % seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    resampled = np.column_stack((
+        prices[starts, 0],
+        np.maximum.reduceat(prices[:, 1], starts),
+        np.minimum.reduceat(prices[:, 2], starts),
+        prices[ends, 3],
+    ))
+    return buckets[starts], resampled, np.add.reduceat(volumes, starts)
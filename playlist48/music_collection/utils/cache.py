@@ -0,0 +1,106 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Hashable, Optional
+
+
+class CacheEntry:
+    """
+    A cached value together with its freshness window and content version.
+
+    The version is a digest of the value computed once when the entry is stored, so it can
+    be used as a strong validator (e.g. an ETag) without serializing the value again.
+    """
+
+    __slots__ = ("value", "version", "fetched_at", "expires_at")
+
+    def __init__(self, value: Any, ttl: float, fetched_at: Optional[float] = None):
+        self.value = value
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self.expires_at = self.fetched_at + ttl
+        payload = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+        self.version = hashlib.sha1(payload).hexdigest()[:20]
+
+    def ttl_remaining(self, now: Optional[float] = None) -> float:
+        """Seconds until the entry expires (never negative)."""
+        now = time.time() if now is None else now
+        return max(0.0, self.expires_at - now)
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return now < self.expires_at
+
+    def age(self, now: Optional[float] = None) -> float:
+        """Seconds since the value was fetched."""
+        now = time.time() if now is None else now
+        return max(0.0, now - self.fetched_at)
+
+    def as_of(self) -> str:
+        """When the value was fetched, as an ISO 8601 UTC timestamp."""
+        return datetime.fromtimestamp(self.fetched_at, timezone.utc).isoformat(timespec="seconds")
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache of CacheEntry objects keyed by any hashable key.
+
+    Reads are plain dict lookups; only writes take the lock. `generation` counts writes, so
+    a reader that saw the same generation earlier knows no entry has been replaced since.
+    With max_entries, storing a new key beyond that many drops the entry stored longest
+    ago; entries in use are refreshed (stored again) regularly, so that is the least
+    recently used one without reads having to take the lock.
+    """
+
+    def __init__(self, name: str, max_entries: Optional[int] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries: Dict[Hashable, CacheEntry] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """Return the entry for key if it is still fresh, otherwise None."""
+        entry = self._entries.get(key)
+        if entry is not None and entry.is_fresh():
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """Return the entry for key whether fresh or expired, without counting a hit or miss."""
+        return self._entries.get(key)
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> CacheEntry:
+        """Store value under key for ttl seconds and return the new entry."""
+        entry = CacheEntry(value, ttl)
+        with self._lock:
+            # Re-inserting moves the key to the end of the dict's insertion order
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            if self.max_entries is not None:
+                while len(self._entries) > self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+            self.generation += 1
+        return entry
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self.generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
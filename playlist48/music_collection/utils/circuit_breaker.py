@@ -0,0 +1,106 @@
+import threading
+import time
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ValueError):
+    """
+    Raised instead of calling a dependency whose circuit is open.
+
+    A ValueError, like the other "could not fetch" failures of the market-data calls, so
+    existing callers keep handling it; retry_after says when the next probe is allowed.
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable; retry in {int(retry_after) + 1} seconds")
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After value (whole seconds, rounded up) for a 503 refusing the request."""
+        return str(int(self.retry_after) + 1)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for calls to one upstream dependency.
+
+    After failure_threshold consecutive failures the circuit opens and calls are refused
+    (allow() returns False) for reset_timeout seconds. It then goes half-open: up to
+    half_open_probes calls are let through at a time, and the first success closes the
+    circuit while a failure opens it again for another reset_timeout.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_probes: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit lets a probe through (0 unless open)."""
+        with self._lock:
+            if self._current_state(time.monotonic()) != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now; every allowed call must be followed by a record_* call."""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            return False
+
+    def check(self) -> None:
+        """
+        Like allow(), but raises instead of returning False.
+
+        Raises:
+            CircuitOpenError: If the circuit is refusing calls.
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            self._failures += 1
+            if state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probes = 0
+
+    def state_code(self) -> int:
+        """The state as a number for metrics: 0 closed, 1 half-open, 2 open."""
+        return {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}[self.state]
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+import os
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# Rows fetched from SQLite and encoded per chunk of a streamed export
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "1000"))
+
+
+def iter_pages(connect: Callable, query: str, params: Sequence[Any], keys: Sequence[str],
+               size: Optional[int] = None) -> Iterator[List[tuple]]:
+    """
+    Rows of a query in keyset pages, so only one page is held at a time.
+
+    query is a SELECT ... WHERE ... without ORDER BY; its first columns must be keys, a
+    unique sort key. Each page is its own short query on a fresh connection, resuming after
+    the previous page's last key, so no read lock is held while a page is being sent and a
+    slow client never blocks writers.
+    """
+    size = size or EXPORT_BATCH_ROWS
+    after: Optional[tuple] = None
+    while True:
+        page_query, page_params = query, list(params)
+        if after is not None:
+            page_query += f" AND ({', '.join(keys)}) > ({', '.join('?' * len(keys))})"
+            page_params.extend(after)
+        page_query += f" ORDER BY {', '.join(keys)} LIMIT ?"
+        page_params.append(size)
+        with connect() as conn:
+            rows = conn.execute(page_query, page_params).fetchall()
+        if rows:
+            yield rows
+        if len(rows) < size:
+            return
+        after = tuple(rows[-1][:len(keys)])
+
+
+def csv_chunks(columns: Sequence[str], batches: Iterator[List[tuple]]) -> Iterator[str]:
+    """A header line, then one CSV chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def ndjson_chunks(columns: Sequence[str], batches: Iterator[List[tuple]]) -> Iterator[str]:
+    """One chunk of newline-delimited JSON objects per batch."""
+    for rows in batches:
+        yield "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+
+
+# Export format -> (mimetype, chunk encoder)
+FORMATS: Dict[str, Tuple[str, Callable[[Sequence[str], Iterator[List[tuple]]], Iterator[str]]]] = {
+    "csv": ("text/csv", csv_chunks),
+    "ndjson": ("application/x-ndjson", ndjson_chunks),
+}
+
+
+def primed(chunks: Iterator[str]) -> Iterator[str]:
+    """
+    Run a chunk generator up to its first chunk now and return a generator of all its chunks.
+
+    Errors raised before streaming starts (a failed query, a missing table) surface to the
+    caller while it can still send an error status; closing the returned generator closes
+    the original.
+    """
+    first = next(chunks, None)
+
+    def resume():
+        if first is not None:
+            yield first
+        yield from chunks
+    return resume()
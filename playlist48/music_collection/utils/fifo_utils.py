@@ -0,0 +1,36 @@
+from typing import Any, List, Sequence, Tuple
+
+
+def consume_fifo(lots: Sequence[Tuple[Any, int, float]], shares: int) -> List[Tuple[Any, int, int, float]]:
+    """
+    Take shares from lots oldest first (FIFO), the way sales are matched against purchases.
+
+    Args:
+        lots: (key, shares, purchase_price) for each open lot, oldest first. The key is
+            passed through untouched (e.g. a row id).
+        shares (int): Number of shares to take.
+
+    Returns:
+        List of (key, shares_taken, shares_left, purchase_price) for every lot touched.
+        A lot with shares_left == 0 is fully consumed.
+
+    Raises:
+        ValueError: If the lots hold fewer than the requested shares.
+    """
+    remaining = shares
+    consumed = []
+    for key, lot_shares, price in lots:
+        if remaining <= 0:
+            break
+        taken = min(lot_shares, remaining)
+        consumed.append((key, taken, lot_shares - taken, price))
+        remaining -= taken
+
+    if remaining > 0:
+        raise ValueError(f"Not enough shares to sell. Lots hold {shares - remaining} shares")
+    return consumed
+
+
+def realized_gain(consumed: Sequence[Tuple[Any, int, int, float]], sale_price: float) -> float:
+    """Realized gain/loss of a sale at sale_price against the lots it consumed."""
+    return sum(taken * (sale_price - price) for _, taken, _, price in consumed)
@@ -0,0 +1,87 @@
+import json
+import os
+import re
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+
+# Rates used by the "stub" FX provider: units of each currency per US dollar
+FX_STUB_RATES = os.getenv(
+    "FX_STUB_RATES",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "fx_rates.json")
+)
+
+# Alpha Vantage symbol suffix of a non-US exchange -> the currency its quotes are in
+EXCHANGE_CURRENCIES = {
+    "LON": "GBX",
+    "TRT": "CAD",
+    "TRV": "CAD",
+    "DEX": "EUR",
+    "BSE": "INR",
+    "SHH": "CNY",
+    "SHZ": "CNY",
+}
+
+# Currencies quoted in minor units -> (major currency, major units per minor unit)
+MINOR_UNITS = {"GBX": ("GBP", 0.01)}
+
+_CURRENCY_CODE = re.compile(r"^[A-Z]{3}$")
+
+
+def exchange_suffix(symbol: str) -> str:
+    """The exchange suffix of a symbol ("LON" for "TSCO.LON"), or "" for a US listing."""
+    _, _, suffix = symbol.upper().rpartition(".")
+    return suffix if suffix in EXCHANGE_CURRENCIES else ""
+
+
+def listing_currency(symbol: str) -> str:
+    """Currency a symbol's quotes (and so its lots' purchase prices) are in."""
+    suffix = exchange_suffix(symbol)
+    return EXCHANGE_CURRENCIES[suffix] if suffix else "USD"
+
+
+def normalize_currency(code: str) -> str:
+    """
+    Upper-cased ISO 4217 code.
+
+    Raises:
+        ValueError: If code is not three letters.
+    """
+    code = (code or "").strip().upper()
+    if not _CURRENCY_CODE.match(code):
+        raise ValueError(f"Invalid currency code: {code or '(empty)'}")
+    return code
+
+
+def major_currency(currency: str) -> Tuple[str, float]:
+    """(currency the FX market quotes, factor to it): ("GBP", 0.01) for GBX, else (currency, 1.0)."""
+    return MINOR_UNITS.get(currency, (currency, 1.0))
+
+
+def load_stub_rates(path: str = FX_STUB_RATES) -> Dict[str, float]:
+    with open(path) as stub:
+        return {code.upper(): float(rate) for code, rate in json.load(stub)["rates"].items()}
+
+
+def stub_rate(rates: Dict[str, float], from_currency: str, to_currency: str) -> float:
+    """Cross rate from a table of units per US dollar."""
+    missing = [code for code in (from_currency, to_currency) if code not in rates]
+    if missing:
+        raise ValueError(f"No stub exchange rate for {', '.join(missing)}")
+    return rates[to_currency] / rates[from_currency]
+
+
+def convert(amounts: np.ndarray, currencies: Sequence[str], rates: Dict[str, float]) -> np.ndarray:
+    """
+    Convert amounts (one row per holding, any number of columns) to the base currency.
+
+    rates maps each distinct currency to its rate into the base, so the conversion is one
+    gather and one multiply however many holdings share a currency.
+    """
+    if len(currencies) == 0:
+        return np.asarray(amounts, dtype=np.float64)
+    codes, index = np.unique(np.asarray(currencies), return_inverse=True)
+    factors = np.array([rates[code] for code in codes], dtype=np.float64)[index]
+    amounts = np.asarray(amounts, dtype=np.float64)
+    return amounts * factors.reshape((-1,) + (1,) * (amounts.ndim - 1))
@@ -0,0 +1,108 @@
+import gzip
+import logging
+import os
+import time
+
+from flask import Response, jsonify, make_response, request
+
+from music_collection.utils.cache import CacheEntry
+from music_collection.utils.logger import configure_logger
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# Responses smaller than this are not worth compressing
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/plain", "text/csv", "application/x-ndjson"}
+
+# Suffix appended to the ETag of each compressed representation, so every encoding
+# of the same data keeps a distinct strong validator
+ENCODING_ETAG_SUFFIX = {"gzip": "-gzip", "br": "-br"}
+# ...and of the representation served after the data's freshness window has passed
+STALE_ETAG_SUFFIX = "-stale"
+
+
+def cached_response(entry: CacheEntry, include_age: bool = False) -> Response:
+    """
+    Build a JSON response for a cache entry with ETag, Cache-Control and Age headers.
+
+    If the request's If-None-Match matches the entry version (or one of its compressed
+    variants), a 304 carrying the matched ETag is returned without serializing the value.
+    An entry past its freshness window (served while it is being refreshed) gets its own
+    ETag, and an Age greater than its max-age.
+
+    Args:
+        entry (CacheEntry): The cached data to send.
+        include_age (bool): Add "as_of" (fetch time) and "stale" to the JSON object.
+
+    Returns:
+        Response: A 200 with the JSON body, or an empty 304.
+    """
+    now = time.time()
+    stale = not entry.is_fresh(now)
+    etag = entry.version + (STALE_ETAG_SUFFIX if stale else "")
+
+    candidates = [etag] + [etag + suffix for suffix in ENCODING_ETAG_SUFFIX.values()]
+    matched = next((candidate for candidate in candidates if request.if_none_match.contains_weak(candidate)), None)
+    if matched is not None:
+        # A 304 carries no body to compress, so it echoes the validator of the representation the client holds
+        response = Response(status=304)
+        etag = matched
+    elif include_age:
+        response = make_response(jsonify(dict(entry.value, as_of=entry.as_of(), stale=stale)), 200)
+    else:
+        response = make_response(jsonify(entry.value), 200)
+
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = int(entry.expires_at - entry.fetched_at)
+    response.headers["Age"] = str(int(entry.age(now)))
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def _choose_encoding() -> str:
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return request.accept_encodings.best_match(offered)
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Compress a response body with brotli or gzip when the client accepts it.
+
+    Intended to be registered with app.after_request. Streamed, small, already-encoded
+    and non-text responses are passed through untouched.
+    """
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = _choose_encoding()
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=5)
+    elif encoding == "gzip":
+        compressed = gzip.compress(body, compresslevel=6)
+    else:
+        return response
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(etag + ENCODING_ETAG_SUFFIX[encoding], weak)
+    return response
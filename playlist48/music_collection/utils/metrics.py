@@ -0,0 +1,363 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from flask import Flask, g, request
+
+
+# Default latency buckets in seconds, from 1ms to 10s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Shards of finished threads are folded into one once this many have accumulated
+MAX_SHARDS = 256
+
+
+class _Sharded:
+    """
+    Per-thread accumulation slots for a metric child.
+
+    Each thread writes only to its own list, so recording a sample never takes a lock.
+    The lock is only used when a thread records for the first time and when samples are
+    collected; shards of threads that have exited are folded into a retired total.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, list]] = []
+        self._retired = [0] * size
+        self._lock = threading.Lock()
+
+    def shard(self) -> list:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = [0] * self._size
+            with self._lock:
+                if len(self._shards) >= MAX_SHARDS:
+                    self._fold_dead()
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+            return shard
+
+    def _fold_dead(self) -> None:
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                for i, value in enumerate(shard):
+                    self._retired[i] += value
+        self._shards = alive
+
+    def totals(self) -> list:
+        with self._lock:
+            self._fold_dead()
+            totals = list(self._retired)
+            for _, shard in self._shards:
+                for i, value in enumerate(shard):
+                    totals[i] += value
+        return totals
+
+
+class _CounterChild:
+    def __init__(self):
+        self._values = _Sharded(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._values.shard()[0] += amount
+
+    def get(self) -> float:
+        return self._values.totals()[0]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._values = _Sharded(1)
+        self._value: Optional[float] = None
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1) -> None:
+        self._values.shard()[0] += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self._values.shard()[0] -= amount
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the gauge's value by calling function at collection time."""
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            return self._function()
+        base = self._value if self._value is not None else 0
+        return base + self._values.totals()[0]
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = buckets
+        # One slot per bucket, one for +Inf and a final slot for the running sum
+        self._values = _Sharded(len(buckets) + 2)
+        self._local = self._values._local
+
+    def observe(self, value: float) -> None:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._values.shard()
+        shard[bisect_left(self._buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self) -> "_Timer":
+        """Context manager observing the elapsed wall time of its block."""
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], int, float]:
+        """Return (cumulative bucket counts, total count, sum)."""
+        totals = self._values.totals()
+        cumulative = []
+        running = 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+
+class _Timer:
+    def __init__(self, histogram: _HistogramChild):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Children by their label values as strings, as rendered...
+        self._children: Dict[Tuple[str, ...], object] = {}
+        # ...and by the values as callers pass them, so a lookup needs no conversion
+        self._by_values: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values) -> object:
+        """
+        Return the child for the given label values, creating it on first use.
+
+        Callers recording on every request or statement should keep the children they use.
+        """
+        child = self._by_values.get(values)
+        if child is None:
+            child = self._add_child(values)
+        return child
+
+    def _add_child(self, values: tuple) -> object:
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        key = tuple(str(v) for v in values)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+            self._by_values[values] = child
+        return child
+
+    @abstractmethod
+    def _new_child(self) -> object:
+        """A new child holding one combination of label values."""
+
+    def _label_string(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{self._label_string(values)} {_format(child.get())}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional["Registry"] = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_child(self, values, child) -> List[str]:
+        cumulative, count, total = child.snapshot()
+        lines = []
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), cumulative):
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{_format(bound)}"'
+            lines.append(f"{self.name}_bucket{self._label_string(values, le)} {bucket_count}")
+        lines.append(f"{self.name}_sum{self._label_string(values)} {_format(total)}")
+        lines.append(f"{self.name}_count{self._label_string(values)} {count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+####################################################
+#
+# Application metrics
+#
+####################################################
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route and status.",
+    ("method", "route", "status"))
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.")
+
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "upstream_request_duration_seconds", "Alpha Vantage call latency by API function.",
+    ("function",))
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total", "Failed Alpha Vantage calls by API function and reason.",
+    ("function", "reason"))
+UPSTREAM_QUOTA_REMAINING = Gauge(
+    "upstream_quota_remaining", "Estimated Alpha Vantage calls left in the daily quota.")
+
+SQLITE_STATEMENT_DURATION = Histogram(
+    "sqlite_statement_duration_seconds", "SQLite statement execution time by operation.",
+    ("operation",), buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0))
+
+CACHE_HIT_RATIO = Gauge(
+    "cache_hit_ratio", "Fraction of cache lookups served from the cache.", ("cache",))
+CACHE_ENTRIES = Gauge(
+    "cache_entries", "Number of entries held in the cache.", ("cache",))
+CACHE_STALE_SERVED = Counter(
+    "cache_stale_served_total", "Expired entries served while a refresh was pending.", ("cache",))
+
+PORTFOLIO_VALUATIONS = Counter(
+    "portfolio_valuations_total",
+    "Portfolio valuations by how much was recomputed: hit (none), partial (repriced holdings) or full.",
+    ("result",))
+
+UPSTREAM_CIRCUIT_STATE = Gauge(
+    "upstream_circuit_state", "Upstream circuit breaker state: 0 closed, 1 half-open, 2 open.", ("upstream",))
+
+
+def register_cache(cache) -> None:
+    """Export hit ratio and size gauges for a TTLCache."""
+    CACHE_HIT_RATIO.labels(cache.name).set_function(cache.hit_ratio)
+    CACHE_ENTRIES.labels(cache.name).set_function(lambda: len(cache))
+
+
+def register_circuit_breaker(breaker) -> None:
+    """Export the state of a CircuitBreaker."""
+    UPSTREAM_CIRCUIT_STATE.labels(breaker.name).set_function(breaker.state_code)
+
+
+# WSGI environ key a server may set to the perf_counter() time it received the request
+REQUEST_START_ENVIRON_KEY = "metrics.request_start"
+
+
+def instrument_app(app: Flask) -> None:
+    """Record latency, status and in-flight gauges for every request served by app."""
+
+    @app.before_request
+    def _start_timer():
+        # Under asgi.py the request may have waited on upstream data before reaching Flask
+        g.metrics_start = request.environ.get(REQUEST_START_ENVIRON_KEY) or time.perf_counter()
+        g.metrics_in_flight = True
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            HTTP_REQUEST_DURATION.labels(request.method, route, response.status_code).observe(
+                time.perf_counter() - start)
+        return response
+
+    @app.teardown_request
+    def _end_request(exc):
+        if g.pop("metrics_in_flight", False):
+            HTTP_REQUESTS_IN_FLIGHT.dec()
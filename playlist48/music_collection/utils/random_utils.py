@@ -1,4 +1,10 @@
+from collections import deque
 import logging
+import os
+import secrets
+import threading
+import time
+
 import requests
 
 from music_collection.utils.logger import configure_logger
@@ -7,42 +13,158 @@ logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 
-def get_random(num_songs: int) -> int:
-    """
-    Fetches a random int between 1 and the number of songs in the catalog from random.org.
+# random.org endpoint, overridable so a local stub server can stand in for it
+RANDOM_ORG_URL = os.getenv("RANDOM_ORG_URL", "https://www.random.org/integers/")
+# random.org accepts at most 10,000 integers per request
+RANDOM_BATCH_SIZE = int(os.getenv("RANDOM_BATCH_SIZE", "10000"))
+RANDOM_LOW_WATER = int(os.getenv("RANDOM_LOW_WATER", "1000"))
+# How long to stop asking random.org after a failure (timeout, 503 quota exhausted, ...)
+RANDOM_RETRY_AFTER = float(os.getenv("RANDOM_RETRY_AFTER", "60"))
 
-    Returns:
-        int: The random number fetched from random.org.
+# Raw integers are fetched over [0, RAW_RANGE) and reduced to the requested range locally,
+# so one buffer can serve draws for any upper bound.
+RAW_RANGE = 1_000_000_000
 
-    Raises:
-        RuntimeError: If the request to random.org fails or returns an invalid response.
-        ValueError: If the response from random.org is not a valid float.
+
+class RandomBuffer:
+    """
+    Buffered source of random integers backed by random.org.
+
+    Integers are fetched in bulk and kept in memory; a background thread tops the buffer
+    up once it drops below the low-water mark. When the buffer is empty or random.org is
+    unreachable, draws fall back to the OS CSPRNG so callers never block on the network.
     """
-    url = f"https://www.random.org/integers/?num=1&min=1&max={num_songs}&col=1&base=10&format=plain&rnd=new"
 
-    try:
-        # Log the request to random.org
-        logger.info("Fetching random number from %s", url)
+    def __init__(self, url: str = RANDOM_ORG_URL, batch_size: int = RANDOM_BATCH_SIZE,
+                 low_water: int = RANDOM_LOW_WATER, retry_after: float = RANDOM_RETRY_AFTER,
+                 timeout: float = 5):
+        self.url = url
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.retry_after = retry_after
+        self.timeout = timeout
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._refilling = False
+        self._remote_disabled_until = 0.0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def randint(self, low: int, high: int) -> int:
+        """
+        Draw a uniformly distributed integer in [low, high].
+
+        Args:
+            low (int): Lower bound, inclusive.
+            high (int): Upper bound, inclusive.
+
+        Returns:
+            int: The random integer.
+
+        Raises:
+            ValueError: If the range is empty or wider than the raw range.
+        """
+        span = high - low + 1
+        if span < 1:
+            raise ValueError("Invalid range: [%s, %s]" % (low, high))
+        if span > RAW_RANGE:
+            raise ValueError("Range too large: [%s, %s]" % (low, high))
+
+        # Rejection sampling keeps the reduction modulo span unbiased
+        limit = (RAW_RANGE // span) * span
+        while True:
+            raw = self._next_raw()
+            if raw < limit:
+                return low + raw % span
+
+    def _next_raw(self) -> int:
+        if len(self._buffer) < self.low_water:
+            self._schedule_refill()
+        try:
+            return self._buffer.popleft()
+        except IndexError:
+            return secrets.randbelow(RAW_RANGE)
+
+    def _schedule_refill(self) -> None:
+        if time.monotonic() < self._remote_disabled_until:
+            return
+        with self._lock:
+            if self._refilling:
+                return
+            self._refilling = True
+        threading.Thread(target=self._refill, name="random-refill", daemon=True).start()
+
+    def _refill(self) -> None:
+        try:
+            self._buffer.extend(self.fetch_batch(self.batch_size))
+        except RuntimeError as e:
+            logger.warning("Falling back to local randomness for %ss: %s", self.retry_after, e)
+            self._remote_disabled_until = time.monotonic() + self.retry_after
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def refill(self) -> None:
+        """Synchronously fetch one batch into the buffer."""
+        self._refill()
 
-        response = requests.get(url, timeout=5)
+    def fetch_batch(self, count: int) -> list:
+        """
+        Fetch a batch of raw integers in [0, RAW_RANGE) from random.org.
 
-        # Check if the request was successful
-        response.raise_for_status()
+        Args:
+            count (int): How many integers to request (at most 10,000).
 
-        random_number_str = response.text.strip()
+        Returns:
+            list: The integers returned by random.org.
 
+        Raises:
+            RuntimeError: If the request fails, times out or returns an invalid response.
+        """
+        params = {
+            "num": count,
+            "min": 0,
+            "max": RAW_RANGE - 1,
+            "col": 1,
+            "base": 10,
+            "format": "plain",
+            "rnd": "new",
+        }
         try:
-            random_number = int(random_number_str)
+            logger.info("Fetching %d random numbers from %s", count, self.url)
+            response = requests.get(self.url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.exceptions.Timeout:
+            logger.error("Request to random.org timed out.")
+            raise RuntimeError("Request to random.org timed out.")
+        except requests.exceptions.RequestException as e:
+            logger.error("Request to random.org failed: %s", e)
+            raise RuntimeError("Request to random.org failed: %s" % e)
+
+        try:
+            numbers = [int(line) for line in response.text.split()]
         except ValueError:
-            raise ValueError("Invalid response from random.org: %s" % random_number_str)
+            raise RuntimeError("Invalid response from random.org: %s" % response.text[:100])
+
+        logger.info("Received %d random numbers", len(numbers))
+        return numbers
+
 
-        logger.info("Received random number: %.3f", random_number)
-        return random_number
+_random_buffer = RandomBuffer()
 
-    except requests.exceptions.Timeout:
-        logger.error("Request to random.org timed out.")
-        raise RuntimeError("Request to random.org timed out.")
 
-    except requests.exceptions.RequestException as e:
-        logger.error("Request to random.org failed: %s", e)
-        raise RuntimeError("Request to random.org failed: %s" % e)
+def get_random(num_songs: int) -> int:
+    """
+    Returns a random int between 1 and the number of songs in the catalog.
+
+    Numbers come from a shared buffer that is filled from random.org in bulk, so a draw is
+    a local memory read. If random.org is unreachable the OS CSPRNG is used instead.
+
+    Returns:
+        int: The random number.
+
+    Raises:
+        ValueError: If num_songs is less than 1.
+    """
+    return _random_buffer.randint(1, num_songs)
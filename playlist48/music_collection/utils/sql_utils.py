@@ -1,9 +1,15 @@
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 import logging
 import os
 import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, List, Optional
 
 from music_collection.utils.logger import configure_logger
+from music_collection.utils.metrics import SQLITE_STATEMENT_DURATION
 
 
 logger = logging.getLogger(__name__)
@@ -12,6 +18,355 @@ configure_logger(logger)
 
 # load the db path from the environment with a default value
 DB_PATH = os.getenv("DB_PATH", "/app/db/stocks.db")
+# Number of SQLite files account data (portfolio, ledger) is spread over. Shard 0 is DB_PATH
+# itself; shard N is DB_PATH with ".shardN" before the extension. Accounts are assigned by
+# hash, so this must not change once accounts hold data.
+DB_SHARDS = int(os.getenv("DB_SHARDS", "1"))
+# Storage backend the application uses: "file" (DB_PATH and its shards) or "memory"
+# (in-memory SQLite, e.g. for benchmarks; nothing is persisted)
+DB_BACKEND = os.getenv("DB_BACKEND", "file")
+# Idle connections kept open for reuse per database file; more can be open at once, and
+# those beyond this are closed when they are released
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+# Schema an in-memory database is created with
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                           "sql", "create_portfolio_table.sql")
+
+_shard_locks = {}
+_shard_locks_guard = threading.Lock()
+
+
+# Statements whose timing histogram is kept by SQL text; generated statements beyond
+# this many (e.g. IN lists of every length) look theirs up by operation each time
+STATEMENT_TIMERS_MAX = 1024
+_statement_timers: Dict[str, object] = {}
+
+
+def _operation(sql: str) -> str:
+    words = sql.split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+
+def _statement_timer(sql: str):
+    timer = _statement_timers.get(sql)
+    if timer is None:
+        timer = SQLITE_STATEMENT_DURATION.labels(_operation(sql))
+        if len(_statement_timers) < STATEMENT_TIMERS_MAX:
+            _statement_timers[sql] = timer
+    return timer
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that records the execution time of every statement."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _statement_timer(sql).observe(time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _statement_timer(sql).observe(time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (including those behind conn.execute) are timed."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    """
+    Connections to one SQLite file, reused across threads and requests.
+
+    A connection is taken from the idle list or opened (check_same_thread=False) when the
+    list is empty, so a burst of requests never waits on the pool. On release an open
+    transaction is rolled back, and the connection is kept if fewer than max_idle are idle
+    or closed otherwise. A forked child starts with an empty pool rather than reusing its
+    parent's connections.
+    """
+
+    def __init__(self, path: str, max_idle: int):
+        self.path = path
+        self.max_idle = max_idle
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle, self._pid = [], os.getpid()
+            if self._idle:
+                return self._idle.pop()
+        return sqlite3.connect(self.path, factory=TimedConnection, check_same_thread=False)
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class Storage:
+    """
+    Where the application's SQLite data lives.
+
+    Models take a storage and open every connection through it, so the same code runs
+    against files on disk or in-memory databases. Shard 0 holds the main database (users,
+    alerts, price history); account data (portfolio, ledger) is spread over all shards.
+    """
+
+    @property
+    def shards(self) -> int:
+        raise NotImplementedError
+
+    def _open(self, shard: int):
+        """Context manager lending a connection to a shard for one block."""
+        raise NotImplementedError
+
+    def _guard(self, shard: int, write: bool):
+        """Context manager held around a connection block to a shard."""
+        raise NotImplementedError
+
+    def shard_for_account(self, account_id: int) -> int:
+        """Shard index holding an account's data (a stable hash, identical in every process)."""
+        return zlib.crc32(str(account_id).encode()) % self.shards
+
+    def all_shards(self) -> range:
+        """Every shard index."""
+        return range(self.shards)
+
+    def connection(self):
+        """
+        Context manager for a connection to the main database.
+
+        Yields:
+            sqlite3.Connection: The SQLite connection object.
+        """
+        return self.shard_connection(0)
+
+    @contextmanager
+    def shard_connection(self, shard: int, write: bool = False):
+        """
+        Context manager for a connection to one shard.
+
+        With write=True the shard's write lock is held and an IMMEDIATE transaction is open for
+        the whole block, so read-check-write sequences (e.g. selling lots) cannot interleave.
+        Writers on other shards are not blocked. The caller commits.
+
+        Yields:
+            sqlite3.Connection: The SQLite connection object.
+        """
+        with self._guard(shard, write), self._open(shard) as conn:
+            try:
+                if write:
+                    conn.execute("BEGIN IMMEDIATE")
+                yield conn
+            except sqlite3.Error as e:
+                logger.error("Database connection error: %s", str(e))
+                raise e
+
+    def account_connection(self, account_id: int, write: bool = False):
+        """Context manager for a connection to the shard holding account_id."""
+        return self.shard_connection(self.shard_for_account(account_id), write)
+
+    def check_connection(self) -> None:
+        """Check the database connection
+
+        Raises:
+            Exception: If the database connection is not OK
+        """
+        try:
+            with self.connection() as conn:
+                # This ensures the connection is actually active
+                conn.execute("SELECT 1;")
+        except sqlite3.Error as e:
+            error_message = f"Database connection error: {self}"
+            logger.error(error_message)
+            raise Exception(error_message) from e
+
+    def check_table_exists(self, tablename: str) -> None:
+        """Check if the table exists by querying it
+
+        Args:
+            tablename (str): The name of the table to check
+
+        Raises:
+            Exception: If the table does not exist
+        """
+        try:
+            with self.connection() as conn:
+                conn.execute(f"SELECT 1 FROM {tablename} LIMIT 1;")
+        except sqlite3.Error as e:
+            error_message = f"Table check error: {e}"
+            logger.error(error_message)
+            raise Exception(error_message) from e
+
+
+class FileStorage(Storage):
+    """
+    SQLite files on disk: path itself for shard 0, and path with ".shardN" before the
+    extension for shard N. Without arguments it follows DB_PATH and DB_SHARDS.
+
+    Connections come from a ConnectionPool per file, so a request doesn't pay for opening
+    one (and re-reading the schema) every time.
+    """
+
+    def __init__(self, path: Optional[str] = None, shards: Optional[int] = None,
+                 pool_size: Optional[int] = None):
+        self._path = path
+        self._shards = shards
+        self._pool_size = pool_size
+        self._pools: Dict[str, ConnectionPool] = {}
+        self._pools_lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return self.path
+
+    @property
+    def path(self) -> str:
+        return self._path or DB_PATH
+
+    @property
+    def shards(self) -> int:
+        return self._shards or DB_SHARDS
+
+    def shard_path(self, shard: int) -> str:
+        """Path of the SQLite file for a shard index."""
+        if shard == 0:
+            return self.path
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.shard{shard}{ext}"
+
+    def _guard(self, shard: int, write: bool):
+        # Keyed by file, so every storage (and model) writing a shard shares its lock
+        return _shard_lock(self.shard_path(shard)) if write else nullcontext()
+
+    def _pool(self, shard: int) -> ConnectionPool:
+        # Keyed by file, since the path follows DB_PATH when none was given
+        path = self.shard_path(shard)
+        pool = self._pools.get(path)
+        if pool is None:
+            with self._pools_lock:
+                pool = self._pools.setdefault(path, ConnectionPool(path, self._pool_size or DB_POOL_SIZE))
+        return pool
+
+    @contextmanager
+    def _open(self, shard: int):
+        pool = self._pool(shard)
+        conn = pool.acquire()
+        try:
+            yield conn
+        finally:
+            pool.release(conn)
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        with self._pools_lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+
+class MemoryStorage(Storage):
+    """
+    In-memory SQLite databases, one per shard, created from the application schema.
+    Nothing touches disk, so tests and benchmarks run without file I/O.
+
+    Each shard is a private database behind a single connection, which every thread reuses
+    under that shard's (reentrant) lock. Shards are independent: work on one never waits
+    for another, as with the per-shard write locks of FileStorage.
+    """
+
+    def __init__(self, shards: int = 1, schema_path: str = SCHEMA_PATH):
+        if shards <= 0:
+            raise ValueError("Shards must be positive")
+        self._shards = shards
+        self._name = f"storage-{uuid.uuid4().hex}"
+        self._locks = [threading.RLock() for _ in range(shards)]
+        # Blocks currently open on each shard; only the thread holding its lock changes it
+        self._depth = [0] * shards
+        with open(schema_path) as schema:
+            script = schema.read()
+        self._connections: List[sqlite3.Connection] = []
+        for _ in range(shards):
+            conn = sqlite3.connect(":memory:", factory=TimedConnection, check_same_thread=False)
+            conn.executescript(script)
+            self._connections.append(conn)
+
+    def __str__(self) -> str:
+        return f"memory:{self._name}"
+
+    @property
+    def shards(self) -> int:
+        return self._shards
+
+    def _guard(self, shard: int, write: bool):
+        return self._locks[shard]
+
+    @contextmanager
+    def _open(self, shard: int):
+        conn = self._connections[shard]
+        self._depth[shard] += 1
+        try:
+            yield conn
+        finally:
+            self._depth[shard] -= 1
+            # A nested block shares the outer block's connection and leaves its transaction alone
+            if self._depth[shard] == 0 and conn.in_transaction:
+                conn.rollback()
+
+    def close(self) -> None:
+        """Drop the databases."""
+        for conn in self._connections:
+            conn.close()
+        self._connections = []
+
+
+def create_storage(backend: Optional[str] = None) -> Storage:
+    """The storage for a backend name (DB_BACKEND by default)."""
+    backend = backend or DB_BACKEND
+    if backend == "file":
+        return FileStorage()
+    if backend == "memory":
+        return MemoryStorage(DB_SHARDS)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+# Used by models constructed without a storage
+_default_storage = FileStorage()
+
+
+def default_storage() -> Storage:
+    """The file storage following DB_PATH and DB_SHARDS."""
+    return _default_storage
 
 
 def check_database_connection():
@@ -20,16 +375,7 @@ def check_database_connection():
     Raises:
         Exception: If the database connection is not OK
     """
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        # This ensures the connection is actually active
-        cursor.execute("SELECT 1;")
-        conn.close()
-    except sqlite3.Error as e:
-        error_message = f"Database connection error: {DB_PATH}"
-        logger.error(error_message)
-        raise Exception(error_message) from e
+    _default_storage.check_connection()
 
 def check_table_exists(tablename: str):
     """Check if the table exists by querying it
@@ -40,32 +386,35 @@ def check_table_exists(tablename: str):
     Raises:
         Exception: If the table does not exist
     """
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT 1 FROM {tablename} LIMIT 1;")
-        conn.close()
-    except sqlite3.Error as e:
-        error_message = f"Table check error: {e}"
-        logger.error(error_message)
-        raise Exception(error_message) from e
+    _default_storage.check_table_exists(tablename)
 
-@contextmanager
 def get_db_connection():
-    """
-    Context manager for SQLite database connection.
+    """Context manager for a connection to the main database of the default storage."""
+    return _default_storage.connection()
 
-    Yields:
-        sqlite3.Connection: The SQLite connection object.
-    """
-    conn = None
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        yield conn
-    except sqlite3.Error as e:
-        logger.error("Database connection error: %s", str(e))
-        raise e
-    finally:
-        if conn:
-            conn.close()
-            logger.info("Database connection closed.")
+def shard_for_account(account_id: int) -> int:
+    """Shard index holding an account's data (a stable hash, identical in every process)."""
+    return _default_storage.shard_for_account(account_id)
+
+def all_shards() -> range:
+    """Every shard index."""
+    return _default_storage.all_shards()
+
+def shard_path(shard: int) -> str:
+    """Path of the SQLite file for a shard index."""
+    return _default_storage.shard_path(shard)
+
+def _shard_lock(key: str) -> threading.Lock:
+    lock = _shard_locks.get(key)
+    if lock is None:
+        with _shard_locks_guard:
+            lock = _shard_locks.setdefault(key, threading.Lock())
+    return lock
+
+def get_shard_connection(shard: int, write: bool = False):
+    """Context manager for a connection to one shard of the default storage."""
+    return _default_storage.shard_connection(shard, write)
+
+def get_account_connection(account_id: int, write: bool = False):
+    """Context manager for a connection to the shard holding account_id."""
+    return _default_storage.account_connection(account_id, write)
@@ -0,0 +1,171 @@
+import asyncio
+import concurrent.futures
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+# Seconds a handler thread blocked on a full queue waits between checks for a disconnect
+HANDOFF_POLL_INTERVAL = 0.5
+
+
+class ClientDisconnected(OSError):
+    """Raised inside the WSGI thread when the ASGI client has gone away."""
+
+
+async def read_body(receive: Callable) -> bytes:
+    """Read the whole request body from an ASGI receive callable."""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+def build_environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    """Translate an ASGI HTTP scope and its body into a WSGI environ."""
+    script_name = scope.get("root_path", "")
+    path_info = scope["path"]
+    if script_name and path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": script_name.encode("utf8").decode("latin1"),
+        "PATH_INFO": path_info.encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin1").upper().replace("-", "_")
+        if name not in ("CONTENT_LENGTH", "CONTENT_TYPE"):
+            name = "HTTP_" + name
+        value = raw_value.decode("latin1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+class WsgiBridge:
+    """
+    Serve a WSGI application from ASGI, running each request on a bounded thread pool.
+
+    Unlike asgiref's WsgiToAsgi (which runs every request on one shared thread unless
+    told otherwise), requests here run in parallel. A streamed response holds its thread
+    until it finishes or the client disconnects; the disconnect is raised inside the
+    response iterator so generator cleanup (e.g. unsubscribing a stream) runs.
+
+    At most max_buffered messages wait between the handler thread and the event loop;
+    when a client reads slowly the handler blocks until it catches up, so a large
+    streamed response is never buffered whole in memory.
+    """
+
+    def __init__(self, wsgi_app: Callable, max_threads: int = 32, max_buffered: int = 8):
+        self.wsgi_app = wsgi_app
+        self.max_buffered = max_buffered
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable,
+                       body: Optional[bytes] = None, environ_extras: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Args:
+            body: The request body, if the caller has already read it from receive.
+            environ_extras: Additional keys to set in the WSGI environ.
+        """
+        if body is None:
+            body = await read_body(receive)
+        environ = build_environ(scope, body)
+        environ.update(environ_extras or {})
+
+        loop = asyncio.get_running_loop()
+        disconnected = threading.Event()
+        messages: asyncio.Queue = asyncio.Queue(self.max_buffered)
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        def emit(message: Optional[Dict[str, Any]]) -> None:
+            # Wait for room in the queue: this is the backpressure on the handler
+            if message is not None and disconnected.is_set():
+                raise ClientDisconnected("client disconnected")
+            handoff = asyncio.run_coroutine_threadsafe(messages.put(message), loop)
+            while True:
+                try:
+                    return handoff.result(HANDOFF_POLL_INTERVAL)
+                except concurrent.futures.TimeoutError:
+                    if disconnected.is_set():
+                        # Nobody is reading any more; drop the message
+                        handoff.cancel()
+                        if message is None:
+                            return
+                        raise ClientDisconnected("client disconnected")
+
+        def run() -> None:
+            try:
+                self._run(environ, emit)
+            finally:
+                emit(None)
+
+        watcher = loop.create_task(watch_disconnect())
+        handler = loop.run_in_executor(self.executor, run)
+        try:
+            while True:
+                message = await messages.get()
+                if message is None:
+                    break
+                await send(message)
+            await handler
+        finally:
+            # If sending failed, release a handler thread waiting for room in the queue
+            disconnected.set()
+            watcher.cancel()
+
+    def _run(self, environ: Dict[str, Any], send: Callable[[Dict[str, Any]], None]) -> None:
+        state: Dict[str, Any] = {"start": None, "sent": False}
+
+        def start_response(status: str, headers, exc_info=None):
+            if exc_info and state["sent"]:
+                raise exc_info[1].with_traceback(exc_info[2])
+            state["start"] = {
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(name.lower().encode("latin1"), value.encode("latin1")) for name, value in headers],
+            }
+            return write
+
+        def write(data: bytes) -> None:
+            if not state["sent"]:
+                send(state["start"])
+                state["sent"] = True
+            if data:
+                send({"type": "http.response.body", "body": data, "more_body": True})
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in result:
+                write(chunk)
+            write(b"")
+            send({"type": "http.response.body", "body": b"", "more_body": False})
+        except ClientDisconnected:
+            pass
+        finally:
+            if hasattr(result, "close"):
+                result.close()
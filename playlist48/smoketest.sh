@@ -66,7 +66,7 @@ get_stock_history() {
 
 get_portfolio() {
     echo "Getting portfolio holdings..."
-    response=$(curl -s -X GET "$BASE_URL/portfolio")
+    response=$(curl -s -X GET "$BASE_URL/portfolio?account_id=$ACCOUNT_ID" -H "Authorization: Bearer $TOKEN")
     if [ "$ECHO_JSON" = true ]; then
         echo "Portfolio JSON:"
         echo "$response" | jq .
@@ -75,7 +75,7 @@ get_portfolio() {
 
 get_portfolio_value() {
     echo "Getting portfolio value..."
-    response=$(curl -s -X GET "$BASE_URL/portfolio/value")
+    response=$(curl -s -X GET "$BASE_URL/portfolio/value?account_id=$ACCOUNT_ID" -H "Authorization: Bearer $TOKEN")
     if [ "$ECHO_JSON" = true ]; then
         echo "Portfolio Value JSON:"
         echo "$response" | jq .
@@ -87,8 +87,8 @@ buy_stock() {
     shares=$2
     echo "Buying $shares shares of $symbol..."
     response=$(curl -s -X POST "$BASE_URL/portfolio/buy" \
-        -H "Content-Type: application/json" \
-        -d "{\"symbol\":\"$symbol\", \"shares\":$shares}")
+        -H "Content-Type: application/json" -H "Authorization: Bearer $TOKEN" \
+        -d "{\"account_id\":$ACCOUNT_ID, \"symbol\":\"$symbol\", \"shares\":$shares}")
     if [ "$ECHO_JSON" = true ]; then
         echo "Buy Transaction JSON:"
         echo "$response" | jq .
@@ -100,8 +100,8 @@ sell_stock() {
     shares=$2
     echo "Selling $shares shares of $symbol..."
     response=$(curl -s -X POST "$BASE_URL/portfolio/sell" \
-        -H "Content-Type: application/json" \
-        -d "{\"symbol\":\"$symbol\", \"shares\":$shares}")
+        -H "Content-Type: application/json" -H "Authorization: Bearer $TOKEN" \
+        -d "{\"account_id\":$ACCOUNT_ID, \"symbol\":\"$symbol\", \"shares\":$shares}")
     if [ "$ECHO_JSON" = true ]; then
         echo "Sell Transaction JSON:"
         echo "$response" | jq .
@@ -136,6 +136,9 @@ login() {
 
   if echo "$response" | grep -q '"message": "Login successful"'; then
     echo "Login successful for user: $username."
+    # Portfolio calls act on the logged-in user's account and must carry its token
+    ACCOUNT_ID=$(echo "$response" | jq -r .id)
+    TOKEN=$(echo "$response" | jq -r .token)
   else
   echo $response
     echo "Failed to log in user: $username."
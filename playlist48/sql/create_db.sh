@@ -11,4 +11,11 @@ else
     # Create the database for the first time
     sqlite3 "$DB_PATH" < /app/sql/create_portfolio_table.sql
     echo "Database created successfully."
-fi
\ No newline at end of file
+fi
+
+# Account data is spread over DB_SHARDS files; shard 0 is DB_PATH itself
+for ((shard = 1; shard < ${DB_SHARDS:-1}; shard++)); do
+    shard_path="${DB_PATH%.*}.shard${shard}.${DB_PATH##*.}"
+    echo "Creating shard database at $shard_path."
+    sqlite3 "$shard_path" < /app/sql/create_portfolio_table.sql
+done
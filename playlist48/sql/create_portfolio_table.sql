@@ -8,12 +8,19 @@ CREATE TABLE stocks (
 DROP TABLE IF EXISTS portfolio;
 CREATE TABLE portfolio (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER NOT NULL DEFAULT 0,
     symbol TEXT,
     shares INTEGER,
     purchase_price REAL,
     purchase_date TIMESTAMP,
     FOREIGN KEY (symbol) REFERENCES stocks(symbol)
 );
+CREATE INDEX idx_portfolio_account_symbol ON portfolio (account_id, symbol);
+DROP TABLE IF EXISTS portfolio_versions;
+CREATE TABLE portfolio_versions (
+    account_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
 DROP TABLE IF EXISTS users;
 CREATE TABLE users(
     id INTEGER NOT NULL, 
@@ -22,4 +29,119 @@ CREATE TABLE users(
 	hashed_password BLOB NOT NULL, 
 	PRIMARY KEY (id), 
 	UNIQUE (username)
-);
\ No newline at end of file
+);
+DROP TABLE IF EXISTS alerts;
+CREATE TABLE alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL,
+    direction TEXT NOT NULL CHECK (direction IN ('above', 'below')),
+    threshold REAL NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    triggered_at TIMESTAMP,
+    triggered_price REAL
+);
+CREATE INDEX idx_alerts_active ON alerts (triggered_at, symbol);
+DROP TABLE IF EXISTS alerts_version;
+CREATE TABLE alerts_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT INTO alerts_version (id, version) VALUES (1, 0);
+DROP TABLE IF EXISTS alerts_changes;
+CREATE TABLE alerts_changes (
+    version INTEGER NOT NULL,
+    alert_id INTEGER NOT NULL,
+    operation TEXT NOT NULL CHECK (operation IN ('create', 'delete', 'trigger')),
+    PRIMARY KEY (version, alert_id)
+) WITHOUT ROWID;
+DROP TABLE IF EXISTS price_history;
+CREATE TABLE price_history (
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL NOT NULL,
+    volume INTEGER,
+    PRIMARY KEY (symbol, date)
+) WITHOUT ROWID;
+DROP TABLE IF EXISTS portfolio_value_history;
+CREATE TABLE portfolio_value_history (
+    account_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    value REAL NOT NULL,
+    cost_basis REAL NOT NULL,
+    PRIMARY KEY (account_id, date)
+);
+DROP TABLE IF EXISTS portfolio_history_state;
+CREATE TABLE portfolio_history_state (
+    account_id INTEGER PRIMARY KEY,
+    through_date TEXT NOT NULL,
+    last_transaction_id INTEGER NOT NULL,
+    transaction_count INTEGER NOT NULL,
+    positions TEXT NOT NULL
+);
+DROP TABLE IF EXISTS transactions;
+CREATE TABLE transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL CHECK (side IN ('buy', 'sell')),
+    shares INTEGER NOT NULL CHECK (shares > 0),
+    price REAL NOT NULL,
+    executed_at TIMESTAMP NOT NULL
+);
+CREATE INDEX idx_transactions_account ON transactions (account_id, id);
+CREATE INDEX idx_transactions_account_symbol ON transactions (account_id, symbol, id);
+DROP TABLE IF EXISTS position_snapshots;
+CREATE TABLE position_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    last_transaction_id INTEGER NOT NULL,
+    created_at TIMESTAMP NOT NULL
+);
+DROP TABLE IF EXISTS position_snapshot_rows;
+CREATE TABLE position_snapshot_rows (
+    snapshot_id INTEGER NOT NULL,
+    account_id INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    shares INTEGER NOT NULL,
+    cost_basis REAL NOT NULL,
+    realized_pnl REAL NOT NULL,
+    lots TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, account_id, symbol)
+);
+DROP TABLE IF EXISTS position_snapshot_skipped;
+CREATE TABLE position_snapshot_skipped (
+    snapshot_id INTEGER NOT NULL,
+    account_id INTEGER NOT NULL,
+    error TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, account_id)
+);
+DROP TABLE IF EXISTS symbols;
+CREATE TABLE symbols (
+    symbol TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    exchange TEXT,
+    asset_type TEXT,
+    ipo_date TEXT
+) WITHOUT ROWID;
+DROP TABLE IF EXISTS symbol_directory_state;
+CREATE TABLE symbol_directory_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    refreshed_at TEXT,
+    source TEXT,
+    symbols INTEGER NOT NULL DEFAULT 0,
+    claimed_at REAL
+);
+INSERT INTO symbol_directory_state (id) VALUES (1);
+DROP TABLE IF EXISTS intraday_bars;
+CREATE TABLE intraday_bars (
+    symbol TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    volume INTEGER NOT NULL,
+    PRIMARY KEY (symbol, ts)
+) WITHOUT ROWID;
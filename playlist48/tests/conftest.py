@@ -0,0 +1,9 @@
+import pytest
+from music_collection.utils.sql_utils import MemoryStorage
+
+@pytest.fixture
+def storage():
+    """In-memory storage with the application schema, dropped after the test"""
+    storage = MemoryStorage()
+    yield storage
+    storage.close()
@@ -0,0 +1,114 @@
+import pytest
+import sqlite3
+from unittest.mock import patch
+from music_collection.models.ledger_model import LedgerModel
+from music_collection.models.portfolio_model import PortfolioModel
+from music_collection.models.stock_model import StockModel
+from music_collection.utils import sql_utils
+
+SHARDS = 3
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Three temporary shard databases with the application schema"""
+    path = tmp_path / "stocks.db"
+    monkeypatch.setattr("music_collection.utils.sql_utils.DB_PATH", str(path))
+    monkeypatch.setattr("music_collection.utils.sql_utils.DB_SHARDS", SHARDS)
+    with open("sql/create_portfolio_table.sql") as schema:
+        script = schema.read()
+    for shard in range(SHARDS):
+        conn = sqlite3.connect(sql_utils.shard_path(shard))
+        conn.executescript(script)
+        conn.close()
+    return path
+
+@pytest.fixture
+def portfolio_model(db_path):
+    """Portfolio model with a stubbed quote price"""
+    model = PortfolioModel(StockModel(), LedgerModel(snapshot_every=10 ** 9, snapshot_interval=3600))
+    with patch.object(model.stock_model, 'get_stock_info', return_value={"price": 10.0}):
+        yield model
+
+def accounts_on_distinct_shards():
+    by_shard = {}
+    for account_id in range(1, 100):
+        by_shard.setdefault(sql_utils.shard_for_account(account_id), account_id)
+    return list(by_shard.values())
+
+def test_shard_assignment_is_stable(db_path):
+    """Test accounts map to the same shard every time and every shard is used"""
+    assert [sql_utils.shard_for_account(7) for _ in range(3)] == [sql_utils.shard_for_account(7)] * 3
+    assert len(accounts_on_distinct_shards()) == SHARDS
+    assert sql_utils.shard_path(0) == str(db_path)
+    assert sql_utils.shard_path(2).endswith("stocks.shard2.db")
+
+def test_accounts_are_isolated(portfolio_model):
+    """Test each account only sees and sells its own lots"""
+    first, second = accounts_on_distinct_shards()[:2]
+    portfolio_model.buy_stock("AAPL", 5, first)
+    portfolio_model.buy_stock("MSFT", 3, second)
+
+    assert portfolio_model.get_positions(first) == {"AAPL": 5}
+    assert portfolio_model.get_positions(second) == {"MSFT": 3}
+    with pytest.raises(ValueError, match="Not enough shares to sell"):
+        portfolio_model.sell_stock("AAPL", 1, second)
+    assert portfolio_model.get_held_symbols() == ["AAPL", "MSFT"]
+
+def test_account_data_lives_on_its_shard(portfolio_model):
+    """Test lots and ledger rows are written to the account's shard only"""
+    account_id = accounts_on_distinct_shards()[1]
+    portfolio_model.buy_stock("AAPL", 2, account_id)
+
+    for shard in range(SHARDS):
+        conn = sqlite3.connect(sql_utils.shard_path(shard))
+        lots = conn.execute("SELECT COUNT(*) FROM portfolio").fetchone()[0]
+        transactions = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        conn.close()
+        expected = 1 if shard == sql_utils.shard_for_account(account_id) else 0
+        assert (lots, transactions) == (expected, expected)
+
+def test_portfolio_queries_use_account_index(db_path):
+    """Test portfolio lookups by account and symbol are served by the (account_id, symbol) index"""
+    conn = sqlite3.connect(db_path)
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id, shares, purchase_price FROM portfolio WHERE account_id = ? AND symbol = ?",
+        (1, "AAPL")
+    ).fetchall()
+    conn.close()
+    assert "idx_portfolio_account_symbol" in " ".join(row[-1] for row in plan)
+
+def test_portfolio_routes_act_only_on_the_callers_account(db_path):
+    """Test routes need the login token of the account they name, and the default account is read-only"""
+    from app import app, portfolio_model, user_model
+    conn = sqlite3.connect(sql_utils.shard_path(sql_utils.shard_for_account(0)))
+    conn.execute("INSERT INTO portfolio (account_id, symbol, shares, purchase_price, purchase_date) "
+                 "VALUES (0, 'AAPL', 4, 10.0, '2024-01-02')")
+    conn.commit()
+    conn.close()
+    app.config["TESTING"] = True
+    portfolio_model.stock_model.quote_cache.set("AAPL", {"symbol": "AAPL", "price": 12.0}, 60)
+    with app.test_client() as client:
+        user_model.create_account("alice", "password123")
+        user_model.create_account("bob", "password123")
+        login = client.post("/api/login", json={"username": "alice", "password": "password123"}).json
+        alice = {"Authorization": f"Bearer {login['token']}"}
+        bob_id = login["id"] + 1
+        order = {"account_id": login["id"], "symbol": "AAPL", "shares": 1}
+
+        anonymous = client.get(f"/api/portfolio?account_id={login['id']}")
+        forged = client.get(f"/api/portfolio?account_id={login['id']}", headers={"Authorization": "Bearer forged"})
+        missing = client.get("/api/portfolio", headers=alice)
+        other = client.get(f"/api/portfolio?account_id={bob_id}", headers=alice)
+        other_trade = client.post("/api/portfolio/buy", json=dict(order, account_id=bob_id), headers=alice)
+        default = client.get("/api/portfolio?account_id=0", headers=alice)
+        default_trade = client.post("/api/portfolio/sell", json=dict(order, account_id=0), headers=alice)
+        own_trade = client.post("/api/portfolio/buy", json=order, headers=alice)
+        own = client.get(f"/api/portfolio?account_id={login['id']}", headers=alice)
+
+    assert anonymous.status_code == forged.status_code == 401
+    assert anonymous.headers["WWW-Authenticate"] == "Bearer"
+    assert missing.status_code == 400
+    assert other.status_code == other_trade.status_code == default_trade.status_code == 403
+    assert [(h["symbol"], h["shares"]) for h in default.json] == [("AAPL", 4)]
+    assert own_trade.status_code == 201
+    assert [(h["symbol"], h["shares"]) for h in own.json] == [("AAPL", 1)]
@@ -0,0 +1,137 @@
+import pytest
+import sqlite3
+from unittest.mock import patch
+from music_collection.models.alert_model import AlertModel
+from music_collection.models.stock_model import StockModel
+
+@pytest.fixture
+def alert_model(tmp_path, monkeypatch):
+    """Create an alert model backed by a temporary database"""
+    db_path = tmp_path / "alerts.db"
+    conn = sqlite3.connect(db_path)
+    with open("sql/create_portfolio_table.sql") as schema:
+        conn.executescript(schema.read())
+    conn.close()
+    monkeypatch.setattr("music_collection.utils.sql_utils.DB_PATH", str(db_path))
+
+    return AlertModel()
+
+def test_upward_crossing_fires_alerts_in_range(alert_model):
+    """Test only alerts between the previous and new price fire"""
+    for threshold in (190, 200, 210, 250):
+        alert_model.create_alert("AAPL", "above", threshold)
+
+    alert_model.evaluate("AAPL", 195.0)
+    fired = alert_model.evaluate("AAPL", 212.0)
+
+    assert sorted(alert["threshold"] for alert in fired) == [200.0, 210.0]
+    assert len(alert_model.get_alerts("AAPL", "triggered")) == 2
+    assert len(alert_model.get_alerts("AAPL", "active")) == 2
+
+def test_downward_crossing(alert_model):
+    """Test below alerts fire on a falling price but not a rising one"""
+    alert_model.create_alert("AAPL", "below", 150)
+
+    alert_model.evaluate("AAPL", 160.0)
+    assert alert_model.evaluate("AAPL", 170.0) == []
+    fired = alert_model.evaluate("AAPL", 149.5)
+
+    assert [alert["threshold"] for alert in fired] == [150.0]
+
+def test_alert_fires_once(alert_model):
+    """Test a fired alert is removed from the in-memory index"""
+    alert_model.create_alert("AAPL", "above", 200)
+
+    alert_model.evaluate("AAPL", 199.0)
+    assert len(alert_model.evaluate("AAPL", 201.0)) == 1
+    alert_model.evaluate("AAPL", 199.0)
+    assert alert_model.evaluate("AAPL", 201.0) == []
+
+def test_deleted_alert_does_not_fire(alert_model):
+    """Test deleting an alert removes it from evaluation"""
+    alert = alert_model.create_alert("AAPL", "above", 200)
+    alert_model.delete_alert(alert["id"])
+
+    alert_model.evaluate("AAPL", 199.0)
+    assert alert_model.evaluate("AAPL", 201.0) == []
+
+    with pytest.raises(ValueError, match="not found"):
+        alert_model.delete_alert(alert["id"])
+
+def test_alerts_loaded_from_database(alert_model):
+    """Test a fresh model picks up alerts persisted by another"""
+    alert_model.create_alert("MSFT", "above", 400)
+
+    reloaded = AlertModel()
+    reloaded.evaluate("MSFT", 390.0)
+
+    assert len(reloaded.evaluate("MSFT", 401.0)) == 1
+
+def test_quote_refresh_triggers_evaluation(alert_model):
+    """Test new quotes from StockModel are fed to the alert engine"""
+    stock_model = StockModel()
+    stock_model.add_quote_listener(alert_model.on_quote)
+    alert_model.create_alert("AAPL", "above", 200)
+
+    with patch.object(stock_model, '_fetch_stock_info', side_effect=[{"price": 199.0}, {"price": 201.0}]):
+        stock_model.get_stock_info("AAPL")
+        stock_model.quote_cache.clear()
+        stock_model.get_stock_info("AAPL")
+
+    assert len(alert_model.get_alerts("AAPL", "triggered")) == 1
+
+def test_alerts_are_shared_across_processes(alert_model):
+    """Test alerts created, fired and deleted through one model (worker) are seen by another"""
+    other = AlertModel()
+    other.evaluate("AAPL", 195.0)
+    alert_model.evaluate("AAPL", 195.0)
+    created = alert_model.create_alert("AAPL", "above", 200)
+    doomed = other.create_alert("AAPL", "above", 205)
+    alert_model.delete_alert(doomed["id"])
+
+    fired = other.evaluate("AAPL", 210.0)
+    assert [alert["id"] for alert in fired] == [created["id"]]
+    triggered = alert_model.get_alerts("AAPL", "triggered")
+
+    assert alert_model.evaluate("AAPL", 212.0) == []
+    assert alert_model.get_alerts("AAPL", "triggered") == triggered
+    assert triggered[0]["triggered_price"] == 210.0
+
+def test_changes_from_other_processes_are_replayed(alert_model):
+    """Test another worker's changes are applied from the change log, not by reloading every alert"""
+    other = AlertModel(sync_interval=0)
+    other.evaluate("AAPL", 195.0)
+    kept = alert_model.create_alert("AAPL", "above", 200)
+    dropped = alert_model.create_alert("AAPL", "above", 201)
+    alert_model.delete_alert(dropped["id"])
+
+    with patch("music_collection.models.alert_model.logger") as logger:
+        fired = other.evaluate("AAPL", 210.0)
+
+    assert [alert["id"] for alert in fired] == [kept["id"]]
+    assert not any("Loaded" in str(call) for call in logger.info.call_args_list)
+
+def test_version_checks_are_throttled(alert_model, monkeypatch):
+    """Test a worker checks for other workers' changes at most once per sync interval"""
+    clock = [1000.0]
+    monkeypatch.setattr("music_collection.models.alert_model.time.monotonic", lambda: clock[0])
+    other = AlertModel(sync_interval=0.5)
+    other.evaluate("AAPL", 195.0)
+    created = alert_model.create_alert("AAPL", "above", 200)
+
+    assert other.evaluate("AAPL", 190.0) == []
+    assert other.evaluate("AAPL", 205.0) == []
+    clock[0] += 0.5
+    other.evaluate("AAPL", 190.0)
+    assert [alert["id"] for alert in other.evaluate("AAPL", 205.0)] == [created["id"]]
+
+def test_worker_behind_the_change_log_reloads(alert_model, monkeypatch):
+    """Test a worker whose version was pruned from the change log reloads every active alert"""
+    monkeypatch.setattr("music_collection.models.alert_model.ALERTS_CHANGES_KEPT", 2)
+    other = AlertModel(sync_interval=0)
+    other.evaluate("AAPL", 195.0)
+    created = [alert_model.create_alert("AAPL", "above", threshold) for threshold in (200, 201, 202)]
+
+    fired = other.evaluate("AAPL", 210.0)
+
+    assert sorted(alert["id"] for alert in fired) == [alert["id"] for alert in created]
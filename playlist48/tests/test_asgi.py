@@ -0,0 +1,157 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+from asgi import application
+from app import stock_model, user_model
+from benchmarks.fake_market_data import FakeMarketDataServer
+from music_collection.models.stock_model import StockModel
+from music_collection.utils.circuit_breaker import CircuitBreaker
+from music_collection.utils.wsgi_bridge import WsgiBridge
+
+@pytest.fixture
+def market():
+    """Fake Alpha Vantage endpoint answering after a short delay"""
+    with FakeMarketDataServer(latency=0.05) as server:
+        yield server
+
+@pytest.fixture
+def app_market(market):
+    """The ASGI app's stock model pointed at the fake endpoint, with empty caches"""
+    stock_model.quote_cache.clear()
+    stock_model.history_cache.clear()
+    with patch.object(stock_model, 'base_url', market.url):
+        yield market
+
+async def call(method, path, body=b"", query_string=b"", headers=()):
+    """Drive the ASGI app for one request and collect the response."""
+    scope = {"type": "http", "method": method, "path": path, "query_string": query_string,
+             "headers": [(b"content-type", b"application/json")] + list(headers), "http_version": "1.1"}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await application(scope, receive, send)
+    await stock_model.aclose()
+    start = sent[0]
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    return start["status"], headers, b"".join(m.get("body", b"") for m in sent[1:])
+
+def test_concurrent_requests_share_one_fetch(market):
+    """Test concurrent async lookups of one symbol make a single upstream call"""
+    model = StockModel()
+    model.base_url = market.url
+
+    async def scenario():
+        quotes = await asyncio.gather(*(model.get_stock_info_async("AAPL") for _ in range(20)))
+        many = await model.get_quotes_async(["msft", "IBM", "aapl"])
+        await model.aclose()
+        return quotes, many
+
+    quotes, many = asyncio.run(scenario())
+
+    assert len({quote["price"] for quote in quotes}) == 1
+    assert sorted(many) == ["AAPL", "IBM", "MSFT"]
+    assert market.calls == 3
+
+def test_quote_route_served_from_prefetch(app_market):
+    """Test the Flask handler finds the quote the event loop fetched"""
+    status, headers, body = asyncio.run(call("GET", "/api/stock/IBM"))
+
+    assert status == 200
+    assert json.loads(body)["symbol"] == "IBM"
+    assert headers["etag"]
+    assert app_market.calls == 1
+
+def test_other_routes_pass_through(app_market):
+    """Test routes without upstream work go straight to Flask"""
+    status, _, body = asyncio.run(call("GET", "/api/health"))
+
+    assert status == 200
+    assert app_market.calls == 0
+
+def test_failed_prefetch_answers_without_sync_retry(app_market):
+    """Test an unknown symbol is answered from the event loop without a second, blocking call"""
+    async def empty(params):
+        return {"Global Quote": {}}
+
+    with patch.object(stock_model, '_call_api_async', side_effect=empty), \
+            patch.object(stock_model, '_call_api') as sync_call:
+        status, _, body = asyncio.run(call("GET", "/api/stock/NOPE"))
+
+    assert status == 404
+    assert "NOPE" in json.loads(body)["error"]
+    sync_call.assert_not_called()
+
+def test_open_circuit_answers_503_with_retry_after(app_market):
+    """Test a prefetch refused by the open breaker gets the Flask routes' 503, not the route's failure status"""
+    breaker = CircuitBreaker("Alpha Vantage", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    order = json.dumps({"account_id": 1, "symbol": "IBM", "shares": 1}).encode()
+    token = [(b"authorization", f"Bearer {user_model.issue_token(1)}".encode())]
+
+    with patch.object(stock_model, 'breaker', breaker):
+        quote = asyncio.run(call("GET", "/api/stock/IBM"))
+        trade = asyncio.run(call("POST", "/api/portfolio/buy", order, headers=token))
+
+    for status, headers, body in (quote, trade):
+        assert status == 503
+        assert 0 < int(headers["retry-after"]) <= 61
+        assert "unavailable" in json.loads(body)["error"]
+    assert app_market.calls == 0
+
+def test_bridge_applies_backpressure_to_slow_clients():
+    """Test a streamed response is produced only as fast as the client reads, and stops when it leaves"""
+    produced = []
+    closed = []
+
+    def wsgi_app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+
+        def chunks():
+            try:
+                for i in range(1000):
+                    produced.append(i)
+                    yield b"x" * 1024
+            finally:
+                closed.append(True)
+        return chunks()
+
+    bridge = WsgiBridge(wsgi_app, max_threads=2, max_buffered=4)
+    scope = {"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": []}
+    lead = []
+
+    async def scenario():
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+        received = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.Event().wait()
+
+        async def send(message):
+            received.append(message)
+            await asyncio.sleep(0.002)
+            lead.append(len(produced) - len(received))
+            if len(received) > 50:
+                raise OSError("client went away")
+
+        with pytest.raises(OSError):
+            await bridge(scope, receive, send)
+        await asyncio.sleep(1)
+
+    asyncio.run(scenario())
+    bridge.executor.shutdown(wait=True)
+
+    assert max(lead) <= 4 + 2
+    assert len(produced) < 100
+    assert closed == [True]
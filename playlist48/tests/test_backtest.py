@@ -0,0 +1,120 @@
+import pytest
+import sqlite3
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+from app import app
+from music_collection.models.backtest_model import BacktestModel
+from music_collection.models.history_model import HistoryModel
+from music_collection.models.stock_model import StockModel
+from music_collection.utils.backtest_utils import backtest
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Temporary database with 300 days of synthetic closes for three symbols"""
+    path = tmp_path / "backtest.db"
+    conn = sqlite3.connect(path)
+    with open("sql/create_portfolio_table.sql") as schema:
+        conn.executescript(schema.read())
+    dates = pd.bdate_range("2023-01-02", periods=300)
+    rng = np.random.default_rng(11)
+    conn.executemany(
+        "INSERT INTO price_history (symbol, date, close) VALUES (?, ?, ?)",
+        [(symbol, date.date().isoformat(), float(price))
+         for symbol in ("AAPL", "MSFT", "IBM")
+         for date, price in zip(dates, np.cumprod(1 + rng.normal(0.0005, 0.02, len(dates))) * 100)]
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr("music_collection.utils.sql_utils.DB_PATH", str(path))
+    return path
+
+def reference_backtest(prices, fast, slow, amount, commission, slippage_bps):
+    """Bar-by-bar loop over the same rules, trading one close after the signal"""
+    cash, shares, equity = 0.0, 0, []
+    for i, price in enumerate(prices):
+        if i >= slow:
+            window = prices[:i]
+            want = window[-fast:].mean() > window[-slow:].mean()
+            if want and not shares:
+                shares = int(amount // price)
+                cash -= shares * price * (1 + slippage_bps / 10000) + commission
+            elif not want and shares:
+                cash += shares * price * (1 - slippage_bps / 10000) - commission
+                shares = 0
+        equity.append(cash + shares * price)
+    return np.array(equity)
+
+def test_vectorized_backtest_matches_loop():
+    """Test the vectorized equity curve agrees with a bar-by-bar simulation of the same rules"""
+    prices = np.cumprod(1 + np.random.default_rng(3).normal(0, 0.02, 400)) * 50
+    dates = [str(i) for i in range(len(prices))]
+    result = backtest(dates, prices, {"type": "sma_cross", "fast": 5, "slow": 20},
+                      {"type": "notional", "amount": 1000}, {"commission": 1.0, "slippage_bps": 10}, 10000.0)
+
+    expected = reference_backtest(prices, 5, 20, 1000, 1.0, 10) + 10000.0
+    assert np.allclose([point["equity"] for point in result["equity_curve"]], expected)
+    assert result["trades"] > 4
+    gain = result["realized_gain_loss"] + result["unrealized_gain_loss"]
+    commissions = result["trades"] * 1.0
+    assert gain - commissions == pytest.approx(result["final_equity"] - 10000.0)
+
+def test_buy_and_hold_with_fixed_shares():
+    """Test buy and hold enters at the second close and holds to the end with no realized gain"""
+    prices = np.array([10.0, 11.0, 12.0, 9.0, 15.0])
+    result = backtest(list("abcde"), prices, {"type": "buy_and_hold"}, {"type": "shares", "shares": 10},
+                      {"commission": 0.0, "slippage_bps": 0.0}, 1000.0, include_curve=False)
+
+    assert result["final_equity"] == pytest.approx(1000.0 + 10 * (15.0 - 11.0))
+    assert result["trades"] == 1
+    assert result["realized_gain_loss"] == 0.0
+    assert result["max_drawdown"] == pytest.approx(980.0 / 1010.0 - 1)
+    assert "equity_curve" not in result
+
+def test_parameter_grid_runs_in_worker_processes(db_path):
+    """Test a grid fanned out to a process pool gives the same results as an in-process run"""
+    spec = {
+        "symbols": ["aapl", "MSFT", "IBM", "NONE"],
+        "strategy": {"type": "sma_cross", "fast": [5, 10, 20], "slow": [30, 50]},
+        "costs": {"commission": 1.0, "slippage_bps": 5},
+        "include_curves": False
+    }
+    stock_model = StockModel()
+    serial = BacktestModel(HistoryModel(stock_model), workers=1).run(spec)
+    parallel_model = BacktestModel(HistoryModel(stock_model), workers=2, parallel_min_runs=1)
+    try:
+        parallel = parallel_model.run(spec)
+    finally:
+        parallel_model.shutdown()
+
+    assert len(serial["runs"]) == 3 * 6
+    assert serial["missing_symbols"] == ["NONE"]
+    assert parallel == serial
+
+def test_backtest_route(db_path):
+    """Test the endpoint returns runs with equity curves and rejects an invalid spec"""
+    app.config["TESTING"] = True
+    with patch("app.backtest_model", BacktestModel(HistoryModel(StockModel()), workers=1)), \
+            app.test_client() as client:
+        response = client.post("/api/backtest", json={
+            "symbols": ["AAPL"], "strategy": {"type": "momentum", "lookback": 20}, "start": "2023-03-01"
+        })
+        invalid = client.post("/api/backtest", json={"symbols": ["AAPL"], "strategy": {"type": "sma_cross", "fast": 5}})
+
+    assert response.status_code == 200
+    run = response.json["runs"][0]
+    assert run["symbol"] == "AAPL" and run["start"] == "2023-03-01"
+    assert len(run["equity_curve"]) > 200
+    assert invalid.status_code == 400
+
+def test_oversized_grid_rejected_before_expansion():
+    """Test a huge parameter grid is refused from its list lengths, without building the combinations"""
+    model = BacktestModel(HistoryModel(StockModel()), workers=1)
+    spec = {"symbols": ["AAPL", "MSFT"],
+            "strategy": {"type": "sma_cross", "fast": list(range(1, 3001)), "slow": list(range(2, 3002))}}
+    with patch("music_collection.models.backtest_model.itertools.product") as product, \
+            patch.object(model.history_model, 'load_closes') as load:
+        with pytest.raises(ValueError, match="combinations"):
+            model.run(spec)
+    product.assert_not_called()
+    load.assert_not_called()
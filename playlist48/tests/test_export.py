@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+import pytest
+import sqlite3
+from app import app, storage, user_model
+
+LOTS = 5000
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client on a temporary database with an account holding many lots and some history"""
+    path = tmp_path / "export.db"
+    conn = sqlite3.connect(path)
+    with open("sql/create_portfolio_table.sql") as schema:
+        conn.executescript(schema.read())
+    conn.close()
+    monkeypatch.setattr("music_collection.utils.sql_utils.DB_PATH", str(path))
+    monkeypatch.setattr("music_collection.utils.export_utils.EXPORT_BATCH_ROWS", 500)
+
+    account_id = user_model.create_account("exporter", "password123")["id"]
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO portfolio (account_id, symbol, shares, purchase_price, purchase_date) VALUES (?, ?, ?, ?, ?)",
+        [(account_id, f"SYM{i % 100:03d}", i % 50 + 1, 10.0 + i % 7, "2024-01-02") for i in range(LOTS)]
+    )
+    conn.executemany(
+        "INSERT INTO price_history (symbol, date, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(symbol, f"2024-01-{day:02d}", 1.0, 2.0, 0.5, 1.5, 100) for symbol in ("AAPL", "MSFT", "IBM")
+         for day in range(1, 11)]
+    )
+    conn.commit()
+    conn.close()
+
+    app.config["TESTING"] = True
+    with app.test_client() as test_client:
+        test_client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {user_model.issue_token(account_id)}"
+        yield test_client, account_id
+
+def test_lots_export_streams_in_batches(client):
+    """Test a large lot export is streamed chunk by chunk and contains every lot"""
+    test_client, account_id = client
+    response = test_client.get(f"/api/export/portfolio?account_id={account_id}")
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "text/csv"
+    assert "attachment" in response.headers["Content-Disposition"]
+    chunks = list(response.response)
+    assert len(chunks) == 1 + LOTS // 500
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == ["id", "symbol", "shares", "purchase_price", "purchase_date"]
+    assert len(rows) == LOTS + 1
+
+def test_history_export_as_ndjson(client):
+    """Test a multi-symbol history export is ordered by symbol then date and filtered by range"""
+    test_client, _ = client
+    response = test_client.get("/api/export/history?symbols=msft,aapl&start=2024-01-05&format=ndjson")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(records) == 12
+    assert (records[0]["symbol"], records[0]["date"]) == ("AAPL", "2024-01-05")
+    assert records[-1]["symbol"] == "MSFT"
+
+def test_paused_export_does_not_block_trades(client):
+    """Test a write to the account's shard succeeds while an export is paused mid-stream"""
+    test_client, account_id = client
+    response = test_client.get(f"/api/export/portfolio?account_id={account_id}")
+    chunks = iter(response.response)
+    next(chunks), next(chunks)
+
+    with storage.account_connection(account_id, write=True) as conn:
+        conn.execute("PRAGMA busy_timeout = 100")
+        conn.execute(
+            "INSERT INTO portfolio (account_id, symbol, shares, purchase_price, purchase_date) "
+            "VALUES (?, 'NEW', 1, 1.0, '2024-01-03')", (account_id,)
+        )
+        conn.commit()
+
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[-1][1] == "NEW"
+    assert len(rows) == LOTS + 1 - 500
+
+def test_export_rejects_bad_requests(client):
+    """Test unsupported formats and datasets, and a missing symbol list, return 400 before streaming"""
+    test_client, account_id = client
+    assert test_client.get(f"/api/export/portfolio?account_id={account_id}&format=xml").status_code == 400
+    assert test_client.get(f"/api/export/portfolio?account_id={account_id}&dataset=alerts").status_code == 400
+    assert test_client.get("/api/export/history").status_code == 400
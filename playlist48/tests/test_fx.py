@@ -0,0 +1,79 @@
+import pytest
+import numpy as np
+from unittest.mock import patch
+from app import app, user_model
+from music_collection.models.ledger_model import LedgerModel
+from music_collection.models.portfolio_model import PortfolioModel
+from music_collection.models.stock_model import StockModel
+from music_collection.utils.fx_utils import convert, listing_currency, load_stub_rates
+from music_collection.utils.sql_utils import MemoryStorage
+
+ACCOUNT = 1
+RATES = load_stub_rates()
+
+@pytest.fixture
+def model():
+    """Portfolio with US, Frankfurt and London (pence) holdings on stub FX rates"""
+    storage = MemoryStorage()
+    stock_model = StockModel()
+    stock_model.fx_provider = "stub"
+    for symbol, price in (("AAPL", 100.0), ("SAP.DEX", 50.0), ("TSCO.LON", 300.0)):
+        stock_model.quote_cache.set(symbol, {"symbol": symbol, "price": price}, 60)
+    model = PortfolioModel(stock_model, LedgerModel(snapshot_every=10 ** 9, snapshot_interval=3600,
+                                                    storage=storage), storage)
+    model.buy_stock("AAPL", 2, ACCOUNT)
+    model.buy_stock("SAP.DEX", 4, ACCOUNT)
+    model.buy_stock("TSCO.LON", 100, ACCOUNT)
+    yield model
+    storage.close()
+
+def test_listing_currency_from_exchange_suffix():
+    """Test symbols map to the currency their exchange quotes in"""
+    assert [listing_currency(s) for s in ("AAPL", "BRK.B", "SAP.DEX", "TSCO.LON", "SHOP.TRT")] == \
+        ["USD", "USD", "EUR", "GBX", "CAD"]
+
+def test_convert_gathers_one_rate_per_currency():
+    """Test vectorized conversion applies each currency's rate to every row in it"""
+    amounts = np.array([[10.0, 1.0], [20.0, 2.0], [30.0, 3.0]])
+    converted = convert(amounts, ["EUR", "USD", "EUR"], {"EUR": 2.0, "USD": 1.0})
+    assert converted.tolist() == [[20.0, 2.0], [20.0, 2.0], [60.0, 6.0]]
+
+def test_mixed_currency_portfolio_in_base_currencies(model):
+    """Test holdings are converted into the requested base, pence through pounds"""
+    usd = model.get_portfolio_value(ACCOUNT)
+    eur_per_usd = RATES["EUR"]
+    expected_usd = 200.0 + 200.0 / eur_per_usd + 300.0 / RATES["GBP"]
+    assert usd["base_currency"] == "USD"
+    assert usd["total_value"] == pytest.approx(expected_usd)
+    assert usd["fx_rates"]["GBX"] == pytest.approx(0.01 / RATES["GBP"])
+
+    eur = model.get_portfolio_value(ACCOUNT, "eur")
+    assert eur["total_value"] == pytest.approx(expected_usd * eur_per_usd)
+    assert "EUR" not in eur["fx_rates"]
+    assert [h["currency"] for h in model.get_portfolio(ACCOUNT)] == ["USD", "EUR", "GBX"]
+
+def test_each_pair_fetched_once_per_ttl(model):
+    """Test repeated valuations reuse cached rates and totals until a rate changes"""
+    stock_model = model.stock_model
+    with patch.object(stock_model, '_fetch_exchange_rate', wraps=stock_model._fetch_exchange_rate) as fetch:
+        first = model.get_portfolio_value(ACCOUNT, "EUR")
+        for _ in range(5):
+            assert model.get_portfolio_value(ACCOUNT, "EUR") == first
+    assert sorted(call.args for call in fetch.call_args_list) == [("GBP", "EUR"), ("USD", "EUR")]
+
+    stock_model.fx_cache.set("USD/EUR", {"pair": "USD/EUR", "rate": 1.0, "source": "stub"}, 60)
+    assert model.get_portfolio_value(ACCOUNT, "EUR")["total_value"] == pytest.approx(
+        first["total_value"] - 200.0 * RATES["EUR"] + 200.0)
+
+def test_invalid_base_currency_is_rejected(model):
+    """Test the endpoint returns 400 for a malformed or unknown base currency"""
+    app.config["TESTING"] = True
+    with patch("app.portfolio_model", model), app.test_client() as client:
+        client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {user_model.issue_token(ACCOUNT)}"
+        ok = client.get("/api/portfolio/value?account_id=1&base_currency=gbp")
+        malformed = client.get("/api/portfolio/value?account_id=1&base_currency=POUNDS")
+        unknown = client.get("/api/portfolio/value?account_id=1&base_currency=XYZ")
+
+    assert ok.status_code == 200 and ok.json["base_currency"] == "GBP"
+    assert malformed.status_code == 400
+    assert unknown.status_code == 400
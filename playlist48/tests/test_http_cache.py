@@ -0,0 +1,67 @@
+import gzip
+import pytest
+from unittest.mock import patch
+from app import app, stock_model
+
+@pytest.fixture
+def client():
+    """Flask test client with empty market-data caches"""
+    stock_model.quote_cache.clear()
+    stock_model.history_cache.clear()
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        yield client
+
+@pytest.fixture
+def mock_stock_info():
+    """Mock stock information response"""
+    return {
+        "symbol": "AAPL",
+        "price": 150.00,
+        "volume": 1000000,
+        "change": 2.50,
+        "change_percent": "1.5%"
+    }
+
+def test_quote_has_etag_and_max_age(client, mock_stock_info):
+    """Test quotes carry a strong ETag and a short max-age"""
+    with patch.object(stock_model, '_fetch_stock_info', return_value=mock_stock_info):
+        response = client.get("/api/stock/AAPL")
+
+    assert response.status_code == 200
+    etag, weak = response.get_etag()
+    assert etag and not weak
+    assert 0 < response.cache_control.max_age <= 15
+
+def test_if_none_match_returns_304(client, mock_stock_info):
+    """Test a matching If-None-Match gets a 304 without a refetch"""
+    with patch.object(stock_model, '_fetch_stock_info', return_value=mock_stock_info) as fetch:
+        first = client.get("/api/stock/AAPL")
+        second = client.get("/api/stock/AAPL", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.status_code == 304
+    assert second.data == b""
+    assert fetch.call_count == 1
+
+def test_large_history_is_gzipped(client):
+    """Test large responses are compressed when the client accepts gzip"""
+    history = {f"2024-01-{day:02d}": {"open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 100}
+               for day in range(1, 29)}
+    with patch.object(stock_model, '_fetch_historical_data', return_value=history):
+        response = client.get("/api/stock/AAPL/history", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"].endswith('-gzip"')
+    assert b'"2024-01-01"' in gzip.decompress(response.data)
+
+def test_304_echoes_the_compressed_etag(client):
+    """Test revalidating a gzipped response returns the gzip variant's ETag"""
+    history = {f"2024-01-{day:02d}": {"open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5, "volume": 100}
+               for day in range(1, 29)}
+    with patch.object(stock_model, '_fetch_historical_data', return_value=history):
+        first = client.get("/api/stock/AAPL/history", headers={"Accept-Encoding": "gzip"})
+        second = client.get("/api/stock/AAPL/history",
+                            headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]})
+
+    assert second.status_code == 304
+    assert second.headers["ETag"] == first.headers["ETag"]
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+from app import app, stock_model
+from benchmarks.fake_market_data import FakeMarketDataServer
+from music_collection.models.intraday_model import IntradayModel, from_epoch
+from music_collection.models.stock_model import StockModel
+from music_collection.utils.bar_utils import BarRingBuffer, resample_bars
+from music_collection.utils.cache import CacheEntry, TTLCache
+
+START = 1704465000  # 2024-01-05 09:30 US/Eastern
+
+def minute_bars(count, start=START):
+    """`count` consecutive 1-minute bars, as parsed from TIME_SERIES_INTRADAY"""
+    return {from_epoch(start + 60 * i): {"open": 100.0 + i, "high": 101.0 + i, "low": 99.0 + i,
+                                         "close": 100.5 + i, "volume": 10}
+            for i in range(count)}
+
+def arrays(count, start=0):
+    timestamps = np.arange(start, start + count, dtype=np.int64) * 60
+    prices = np.repeat(np.arange(start, start + count, dtype=np.float64)[:, None], 4, axis=1)
+    return timestamps, prices, np.ones(count, dtype=np.int64)
+
+def test_bounded_cache_drops_least_recently_stored():
+    """Test a bounded cache keeps max_entries keys, dropping the one stored longest ago"""
+    cache = TTLCache("intraday", max_entries=2)
+    cache.set("AAPL", {}, 60)
+    cache.set("MSFT", {}, 60)
+    cache.set("AAPL", {"refreshed": True}, 60)
+    cache.set("IBM", {}, 60)
+
+    assert len(cache) == 2
+    assert cache.peek("MSFT") is None
+    assert cache.get("AAPL").value == {"refreshed": True}
+    assert StockModel().intraday_cache.max_entries > 0
+
+def test_ring_buffer_evicts_oldest_and_revises_last():
+    """Test a full buffer returns overwritten bars and replaces a bar with the same timestamp"""
+    buffer = BarRingBuffer(4)
+    assert len(buffer.extend(*arrays(3))[0]) == 0
+
+    evicted = buffer.extend(*arrays(3, start=2))
+
+    assert list(evicted[0]) == [0]
+    timestamps, prices, _ = buffer.snapshot()
+    assert list(timestamps) == [60, 120, 180, 240]
+    assert buffer.extend(*arrays(5))[0].size == 0
+    assert list(buffer.extend(*arrays(6, start=3))[0]) == [60, 120, 180, 240]
+    assert list(buffer.snapshot()[0]) == [300, 360, 420, 480]
+
+def test_resample_aggregates_ohlcv():
+    """Test 1-minute bars roll up into first open, max high, min low, last close and summed volume"""
+    timestamps, prices, volumes = resample_bars(arrays(7), 300)
+
+    assert list(timestamps) == [0, 300]
+    assert prices[0].tolist() == [0.0, 4.0, 0.0, 4.0]
+    assert prices[1].tolist() == [5.0, 6.0, 5.0, 6.0]
+    assert list(volumes) == [5, 2]
+
+def test_bars_spill_to_sqlite_and_read_back(storage):
+    """Test bars pushed out of the buffer are stored and still served"""
+    model = IntradayModel(StockModel(), buffer_bars=30, storage=storage)
+    entry = CacheEntry(minute_bars(100), 60)
+
+    with patch.object(model.stock_model, 'get_intraday_entry', return_value=entry):
+        one_minute = model.get_bars("IBM", "1min", limit=50)
+        five_minute = model.get_bars("IBM", "5min", limit=20)
+
+    with storage.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM intraday_bars").fetchone()[0] == 70
+    assert [bar["open"] for bar in one_minute["bars"]] == [150.0 + i for i in range(50)]
+    assert len(five_minute["bars"]) == 20
+    assert five_minute["bars"][0] == {"timestamp": "2024-01-05 09:30:00", "open": 100.0, "high": 105.0,
+                                      "low": 99.0, "close": 104.5, "volume": 50}
+
+def test_least_recently_used_symbol_is_spilled(storage):
+    """Test the number of in-memory buffers is capped"""
+    model = IntradayModel(StockModel(), buffer_bars=30, max_symbols=1, storage=storage)
+    model.ingest("IBM", minute_bars(10), "v1")
+    model.ingest("MSFT", minute_bars(10), "v1")
+
+    with storage.connection() as conn:
+        assert conn.execute("SELECT DISTINCT symbol FROM intraday_bars").fetchall() == [("IBM",)]
+    assert list(model._buffers) == ["MSFT"]
+
+def test_intraday_route():
+    """Test the route resamples fetched bars and validates the interval"""
+    stock_model.intraday_cache.clear()
+    app.config["TESTING"] = True
+    with FakeMarketDataServer() as market, patch.object(stock_model, 'base_url', market.url), \
+            app.test_client() as client:
+        response = client.get("/api/stock/IBM/intraday?interval=15min&limit=3")
+        invalid = client.get("/api/stock/IBM/intraday?interval=2min")
+        calls = market.calls
+
+    assert response.status_code == 200
+    assert len(response.json["bars"]) == 3
+    assert response.json["stale"] is False
+    assert invalid.status_code == 400
+    assert calls == 1
@@ -0,0 +1,125 @@
+import pytest
+from unittest.mock import patch
+from music_collection.models.ledger_model import LedgerModel
+from music_collection.models.portfolio_model import PortfolioModel
+from music_collection.models.stock_model import StockModel
+from music_collection.utils.fifo_utils import consume_fifo, realized_gain
+
+@pytest.fixture
+def ledger_model(storage):
+    """Ledger whose background worker never fires during a test"""
+    return LedgerModel(snapshot_every=10 ** 9, snapshot_interval=3600, storage=storage)
+
+@pytest.fixture
+def portfolio_model(ledger_model, storage):
+    """Portfolio model with a stubbed quote price"""
+    return PortfolioModel(StockModel(), ledger_model, storage)
+
+def trade(portfolio_model, side, symbol, shares, price, account_id=1):
+    with patch.object(portfolio_model.stock_model, 'get_stock_info', return_value={"price": price}):
+        if side == "buy":
+            return portfolio_model.buy_stock(symbol, shares, account_id)
+        return portfolio_model.sell_stock(symbol, shares, account_id)
+
+def test_consume_fifo_takes_oldest_first():
+    """Test lots are consumed in order and partially consumed lots keep the remainder"""
+    consumed = consume_fifo([(1, 5, 10.0), (2, 5, 20.0)], 7)
+    assert consumed == [(1, 5, 0, 10.0), (2, 2, 3, 20.0)]
+    assert realized_gain(consumed, 30.0) == 5 * 20.0 + 2 * 10.0
+
+def test_consume_fifo_not_enough_shares():
+    """Test selling more than the lots hold"""
+    with pytest.raises(ValueError, match="Not enough shares to sell"):
+        consume_fifo([(1, 3, 10.0)], 4)
+
+def test_trades_are_recorded(portfolio_model, ledger_model):
+    """Test every buy and sell is appended to the ledger"""
+    trade(portfolio_model, "buy", "AAPL", 10, 100.0)
+    trade(portfolio_model, "sell", "AAPL", 4, 120.0)
+
+    transactions = ledger_model.get_transactions(1)
+    assert [(t["side"], t["shares"], t["price"]) for t in transactions] == [("sell", 4, 120.0), ("buy", 10, 100.0)]
+    assert ledger_model.get_transactions(1, before_id=transactions[0]["id"])[0]["side"] == "buy"
+    assert ledger_model.get_transactions(2) == []
+
+def test_sell_reports_realized_gain(portfolio_model):
+    """Test a sale matches lots FIFO and reports the realized gain"""
+    trade(portfolio_model, "buy", "AAPL", 5, 100.0)
+    trade(portfolio_model, "buy", "AAPL", 5, 200.0)
+
+    result = trade(portfolio_model, "sell", "AAPL", 7, 150.0)
+
+    assert result["shares_sold"] == 7
+    assert result["realized_gain_loss"] == 5 * 50.0 + 2 * -50.0
+    assert portfolio_model.get_lots(1)[0]["shares"] == 3
+
+def test_pnl_from_snapshot_and_tail(portfolio_model, ledger_model):
+    """Test positions rebuilt from a snapshot plus later transactions match a full replay"""
+    trade(portfolio_model, "buy", "AAPL", 10, 100.0)
+    trade(portfolio_model, "sell", "AAPL", 4, 110.0)
+    full_replay, _ = ledger_model.get_positions(1)
+
+    assert len(ledger_model.take_snapshot()) == 1
+    assert ledger_model.take_snapshot() == []
+    from_snapshot, _ = ledger_model.get_positions(1)
+    assert from_snapshot["AAPL"].shares == full_replay["AAPL"].shares == 6
+    assert from_snapshot["AAPL"].realized_pnl == full_replay["AAPL"].realized_pnl == 40.0
+
+    trade(portfolio_model, "sell", "AAPL", 6, 90.0)
+    with patch.object(portfolio_model.stock_model, 'get_stock_info', return_value={"price": 95.0}):
+        pnl = ledger_model.get_pnl(portfolio_model.stock_model, 1)
+
+    assert pnl["positions"][0]["shares"] == 0
+    assert pnl["total_realized_pnl"] == 40.0 - 60.0
+    assert pnl["total_unrealized_pnl"] == 0.0
+
+def test_compaction_keeps_recent_snapshots(portfolio_model, ledger_model, storage):
+    """Test old snapshots are pruned"""
+    ledger_model.snapshots_kept = 2
+    for _ in range(4):
+        trade(portfolio_model, "buy", "MSFT", 1, 50.0)
+        ledger_model.take_snapshot()
+
+    with storage.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM position_snapshots").fetchone()[0] == 2
+    positions, _ = ledger_model.get_positions(1)
+    assert positions["MSFT"].shares == 4
+
+def add_legacy_lot(storage, account_id, symbol, shares, price, date):
+    """A lot written straight into the portfolio table, with no ledger entry"""
+    with storage.account_connection(account_id, write=True) as conn:
+        conn.execute(
+            "INSERT INTO portfolio (account_id, symbol, shares, purchase_price, purchase_date) VALUES (?, ?, ?, ?, ?)",
+            (account_id, symbol, shares, price, date)
+        )
+        conn.commit()
+
+def test_legacy_lots_get_opening_buys(portfolio_model, ledger_model, storage):
+    """Test lots from before the ledger are backfilled once, so selling them replays cleanly"""
+    add_legacy_lot(storage, 0, "AAPL", 10, 100.0, "2024-01-02 10:00:00")
+    add_legacy_lot(storage, 0, "MSFT", 4, 50.0, "2024-01-03 10:00:00")
+
+    assert ledger_model.backfill_opening_buys() == 2
+    assert ledger_model.backfill_opening_buys() == 0
+    trade(portfolio_model, "sell", "AAPL", 6, 120.0, account_id=0)
+
+    positions, _ = ledger_model.get_positions(0)
+    assert (positions["AAPL"].shares, positions["AAPL"].realized_pnl) == (4, 120.0)
+    assert positions["MSFT"].shares == 4
+
+def test_unreplayable_account_does_not_stop_snapshots(portfolio_model, ledger_model, storage):
+    """Test a snapshot skips an account whose sells its ledger can't cover and keeps the others"""
+    add_legacy_lot(storage, 2, "AAPL", 10, 100.0, "2024-01-02 10:00:00")
+    trade(portfolio_model, "sell", "AAPL", 5, 120.0, account_id=2)
+    trade(portfolio_model, "buy", "MSFT", 3, 50.0)
+
+    assert len(ledger_model.take_snapshot()) == 1
+    with pytest.raises(ValueError, match="account 2 cannot be replayed"):
+        ledger_model.get_positions(2)
+
+    trade(portfolio_model, "buy", "MSFT", 2, 60.0)
+    assert len(ledger_model.take_snapshot()) == 1
+    positions, _ = ledger_model.get_positions(1)
+    assert (positions["MSFT"].shares, positions["MSFT"].cost_basis) == (5, 270.0)
+    with pytest.raises(ValueError, match="account 2 cannot be replayed"):
+        ledger_model.get_positions(2)
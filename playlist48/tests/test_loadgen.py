@@ -0,0 +1,33 @@
+import random
+import pytest
+from benchmarks.loadgen import RouteStats, arrival_offsets, percentile
+
+def test_arrivals_are_poisson_at_the_target_rate():
+    """Test the schedule starts at zero, stays inside the step and averages `rate` arrivals per second"""
+    offsets = list(arrival_offsets(50.0, 200.0, random.Random(7)))
+    gaps = [later - earlier for earlier, later in zip(offsets, offsets[1:])]
+
+    assert offsets[0] == 0.0
+    assert all(gap > 0 for gap in gaps)
+    assert offsets[-1] < 200.0
+    assert len(offsets) / 200.0 == pytest.approx(50.0, rel=0.05)
+    # Exponential gaps: the standard deviation is about the mean, unlike a fixed interval
+    mean = sum(gaps) / len(gaps)
+    std = (sum((gap - mean) ** 2 for gap in gaps) / len(gaps)) ** 0.5
+    assert std == pytest.approx(mean, rel=0.1)
+
+def test_percentiles_use_nearest_rank():
+    """Test percentiles pick the nearest-ranked sample and route summaries report them in ms"""
+    values = [i / 1000 for i in range(1, 101)]
+
+    assert percentile([], 99) == 0.0
+    assert percentile(values, 50) == 0.051
+    assert percentile(values, 99) == 0.099
+    assert percentile(values, 100) == 0.1
+
+    stats = RouteStats()
+    stats.latencies = list(reversed(values))
+    stats.errors = 5
+    summary = stats.summary()
+    assert (summary["p50_ms"], summary["p99_ms"], summary["max_ms"]) == (51.0, 99.0, 100.0)
+    assert summary["error_rate"] == 0.05
@@ -0,0 +1,55 @@
+import pytest
+import threading
+from music_collection.utils.metrics import Counter, Gauge, Histogram, Registry
+
+@pytest.fixture
+def registry():
+    """Isolated registry so tests don't see application metrics"""
+    return Registry()
+
+def test_histogram_buckets_are_cumulative(registry):
+    """Test histogram samples land in cumulative le buckets"""
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.5, 5.0):
+        histogram.labels("/a").observe(value)
+
+    output = registry.render()
+
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in output
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in output
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in output
+    assert 'latency_seconds_count{route="/a"} 3' in output
+
+def test_counter_sums_across_threads(registry):
+    """Test per-thread shards add up to the total"""
+    counter = Counter("events_total", "Events.", registry=registry)
+
+    def work():
+        for _ in range(1000):
+            counter.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.labels().get() == 8000
+
+def test_gauge_function(registry):
+    """Test function-backed gauges are evaluated at render time"""
+    gauge = Gauge("ratio", "Ratio.", ("cache",), registry=registry)
+    gauge.labels("quote").set_function(lambda: 0.25)
+
+    assert 'ratio{cache="quote"} 0.25' in registry.render()
+
+def test_label_values_are_matched_as_strings(registry):
+    """Test values that render alike share one child, and a wrong label count is rejected"""
+    histogram = Histogram("status_seconds", "Latency.", ("status",), buckets=(1.0,), registry=registry)
+    histogram.labels(200).observe(0.5)
+    histogram.labels("200").observe(0.5)
+
+    assert histogram.labels(200) is histogram.labels("200")
+    assert 'status_seconds_count{status="200"} 2' in registry.render()
+    with pytest.raises(ValueError, match="expects labels"):
+        histogram.labels()
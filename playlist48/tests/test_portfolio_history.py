@@ -0,0 +1,154 @@
+import pytest
+import sqlite3
+from unittest.mock import patch
+from music_collection.models.history_model import HistoryModel
+from music_collection.models.portfolio_history_model import PortfolioHistoryModel
+from music_collection.models.portfolio_model import PortfolioModel
+from music_collection.models.stock_model import StockModel
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Temporary database with the application schema and a week of closes"""
+    path = tmp_path / "history.db"
+    conn = sqlite3.connect(path)
+    with open("sql/create_portfolio_table.sql") as schema:
+        conn.executescript(schema.read())
+    conn.executemany(
+        "INSERT INTO price_history (symbol, date, close) VALUES (?, ?, ?)",
+        [("AAPL", "2024-01-0%d" % day, 100.0 + day) for day in range(1, 6)]
+        + [("MSFT", "2024-01-0%d" % day, 50.0) for day in range(1, 6)]
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr("music_collection.utils.sql_utils.DB_PATH", str(path))
+    return path
+
+@pytest.fixture
+def history_model(db_path):
+    """Portfolio history model that never calls upstream"""
+    stock_model = StockModel()
+    model = PortfolioHistoryModel(PortfolioModel(stock_model), HistoryModel(stock_model))
+    with patch.object(model.history_model, 'ensure_history', return_value={}):
+        yield model
+
+def add_lot(db_path, symbol, shares, price, date):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO portfolio (symbol, shares, purchase_price, purchase_date) VALUES (?, ?, ?, ?)",
+        (symbol, shares, price, date)
+    )
+    conn.commit()
+    conn.close()
+
+def add_transaction(db_path, symbol, side, shares, price, executed_at):
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO transactions (account_id, symbol, side, shares, price, executed_at) VALUES (0, ?, ?, ?, ?, ?)",
+        (symbol, side, shares, price, executed_at)
+    )
+    conn.commit()
+    conn.close()
+
+def backfill(history_model):
+    history_model.portfolio_model.ledger_model.backfill_opening_buys()
+
+def test_value_follows_lot_dates(history_model, db_path):
+    """Test lots recorded before the ledger only count from their purchase date"""
+    add_lot(db_path, "AAPL", 10, 100.0, "2024-01-02 10:30:00")
+    add_lot(db_path, "MSFT", 4, 50.0, "2024-01-04 09:45:00")
+    backfill(history_model)
+
+    points = {p["date"]: p for p in history_model.get_value_history()["points"]}
+
+    assert points["2024-01-01"]["value"] == 0.0
+    assert points["2024-01-02"]["value"] == 10 * 102.0
+    assert points["2024-01-04"]["value"] == 10 * 104.0 + 4 * 50.0
+    assert points["2024-01-05"]["cost_basis"] == 1000.0 + 200.0
+
+def test_range_filter(history_model, db_path):
+    """Test start and end bound the returned points"""
+    add_lot(db_path, "AAPL", 1, 100.0, "2024-01-01 10:00:00")
+    backfill(history_model)
+
+    points = history_model.get_value_history("2024-01-02", "2024-01-03")["points"]
+
+    assert [p["date"] for p in points] == ["2024-01-02", "2024-01-03"]
+
+def test_incremental_refresh_keeps_snapshots(history_model, db_path):
+    """Test only days from the last snapshot on are recomputed, replaying only new transactions"""
+    add_transaction(db_path, "AAPL", "buy", 10, 100.0, "2024-01-02 10:30:00")
+    history_model.get_value_history()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE portfolio_value_history SET value = -1 WHERE date = '2024-01-03'")
+    conn.executemany("INSERT INTO price_history (symbol, date, close) VALUES (?, '2024-01-08', ?)",
+                     [("AAPL", 110.0), ("MSFT", 50.0)])
+    conn.commit()
+    conn.close()
+    add_transaction(db_path, "MSFT", "buy", 2, 50.0, "2024-01-08 09:45:00")
+    add_transaction(db_path, "AAPL", "sell", 4, 110.0, "2024-01-08 15:00:00")
+
+    ledger_model = history_model.portfolio_model.ledger_model
+    with patch.object(ledger_model, "get_ledger_tail", wraps=ledger_model.get_ledger_tail) as tail:
+        points = {p["date"]: p for p in history_model.get_value_history()["points"]}
+
+    assert tail.call_args.args == (0, 1)
+    assert points["2024-01-03"]["value"] == -1
+    assert points["2024-01-05"]["value"] == 10 * 105.0
+    assert points["2024-01-08"]["value"] == 6 * 110.0 + 2 * 50.0
+    assert points["2024-01-08"]["cost_basis"] == 600.0 + 100.0
+
+def test_transactions_after_the_last_close_wait_for_it(history_model, db_path):
+    """Test a trade dated after the last stored close is not counted on earlier days"""
+    add_transaction(db_path, "AAPL", "buy", 10, 100.0, "2024-01-02 10:30:00")
+    add_transaction(db_path, "AAPL", "buy", 5, 110.0, "2024-01-08 10:30:00")
+    history_model.get_value_history()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO price_history (symbol, date, close) VALUES ('AAPL', '2024-01-08', 110.0)")
+    conn.commit()
+    conn.close()
+
+    points = {p["date"]: p for p in history_model.get_value_history()["points"]}
+
+    assert points["2024-01-05"]["value"] == 10 * 105.0
+    assert points["2024-01-08"]["value"] == 15 * 110.0
+
+def test_rewritten_ledger_rebuilds_series(history_model, db_path):
+    """Test deleting a snapshotted transaction or backdating a new one triggers a full rebuild"""
+    add_transaction(db_path, "AAPL", "buy", 10, 100.0, "2024-01-02 10:30:00")
+    add_transaction(db_path, "AAPL", "buy", 5, 100.0, "2024-01-02 11:30:00")
+    history_model.get_value_history()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM transactions WHERE shares = 10")
+    conn.commit()
+    conn.close()
+    points = {p["date"]: p for p in history_model.get_value_history()["points"]}
+    assert points["2024-01-03"]["value"] == 5 * 103.0
+
+    add_transaction(db_path, "AAPL", "sell", 2, 101.0, "2024-01-03 12:00:00")
+    points = {p["date"]: p for p in history_model.get_value_history()["points"]}
+    assert points["2024-01-02"]["value"] == 5 * 102.0
+    assert points["2024-01-03"]["value"] == 3 * 103.0
+
+def test_sold_positions_keep_their_past_value(history_model, db_path):
+    """Test the ledger is replayed, so a position sold later still counts on the days it was held"""
+    add_transaction(db_path, "AAPL", "buy", 10, 100.0, "2024-01-02 10:30:00.000001")
+    add_transaction(db_path, "AAPL", "buy", 5, 120.0, "2024-01-03 11:00:00")
+    add_transaction(db_path, "AAPL", "sell", 12, 104.0, "2024-01-04 15:00:00.250000")
+    add_transaction(db_path, "AAPL", "sell", 3, 105.0, "2024-01-05 15:00:00")
+
+    points = {p["date"]: p for p in history_model.get_value_history()["points"]}
+
+    assert points["2024-01-02"]["value"] == 10 * 102.0
+    assert points["2024-01-03"]["value"] == 15 * 103.0
+    assert points["2024-01-03"]["cost_basis"] == 1000.0 + 600.0
+    assert points["2024-01-04"]["value"] == 3 * 104.0
+    assert points["2024-01-04"]["cost_basis"] == 3 * 120.0
+    assert points["2024-01-05"]["value"] == 0.0
+
+def test_invalid_date(history_model):
+    """Test malformed dates are rejected"""
+    with pytest.raises(ValueError, match="Invalid date"):
+        history_model.get_value_history("yesterday")
@@ -0,0 +1,63 @@
+import pytest
+from unittest.mock import patch
+from music_collection.models.stock_model import StockModel
+from music_collection.models.quote_stream_model import CLOSED, QuoteStreamModel, Subscription
+
+@pytest.fixture
+def stock_model():
+    """Stock model whose upstream fetch is mocked and counted"""
+    model = StockModel()
+    prices = iter(range(100, 10000))
+    with patch.object(model, '_fetch_stock_info',
+                      side_effect=lambda symbol: {"symbol": symbol, "price": float(next(prices))}) as fetch:
+        model.fetch = fetch
+        yield model
+
+def test_one_poller_shared_by_subscribers(stock_model):
+    """Test many subscribers of a symbol share a single upstream poller"""
+    streams = QuoteStreamModel(stock_model, poll_interval=60)
+    stock_model.get_stock_entry("AAPL")
+    subscriptions = [streams.subscribe("AAPL") for _ in range(5)]
+
+    quotes = [subscription.get(timeout=2) for subscription in subscriptions]
+
+    assert all(quote["price"] == 100.0 for quote in quotes)
+    assert stock_model.fetch.call_count == 1
+    assert streams.active_symbols() == {"AAPL"}
+
+def test_poller_stops_after_last_unsubscribe(stock_model):
+    """Test the poller is stopped once a symbol has no subscribers"""
+    streams = QuoteStreamModel(stock_model, poll_interval=60)
+    first = streams.subscribe("AAPL")
+    second = streams.subscribe("AAPL")
+
+    streams.unsubscribe(first)
+    assert streams.active_symbols() == {"AAPL"}
+
+    streams.unsubscribe(second)
+    assert streams.active_symbols() == set()
+
+def test_slow_consumer_is_dropped(stock_model):
+    """Test a subscriber with a full queue is closed and removed"""
+    streams = QuoteStreamModel(stock_model, poll_interval=60)
+    slow = Subscription("MSFT", maxsize=1)
+    streams._subscribers["MSFT"] = {slow}
+
+    streams.publish("MSFT", {"price": 1.0})
+    streams.publish("MSFT", {"price": 2.0})
+
+    assert slow.dropped
+    assert slow.get(timeout=0.1) is CLOSED
+    assert streams.subscriber_count("MSFT") == 0
+
+def test_cached_quote_is_sent_once(stock_model):
+    """Test the subscriber starting a poller gets an already cached quote once, not again from the first poll"""
+    streams = QuoteStreamModel(stock_model, poll_interval=60)
+    stock_model.get_stock_entry("AAPL")
+
+    subscription = streams.subscribe("AAPL")
+
+    assert subscription.get(timeout=2)["price"] == 100.0
+    assert subscription.get(timeout=0.5) is None
+    assert stock_model.fetch.call_count == 1
+    streams.unsubscribe(subscription)
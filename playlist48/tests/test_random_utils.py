@@ -0,0 +1,71 @@
+import pytest
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from music_collection.utils.random_utils import RandomBuffer
+
+class StubRandomOrgHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the random.org integers endpoint"""
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        num = int(query["num"][0])
+        self.server.requests_seen += 1
+        body = "\n".join(str(i % 1000) for i in range(num)) + "\n"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def stub_server():
+    """Run the stub random.org server on a free local port"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubRandomOrgHandler)
+    server.requests_seen = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+def test_refill_fetches_batch(stub_server):
+    """Test a refill loads a whole batch from the remote"""
+    url = f"http://127.0.0.1:{stub_server.server_port}/integers/"
+    buffer = RandomBuffer(url=url, batch_size=500, low_water=0)
+
+    buffer.refill()
+
+    assert len(buffer) == 500
+    assert stub_server.requests_seen == 1
+
+def test_draws_are_local_and_in_range(stub_server):
+    """Test draws come from the buffer and respect the bounds"""
+    url = f"http://127.0.0.1:{stub_server.server_port}/integers/"
+    buffer = RandomBuffer(url=url, batch_size=500, low_water=0)
+    buffer.refill()
+
+    draws = [buffer.randint(1, 10) for _ in range(100)]
+
+    assert all(1 <= d <= 10 for d in draws)
+    assert len(buffer) == 400
+    assert stub_server.requests_seen == 1
+
+def test_fallback_when_remote_unreachable():
+    """Test draws still succeed when the remote cannot be reached"""
+    buffer = RandomBuffer(url="http://127.0.0.1:9/integers/", batch_size=10, timeout=0.5)
+
+    buffer.refill()
+
+    assert len(buffer) == 0
+    assert 1 <= buffer.randint(1, 6) <= 6
+
+def test_randint_invalid_range():
+    """Test an empty range is rejected"""
+    buffer = RandomBuffer()
+
+    with pytest.raises(ValueError, match="Invalid range"):
+        buffer.randint(5, 1)
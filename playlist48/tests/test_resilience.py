@@ -0,0 +1,128 @@
+import pytest
+import requests
+import threading
+from unittest.mock import patch
+from app import app, stock_model, user_model
+from music_collection.models.stock_model import StockModel
+from music_collection.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+@pytest.fixture
+def mock_stock_info():
+    """Mock stock information response"""
+    return {
+        "symbol": "AAPL",
+        "price": 150.00,
+        "volume": 1000000,
+        "change": 2.50,
+        "change_percent": "1.5%"
+    }
+
+@pytest.fixture
+def open_circuit():
+    """The app's stock model with empty caches and a circuit that has just opened"""
+    stock_model.quote_cache.clear()
+    breaker = CircuitBreaker("Alpha Vantage", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    app.config["TESTING"] = True
+    with patch.object(stock_model, 'breaker', breaker), app.test_client() as client:
+        yield client
+
+def test_breaker_opens_and_probes(monkeypatch):
+    """Test the circuit opens after repeated failures, then lets one probe through before closing"""
+    clock = [0.0]
+    monkeypatch.setattr("music_collection.utils.circuit_breaker.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker("upstream", failure_threshold=2, reset_timeout=10)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    clock[0] = 10.0
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock[0] = 20.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+def test_upstream_timeouts_open_the_circuit():
+    """Test timed-out calls count as failures and later calls fail fast"""
+    model = StockModel()
+    model.breaker = CircuitBreaker("Alpha Vantage", failure_threshold=2, reset_timeout=60)
+
+    with patch("music_collection.models.stock_model.requests.get", side_effect=requests.exceptions.Timeout) as get:
+        for _ in range(2):
+            with pytest.raises(ValueError, match="Could not fetch data"):
+                model.get_stock_info("AAPL")
+        with pytest.raises(CircuitOpenError):
+            model.get_stock_info("AAPL")
+
+    assert get.call_count == 2
+    assert get.call_args.kwargs["timeout"] > 0
+
+def test_expired_quote_served_stale_while_refreshing(mock_stock_info):
+    """Test an expired quote is returned marked stale and refreshed in the background"""
+    model = StockModel()
+    model.quote_cache.set("AAPL", dict(mock_stock_info, price=100.0), -1)
+    refreshed = threading.Event()
+
+    def fetch(symbol):
+        refreshed.wait(5)
+        return mock_stock_info
+
+    with patch.object(model, '_fetch_stock_info', side_effect=fetch):
+        quote = model.get_stock_info("AAPL")
+        assert quote["price"] == 100.0
+        assert quote["stale"] is True
+        assert quote["as_of"]
+        refreshed.set()
+        for thread in threading.enumerate():
+            if thread.name.startswith("refresh-"):
+                thread.join(5)
+
+    quote = model.get_stock_info("AAPL")
+    assert quote["price"] == 150.0
+    assert quote["stale"] is False
+
+def test_open_circuit_serves_stale_quote(open_circuit, mock_stock_info):
+    """Test a stale quote is still served, with its age, while the circuit is open"""
+    stock_model.quote_cache.set("AAPL", mock_stock_info, -1)
+
+    response = open_circuit.get("/api/stock/AAPL")
+
+    assert response.status_code == 200
+    assert response.json["stale"] is True
+    assert response.get_etag()[0].endswith("-stale")
+    assert int(response.headers["Age"]) >= 0
+
+def test_open_circuit_without_cached_quote_returns_503(open_circuit):
+    """Test requests fail fast with Retry-After when there is nothing to serve"""
+    with patch("music_collection.models.stock_model.requests.get") as get:
+        response = open_circuit.get("/api/stock/MSFT")
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) > 0
+    get.assert_not_called()
+
+def test_trades_never_execute_at_a_stale_quote(open_circuit, mock_stock_info):
+    """Test a buy refetches an old quote, and is refused with 503 when the refetch can't be made"""
+    stock_model.quote_cache.set("AAPL", dict(mock_stock_info, price=100.0), -1)
+    order = {"account_id": 1, "symbol": "AAPL", "shares": 1}
+    refused = open_circuit.post("/api/portfolio/buy", json=order,
+                                headers={"Authorization": f"Bearer {user_model.issue_token(1)}"})
+    model = StockModel()
+    model.quote_cache.set("AAPL", dict(mock_stock_info, price=100.0), -1)
+    with patch.object(model, '_fetch_stock_info', return_value=mock_stock_info) as fetch:
+        quote = model.get_stock_info("AAPL", max_age=15)
+
+    assert refused.status_code == 503
+    assert int(refused.headers["Retry-After"]) > 0
+    fetch.assert_called_once()
+    assert quote["price"] == 150.0 and quote["stale"] is False
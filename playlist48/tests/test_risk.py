@@ -0,0 +1,101 @@
+import pytest
+import sqlite3
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+from music_collection.models.history_model import HistoryModel
+from music_collection.models.portfolio_model import PortfolioModel
+from music_collection.models.risk_model import RiskModel
+from music_collection.models.stock_model import StockModel, last_completed_session
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Temporary database with the application schema"""
+    path = tmp_path / "risk.db"
+    conn = sqlite3.connect(path)
+    with open("sql/create_portfolio_table.sql") as schema:
+        conn.executescript(schema.read())
+    conn.close()
+    monkeypatch.setattr("music_collection.utils.sql_utils.DB_PATH", str(path))
+    return path
+
+@pytest.fixture
+def closes():
+    """Sixty days of synthetic closes ending at the last completed session"""
+    dates = pd.bdate_range(end=last_completed_session(), periods=60)
+    rng = np.random.default_rng(7)
+    market = np.cumprod(1 + rng.normal(0, 0.01, len(dates))) * 100
+    return pd.DataFrame({
+        "SPY": market,
+        "AAPL": market * np.cumprod(1 + rng.normal(0, 0.005, len(dates))),
+        "MSFT": np.cumprod(1 + rng.normal(0, 0.02, len(dates))) * 50
+    }, index=dates)
+
+@pytest.fixture
+def risk_model(db_path, closes):
+    """Risk model over a seeded portfolio and price history"""
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO price_history (symbol, date, close) VALUES (?, ?, ?)",
+        [(symbol, date.date().isoformat(), float(price))
+         for symbol in closes.columns for date, price in closes[symbol].items()]
+    )
+    conn.executemany(
+        "INSERT INTO portfolio (symbol, shares, purchase_price, purchase_date) VALUES (?, ?, ?, ?)",
+        [("AAPL", 10, 100.0, "2024-01-01"), ("MSFT", 20, 50.0, "2024-01-02")]
+    )
+    conn.commit()
+    conn.close()
+
+    stock_model = StockModel()
+    return RiskModel(PortfolioModel(stock_model), HistoryModel(stock_model))
+
+def test_portfolio_risk_matches_pandas(risk_model, closes):
+    """Test volatility and beta agree with a straightforward pandas computation"""
+    with patch.object(risk_model.history_model.stock_model, 'get_history_entry') as fetch:
+        risk = risk_model.get_portfolio_risk("SPY", 0.95)
+    fetch.assert_not_called()
+
+    returns = closes.pct_change().dropna()
+    values = closes.iloc[-1][["AAPL", "MSFT"]] * [10, 20]
+    weights = values / values.sum()
+    portfolio_returns = returns[["AAPL", "MSFT"]] @ weights
+    expected_beta = portfolio_returns.cov(returns["SPY"]) / returns["SPY"].var()
+
+    assert risk["observations"] == 59
+    assert risk["portfolio"]["volatility"] == pytest.approx(portfolio_returns.std() * np.sqrt(252))
+    assert risk["portfolio"]["beta"] == pytest.approx(expected_beta)
+    assert risk["correlation"]["matrix"][0][1] == pytest.approx(returns["AAPL"].corr(returns["MSFT"]))
+    assert risk["portfolio"]["var_1d"] > 0
+
+def test_risk_is_memoized_until_new_bar(risk_model, db_path):
+    """Test results are reused until a new bar is stored"""
+    first = risk_model.get_portfolio_risk()
+    assert risk_model.get_portfolio_risk() is first
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO price_history (symbol, date, close) VALUES ('AAPL', '2100-01-04', 1.0)")
+    conn.commit()
+    conn.close()
+
+    assert risk_model.get_portfolio_risk() is not first
+
+def test_empty_portfolio(db_path):
+    """Test risk on an empty portfolio is rejected"""
+    stock_model = StockModel()
+    model = RiskModel(PortfolioModel(stock_model), HistoryModel(stock_model))
+
+    with pytest.raises(ValueError, match="Portfolio is empty"):
+        model.get_portfolio_risk()
+
+def test_risk_memo_is_bounded(risk_model, monkeypatch):
+    """Test the memo keeps only the most recently read parameter sets"""
+    monkeypatch.setattr("music_collection.models.risk_model.RISK_CACHE_ENTRIES", 2)
+    first = risk_model.get_portfolio_risk(confidence=0.9)
+    risk_model.get_portfolio_risk(confidence=0.95)
+    assert risk_model.get_portfolio_risk(confidence=0.9) is first
+
+    risk_model.get_portfolio_risk(confidence=0.99)
+
+    assert [key[2] for key in risk_model._memo] == [0.9, 0.99]
+    assert risk_model.get_portfolio_risk(confidence=0.9) is first
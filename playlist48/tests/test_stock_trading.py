@@ -1,36 +1,19 @@
 import pytest
-import sqlite3
 from datetime import datetime
 from unittest.mock import Mock, patch
 from music_collection.models.portfolio_model import PortfolioModel
+from music_collection.utils.sql_utils import MemoryStorage
 
 @pytest.fixture
 def portfolio_model():
     """Create a test portfolio model with in-memory database"""
-    # Create shared database connection
-    conn = sqlite3.connect(":memory:")
-    
-    # Create the portfolio table
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS portfolio (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            symbol TEXT NOT NULL,
-            shares INTEGER NOT NULL,
-            purchase_price REAL NOT NULL,
-            purchase_date TIMESTAMP NOT NULL
-        )
-    """)
-    conn.commit()
-    
-    # Create model and set connection
-    model = PortfolioModel()
-    model.db_path = ":memory:"
-    model._conn = conn  # Store connection on model instance
-    
+    storage = MemoryStorage()
+    model = PortfolioModel(storage=storage)
+
     yield model
-    
+
     # Cleanup
-    conn.close()
+    storage.close()
 
 @pytest.fixture
 def mock_stock_info():
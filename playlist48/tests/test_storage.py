@@ -0,0 +1,122 @@
+import pytest
+import sqlite3
+import threading
+from unittest.mock import patch
+from music_collection.models.ledger_model import LedgerModel
+from music_collection.models.portfolio_model import PortfolioModel
+from music_collection.models.user_model import UserModel
+from music_collection.utils.sql_utils import ConnectionPool, FileStorage, MemoryStorage, create_storage
+
+@pytest.fixture
+def storage():
+    """Two-shard in-memory storage"""
+    storage = MemoryStorage(shards=2)
+    yield storage
+    storage.close()
+
+def test_memory_storage_is_shared_and_isolated(storage):
+    """Test data written on one connection is seen by the next, but not by another storage"""
+    with storage.connection() as conn:
+        conn.execute("INSERT INTO stocks (symbol, company_name, last_price) VALUES ('AAPL', 'Apple', 1.0)")
+        conn.commit()
+    other = MemoryStorage()
+
+    with storage.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM stocks").fetchone()[0] == 1
+    with other.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM stocks").fetchone()[0] == 0
+    other.close()
+
+def test_models_use_injected_storage(storage):
+    """Test accounts and trades go to the injected storage, never the default database file"""
+    users = UserModel(storage)
+    portfolio = PortfolioModel(ledger_model=LedgerModel(snapshot_every=10 ** 9, snapshot_interval=3600,
+                                                        storage=storage), storage=storage)
+    with patch("music_collection.utils.sql_utils.DB_PATH", "/nonexistent/stocks.db"), \
+            patch.object(portfolio.stock_model, 'get_stock_info', return_value={"price": 10.0}):
+        account_id = users.create_account("memory-user", "password123")["id"]
+        portfolio.buy_stock("AAPL", 5, account_id)
+        portfolio.sell_stock("AAPL", 2, account_id)
+
+        assert users.login("memory-user", "password123")["id"] == account_id
+        assert portfolio.get_positions(account_id) == {"AAPL": 3}
+        assert [t["side"] for t in portfolio.ledger_model.get_transactions(account_id)] == ["sell", "buy"]
+
+def test_concurrent_trades_on_memory_storage(storage):
+    """Test trades from many threads are all recorded without shared-cache lock errors"""
+    portfolio = PortfolioModel(ledger_model=LedgerModel(snapshot_every=10 ** 9, snapshot_interval=3600,
+                                                        storage=storage), storage=storage)
+    errors = []
+
+    def trade(account_id):
+        try:
+            for _ in range(50):
+                portfolio.buy_stock("MSFT", 2, account_id)
+                portfolio.sell_stock("MSFT", 1, account_id)
+        except Exception as e:
+            errors.append(e)
+
+    with patch.object(portfolio.stock_model, 'get_stock_info', return_value={"price": 10.0}):
+        threads = [threading.Thread(target=trade, args=(account_id,)) for account_id in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert errors == []
+    assert all(portfolio.get_positions(account_id) == {"MSFT": 50} for account_id in range(1, 9))
+
+def test_memory_shards_do_not_wait_on_each_other(storage):
+    """Test a block held open on one shard leaves the other shard usable from another thread"""
+    done = threading.Event()
+
+    def write_other_shard():
+        with storage.shard_connection(1, write=True) as conn:
+            conn.execute("INSERT INTO stocks (symbol) VALUES ('MSFT')")
+            conn.commit()
+        done.set()
+
+    with storage.shard_connection(0, write=True):
+        thread = threading.Thread(target=write_other_shard)
+        thread.start()
+        assert done.wait(5)
+    thread.join()
+
+def test_file_connections_are_pooled(tmp_path):
+    """Test released connections are reused up to the pool size, with unfinished transactions rolled back"""
+    path = str(tmp_path / "pool.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    storage = FileStorage(path, pool_size=1)
+
+    with storage.shard_connection(0, write=True) as first:
+        first.execute("INSERT INTO t VALUES (1)")
+    with storage.connection() as reused:
+        assert reused is first
+        assert reused.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+        with storage.connection() as nested:
+            assert nested is not first
+    with storage.connection() as kept:
+        assert kept is nested
+    storage.close()
+
+    pool = ConnectionPool(path, max_idle=2)
+    connections = [pool.acquire() for _ in range(3)]
+    for conn in connections:
+        pool.release(conn)
+    assert [pool.acquire(), pool.acquire()] == connections[1::-1]
+    pool.close()
+
+def test_create_storage_backends(tmp_path):
+    """Test backend names map to storages, and file shards follow the configured path"""
+    storage = FileStorage(str(tmp_path / "stocks.db"), shards=2)
+    assert storage.shard_path(1) == str(tmp_path / "stocks.shard1.db")
+    assert isinstance(create_storage("file"), FileStorage)
+    memory = create_storage("memory")
+    assert isinstance(memory, MemoryStorage)
+    memory.close()
+    with pytest.raises(ValueError):
+        create_storage("postgres")
+    with pytest.raises(sqlite3.OperationalError):
+        with FileStorage("/nonexistent/stocks.db").connection() as conn:
+            conn.execute("SELECT 1")
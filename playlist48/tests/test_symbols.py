@@ -0,0 +1,87 @@
+import pytest
+from unittest.mock import patch
+from app import app
+from benchmarks.fake_market_data import FakeMarketDataServer
+from music_collection.models.stock_model import StockModel
+from music_collection.models.symbol_model import LISTING_FIXTURE, SymbolModel
+
+@pytest.fixture
+def symbol_model(storage):
+    """Symbol directory downloaded from a listing with the bundled fixture's symbols"""
+    stock_model = StockModel()
+    model = SymbolModel(stock_model, check_interval=3600, storage=storage)
+    with open(LISTING_FIXTURE) as fixture, patch.object(stock_model, 'fetch_listing_status',
+                                                        return_value=fixture.read()):
+        model.ensure_loaded()
+    stock_model.set_symbol_directory(model)
+    return model
+
+def test_search_ranks_symbols_before_names(symbol_model):
+    """Test the exact symbol comes first, then longer symbols, then company-name matches"""
+    assert [r["symbol"] for r in symbol_model.search("ms")] == ["MS", "MSFT"]
+    assert [r["symbol"] for r in symbol_model.search("micro")] == ["AMD", "MSFT"]
+    assert symbol_model.search("goog", limit=1)[0]["symbol"] == "GOOG"
+    assert symbol_model.search("zzzz") == []
+
+def test_unknown_symbol_rejected_before_upstream_call(symbol_model):
+    """Test a ticker missing from the directory fails without calling Alpha Vantage"""
+    with patch.object(symbol_model.stock_model, '_call_api') as call:
+        with pytest.raises(ValueError, match="Unknown symbol: AAPLE"):
+            symbol_model.stock_model.get_stock_info("aaple")
+    call.assert_not_called()
+
+def test_refresh_stores_listing_for_other_processes(storage):
+    """Test a downloaded listing is stored, and a second model loads it without downloading"""
+    with FakeMarketDataServer() as market:
+        stock_model = StockModel()
+        stock_model.base_url = market.url
+        assert SymbolModel(stock_model, storage=storage).refresh() > 1000
+
+        other = SymbolModel(stock_model, storage=storage)
+        other.ensure_loaded()
+
+        assert market.calls == 1
+    assert other.is_known("SYM042")
+    assert other.get_status()["symbols"] > 1000
+    with storage.connection() as conn:
+        assert conn.execute("SELECT source FROM symbol_directory_state").fetchone()[0] == "alpha_vantage"
+
+def test_fixture_directory_is_provisional(storage):
+    """Test a fixture loaded after a failed download accepts any ticker and is retried on the check interval"""
+    with FakeMarketDataServer() as market:
+        stock_model = StockModel()
+        stock_model.base_url = market.url
+        model = SymbolModel(stock_model, check_interval=3600, storage=storage)
+        with patch.object(stock_model, 'fetch_listing_status', side_effect=ValueError("quota")):
+            model.ensure_loaded()
+        assert model.get_status()["source"] == "fixture"
+        assert model.is_known("SHOP") and model.is_known("PLTR")
+
+        model.check_interval = 0
+        model.check()
+    assert model.get_status()["source"] == "alpha_vantage"
+    assert model.is_known("SYM042") and not model.is_known("AAPLE")
+
+def test_refresh_is_claimed_by_one_process(symbol_model):
+    """Test of several processes that found the refresh due, only the first claims it until it expires"""
+    refreshed_at, _ = symbol_model._stored_state()
+    models = [SymbolModel(symbol_model.stock_model, check_interval=3600, storage=symbol_model.storage) for _ in range(3)]
+    assert [model._claim_refresh(refreshed_at) for model in models] == [True, False, False]
+
+    expired = SymbolModel(symbol_model.stock_model, check_interval=0, storage=symbol_model.storage)
+    assert expired._claim_refresh(refreshed_at)
+    with open(LISTING_FIXTURE) as fixture, patch.object(symbol_model.stock_model, 'fetch_listing_status',
+                                                        return_value=fixture.read()):
+        symbol_model.refresh()
+    assert not expired._claim_refresh(refreshed_at)
+
+def test_search_route(symbol_model):
+    """Test the search endpoint returns listings and rejects an empty query"""
+    app.config["TESTING"] = True
+    with patch("app.symbol_model", symbol_model), app.test_client() as client:
+        response = client.get("/api/symbols/search?q=nvid")
+        empty = client.get("/api/symbols/search?q=")
+
+    assert response.status_code == 200
+    assert response.json["results"][0]["name"] == "NVIDIA Corp"
+    assert empty.status_code == 400
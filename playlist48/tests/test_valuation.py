@@ -0,0 +1,77 @@
+import pytest
+from unittest.mock import patch
+from music_collection.models.ledger_model import LedgerModel
+from music_collection.models.portfolio_model import PortfolioModel
+from music_collection.models.stock_model import StockModel
+from music_collection.utils.sql_utils import MemoryStorage
+
+ACCOUNT = 1
+
+def make_model(storage, stock_model):
+    ledger = LedgerModel(snapshot_every=10 ** 9, snapshot_interval=3600, storage=storage)
+    return PortfolioModel(stock_model, ledger, storage)
+
+def set_quote(stock_model, symbol, price):
+    stock_model.quote_cache.set(symbol, {"symbol": symbol, "price": price}, 60)
+
+@pytest.fixture
+def models():
+    """Two portfolio models (as in two worker processes) on one in-memory storage, with cached quotes"""
+    storage = MemoryStorage()
+    stock_model = StockModel()
+    set_quote(stock_model, "AAPL", 100.0)
+    set_quote(stock_model, "MSFT", 50.0)
+    model = make_model(storage, stock_model)
+    model.buy_stock("AAPL", 10, ACCOUNT)
+    model.buy_stock("MSFT", 4, ACCOUNT)
+    yield model, make_model(storage, stock_model)
+    storage.close()
+
+def test_repeated_reads_reuse_the_valuation(models):
+    """Test reads with no trade or price change don't aggregate lots again"""
+    model, _ = models
+    first = model.get_portfolio_value(ACCOUNT)
+    with patch.object(model, '_load_holdings', wraps=model._load_holdings) as load:
+        assert model.get_portfolio_value(ACCOUNT) == first
+        model.get_portfolio(ACCOUNT)
+    load.assert_not_called()
+    assert first["total_value"] == 10 * 100.0 + 4 * 50.0
+
+def test_price_tick_reprices_only_that_holding(models):
+    """Test a new quote for one symbol recomputes that holding and the totals, keeping the others"""
+    model, _ = models
+    model.get_portfolio(ACCOUNT)
+    msft = model._valuations[ACCOUNT].holdings[1]
+
+    set_quote(model.stock_model, "AAPL", 110.0)
+    with patch.object(model, '_load_holdings') as load:
+        portfolio = model.get_portfolio(ACCOUNT)
+        value = model.get_portfolio_value(ACCOUNT)
+    load.assert_not_called()
+
+    assert portfolio[0]["current_value"] == 1100.0
+    assert model._valuations[ACCOUNT].holdings[1] is msft
+    assert value["total_value"] == 1100.0 + 200.0
+    assert value["total_gain_loss"] == 100.0
+
+def test_trade_in_another_process_invalidates(models):
+    """Test a trade through one model is seen by another model's cached valuation"""
+    model, other = models
+    assert other.get_portfolio_value(ACCOUNT)["total_value"] == 1200.0
+
+    model.sell_stock("AAPL", 4, ACCOUNT)
+    model.buy_stock("MSFT", 1, ACCOUNT)
+
+    assert [(h["symbol"], h["shares"]) for h in other.get_portfolio(ACCOUNT)] == [("AAPL", 6), ("MSFT", 5)]
+    assert other.get_portfolio_value(ACCOUNT)["total_value"] == 6 * 100.0 + 5 * 50.0
+
+def test_quotes_for_other_symbols_keep_the_valuation(models):
+    """Test quote writes for symbols the account doesn't hold still give a whole-portfolio hit"""
+    model, _ = models
+    first = model.get_portfolio_value(ACCOUNT)
+    set_quote(model.stock_model, "IBM", 180.0)
+    set_quote(model.stock_model, "NVDA", 900.0)
+    with patch.object(model.stock_model, 'get_stock_entry') as get_entry:
+        assert model.get_portfolio_value(ACCOUNT) == first
+        model.get_portfolio(ACCOUNT)
+    get_entry.assert_not_called()